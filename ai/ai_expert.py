@@ -1,12 +1,20 @@
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Union
+import time
+import numpy as np
+import pandas as pd
 from .model import AIModel
 from .data_organizer import DataOrganizer
 from .trainer import ModelTrainer
-from .processor import RequestProcessor
+from .worker import TrainingProgress, TrainingWorker
+from utils.scheduler import Scheduler
+from .processor import RequestProcessor, BatchRecommendations
 
 class AIExpert:
     def __init__(self, db_config: Dict[str, str], model_path: str = "ai_model.joblib",
-                 training_query: str = None, training_interval_hours: int = 24):
+                 training_query: str = None, training_interval_hours: int = 24,
+                 incremental: bool = False, incremental_query: str = None,
+                 isolated_training: bool = True, training_worker: TrainingWorker = None,
+                 scheduler: Scheduler = None):
         """
         Initialize the AI Expert system.
         
@@ -15,6 +23,13 @@ class AIExpert:
             model_path: Path to save/load the model
             training_query: SQL query for fetching training data
             training_interval_hours: Hours between training sessions
+            incremental: Train on new rows only between full retrains, which
+                         is cheap enough to run hourly
+            incremental_query: SQL query for rows newer than %(since)s
+            isolated_training: Train in a separate process, so fitting does not
+                               compete with the UI and trading threads
+            training_worker: Worker with custom CPU and memory limits
+            scheduler: Scheduler shared with other periodic jobs
         """
         # Initialize components
         self.data_organizer = DataOrganizer(db_config)
@@ -23,7 +38,10 @@ class AIExpert:
             self.model,
             self.data_organizer,
             training_query or self._default_training_query(),
-            training_interval_hours
+            training_interval_hours,
+            incremental_query=(incremental_query or self._default_incremental_query()) if incremental else None,
+            worker=(training_worker or TrainingWorker()) if isolated_training else None,
+            scheduler=scheduler
         )
         self.processor = RequestProcessor(self.model, self.data_organizer)
         
@@ -35,14 +53,51 @@ class AIExpert:
         """Stop the scheduled training process."""
         self.trainer.stop_training_schedule()
         
-    def train_now(self) -> bool:
+    def train_now(self, full: bool = None) -> bool:
         """
         Trigger an immediate training iteration.
         
+        Args:
+            full: Force a full retrain (True) or an incremental one (False)
+        
         Returns:
             bool: True if training was successful
         """
-        return self.trainer.train_now()
+        return self.trainer.train_now(full)
+    
+    def cancel_training(self) -> bool:
+        """
+        Cancel a training iteration running in the worker process.
+        
+        Returns:
+            bool: True if one was running
+        """
+        return self.trainer.cancel_training()
+    
+    def training_progress(self) -> TrainingProgress:
+        """Return the progress of the current or last training iteration."""
+        return self.trainer.training_progress()
+    
+    def on_training_started(self, callback: Callable[[], None]):
+        """
+        Register a callback for the start of every training iteration.
+        
+        Args:
+            callback: Called without arguments from the training thread
+        """
+        self.trainer.started = callback
+    
+    def rollback_model(self, version: int = None) -> int:
+        """
+        Make an earlier model version live again.
+        
+        Args:
+            version: Version to restore; defaults to the previous one
+            
+        Returns:
+            int: The version now live
+        """
+        return self.model.rollback(version).version
     
     def get_recommendations(self, input_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -57,6 +112,31 @@ class AIExpert:
         predictions = self.processor.process_request(input_data)
         return self.processor.format_recommendations(predictions)
     
+    def get_recommendations_batch(self, input_data: Union[pd.DataFrame, np.ndarray, List[Dict[str, Any]]],
+                                  n_jobs: int = -1) -> BatchRecommendations:
+        """
+        Get recommendations for many inputs (e.g. every symbol on a tick) at once.
+        
+        Args:
+            input_data: DataFrame or list of input dictionaries, or an array in
+                        the model's feature order
+            n_jobs: Threads used by the model's predict (-1 for all cores)
+            
+        Returns:
+            BatchRecommendations with one recommendation list per input and
+            the latency of the batch
+        """
+        started = time.perf_counter()
+        predictions = self.processor.process_batch(input_data, n_jobs)
+        recommendations = [
+            self.processor.format_recommendations(row) for row in predictions.tolist()
+        ]
+        return BatchRecommendations(
+            recommendations=recommendations,
+            batch_size=len(recommendations),
+            latency_ms=(time.perf_counter() - started) * 1000
+        )
+    
     def _default_training_query(self) -> str:
         """
         Return the default training query if none is provided.
@@ -67,12 +147,32 @@ class AIExpert:
         return """
             SELECT 
                 input_features.*,
-                array[risk_level, confidence, suggested_position] as output_labels
+                array[risk_level, confidence, suggested_position] as output_labels,
+                training_data.timestamp as sample_time
             FROM training_data
             JOIN input_features ON training_data.feature_id = input_features.id
             ORDER BY training_data.timestamp DESC
             LIMIT 10000
         """
+        
+    def _default_incremental_query(self) -> str:
+        """
+        Return the default query for rows added since the last training watermark.
+        
+        Returns:
+            str: SQL query taking a %(since)s timestamp parameter
+        """
+        return """
+            SELECT 
+                input_features.*,
+                array[risk_level, confidence, suggested_position] as output_labels,
+                training_data.timestamp as sample_time
+            FROM training_data
+            JOIN input_features ON training_data.feature_id = input_features.id
+            WHERE training_data.timestamp > %(since)s
+            ORDER BY training_data.timestamp
+            LIMIT 50000
+        """
 
 # Example usage:
 #if __name__ == "__main__":
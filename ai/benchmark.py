@@ -0,0 +1,167 @@
+"""
+Startup benchmark for AIModel loading.
+
+Measures how long a process takes from constructing AIModel to its first
+prediction, with the published artifact read into private memory or
+memory-mapped, and how much memory each of several worker processes holds
+when they load the same model. Workers score a sample batch in slices small
+enough for the forest's own node arrays, and their predictions must equal
+the whole batch scored through sklearn's trees in this process; otherwise
+the run exits with status 1.
+
+Run from the repository root:
+
+    python -m ai.benchmark
+    python -m ai.benchmark --model-path ai_model.joblib --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .forest import FLAT_PREDICT_MAX_ROWS
+from .model import AIModel
+
+# Rows each worker scores before its memory is measured
+PAGE_TOUCH_ROWS = 2000
+
+
+def build_sample_model(model_path: str, rows: int = 10000, features: int = 12) -> None:
+    """Train and publish a model on random data with the default estimator settings"""
+    rng = np.random.default_rng(42)
+    inputs = pd.DataFrame(rng.random((rows, features)), columns=[f"f{i}" for i in range(features)])
+    labels = rng.integers(0, 5, size=(rows, 3)).astype(np.float64)
+    AIModel(model_path).train(inputs, labels)
+
+
+def _sample_input(model: AIModel) -> Dict[str, float]:
+    return {name: 0.5 for name in model.feature_names}
+
+
+def _sample_batch(model: AIModel) -> np.ndarray:
+    return np.random.default_rng(0).random((PAGE_TOUCH_ROWS, len(model.feature_names)))
+
+
+def _proportional_memory_kb() -> Optional[float]:
+    """Proportional set size of this process, which splits shared mapped pages between sharers"""
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return float(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def startup(model_path: str, mmap_mode: Optional[str]) -> Tuple[AIModel, Dict[str, float]]:
+    """Time AIModel construction and the first prediction, which triggers the lazy load"""
+    before = _proportional_memory_kb()
+    started = time.perf_counter()
+    model = AIModel(model_path, mmap_mode=mmap_mode)
+    constructed = time.perf_counter()
+    model.predict(_sample_input(model))
+    predicted = time.perf_counter()
+    after = _proportional_memory_kb()
+    return model, {
+        'construct_ms': (constructed - started) * 1000,
+        'first_predict_ms': (predicted - constructed) * 1000,
+        'model_pss_kb': after - before if before is not None and after is not None else float('nan'),
+    }
+
+
+def _worker(model_path: str, mmap_mode: Optional[str], barrier, results) -> None:
+    model, stats = startup(model_path, mmap_mode)
+    # Score a full batch so every node page is touched, then measure once all
+    # workers hold the model, so shared pages are split between them. Slices
+    # stay on the memory-mapped arrays instead of building sklearn's trees.
+    batch = _sample_batch(model)
+    predictions = np.concatenate([
+        model.predict_batch(batch[start:start + FLAT_PREDICT_MAX_ROWS])
+        for start in range(0, len(batch), FLAT_PREDICT_MAX_ROWS)
+    ])
+    barrier.wait()
+    after = _proportional_memory_kb()
+    stats['process_pss_kb'] = after if after is not None else float('nan')
+    results.put((stats, predictions))
+
+
+def benchmark_workers(model_path: str, mmap_mode: Optional[str],
+                      workers: int) -> Tuple[List[Dict[str, float]], List[np.ndarray]]:
+    """Start fresh processes that load the same model concurrently
+
+    Returns each worker's statistics and its predictions for the sample batch.
+    """
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(model_path, mmap_mode, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return [stats for stats, _ in outcomes], [predictions for _, predictions in outcomes]
+
+
+def time_load(path: str, mmap_mode: Optional[str], repeat: int) -> float:
+    """Median milliseconds of joblib.load for one artifact file"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        joblib.load(path, mmap_mode=mmap_mode)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark AIModel startup and loading")
+    parser.add_argument('--model-path', help="Existing model to load; a sample model is trained by default")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    model_path = args.model_path
+    if model_path is None:
+        model_path = os.path.join(tempfile.mkdtemp(), 'ai_model.joblib')
+        print("Training a sample model...")
+        build_sample_model(model_path)
+    artifact_path = AIModel(model_path).artifact_path()
+    if artifact_path is None:
+        raise Exception(f"No saved model at {model_path}")
+    print(f"Artifact {artifact_path}: {os.path.getsize(artifact_path) / 1024 / 1024:.1f} MB")
+
+    reference_model = AIModel(model_path, mmap_mode=None)
+    batch = _sample_batch(reference_model)
+    reference = reference_model.predict_batch(batch)
+    problems = []
+
+    for label, mmap_mode in (('copy', None), ('mmap', 'r')):
+        print(f"\njoblib.load ({label}): {time_load(artifact_path, mmap_mode, args.repeat):8.1f} ms")
+        stats, predictions = benchmark_workers(model_path, mmap_mode, args.workers)
+        for name in ('construct_ms', 'first_predict_ms', 'model_pss_kb', 'process_pss_kb'):
+            values = [s[name] for s in stats]
+            print(f"  {name:<18} mean {statistics.mean(values):10.1f}  max {max(values):10.1f}")
+        mismatched = sum(not np.array_equal(p, reference) for p in predictions)
+        if mismatched:
+            problems.append(f"{mismatched} of {len(predictions)} {label} workers predicted differently")
+
+    for message in problems:
+        print(f"FAILED {message}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
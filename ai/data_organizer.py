@@ -1,7 +1,8 @@
 import pandas as pd
 import psycopg2
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Union
 import numpy as np
+from .scaler import FeatureScaler
 
 class DataOrganizer:
     def __init__(self, db_config: Dict[str, str]):
@@ -13,12 +14,14 @@ class DataOrganizer:
                       (host, database, user, password, port)
         """
         self.db_config = db_config
+        # Fitted min-max scaler; set by update_normalization_params()
+        self.scaler: Optional[FeatureScaler] = None
         
     def _get_db_connection(self):
         """Create and return a database connection."""
         return psycopg2.connect(**self.db_config)
     
-    def fetch_training_data(self, query: str) -> tuple[List[Dict[str, Any]], List[List[float]]]:
+    def fetch_training_data(self, query: str) -> tuple[pd.DataFrame, np.ndarray]:
         """
         Fetch and organize training data from the database.
         
@@ -26,16 +29,33 @@ class DataOrganizer:
             query: SQL query to fetch the training data
             
         Returns:
-            Tuple of (input_vectors, output_labels)
+            Tuple of (input feature DataFrame, output label matrix)
+        """
+        input_features, output_labels, _ = self.fetch_training_rows(query)
+        return input_features, output_labels
+    
+    def fetch_training_rows(self, query: str, params: Dict[str, Any] = None
+                            ) -> tuple[pd.DataFrame, np.ndarray, Optional[np.ndarray]]:
+        """
+        Fetch training data together with the time of each row.
+        
+        Args:
+            query: SQL query to fetch the training data; a sample_time column,
+                   if selected, is returned separately from the features
+            params: Query parameters, e.g. {'since': watermark}
+            
+        Returns:
+            Tuple of (input feature DataFrame, output label matrix, row times or None)
         """
         with self._get_db_connection() as conn:
-            df = pd.read_sql(query, conn)
+            df = pd.read_sql(query, conn, params=params)
             
-        # Convert dataframe to input vectors and output labels
-        input_vectors = df.drop(['output_labels'], axis=1).to_dict('records')
-        output_labels = df['output_labels'].tolist()
+        # Keep the features columnar; only the label arrays need stacking
+        sample_times = df.pop('sample_time').to_numpy() if 'sample_time' in df else None
+        input_features = df.drop(columns=['output_labels'])
+        output_labels = np.array(df['output_labels'].tolist(), dtype=np.float64)
         
-        return input_vectors, output_labels
+        return input_features, output_labels, sample_times
     
     def organize_live_data(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -50,38 +70,95 @@ class DataOrganizer:
         # Add any necessary preprocessing steps here
         return input_data
     
-    def normalize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def organize_live_batch(self, input_data: Union[pd.DataFrame, np.ndarray, List[Dict[str, Any]]],
+                            feature_names: List[str] = None) -> pd.DataFrame:
+        """
+        Organize a batch of live inputs into a DataFrame with one row per input.
+        
+        Args:
+            input_data: DataFrame, list of raw input dictionaries, or an array
+                        whose columns follow feature_names
+            feature_names: Column names for array input
+            
+        Returns:
+            Input feature DataFrame
+        """
+        if isinstance(input_data, pd.DataFrame):
+            return input_data
+        if isinstance(input_data, np.ndarray):
+            return pd.DataFrame(input_data, columns=feature_names)
+        return pd.DataFrame([self.organize_live_data(data) for data in input_data])
+    
+    @property
+    def feature_mins(self) -> Dict[str, float]:
+        """Per-feature minimums of the fitted scaler."""
+        return self._require_scaler(None).feature_mins
+    
+    @property
+    def feature_maxs(self) -> Dict[str, float]:
+        """Per-feature maximums of the fitted scaler."""
+        return self._require_scaler(None).feature_maxs
+    
+    def _require_scaler(self, scaler: Optional[FeatureScaler]) -> FeatureScaler:
+        scaler = scaler or self.scaler
+        if scaler is None:
+            raise Exception("Normalization parameters are not fitted; train or load a model first")
+        return scaler
+    
+    def normalize_data(self, data: Dict[str, Any], scaler: Optional[FeatureScaler] = None) -> Dict[str, Any]:
         """
         Normalize the input data to ensure consistent scaling.
         
         Args:
             data: Input data dictionary
+            scaler: Scaler to apply; defaults to the fitted one
             
         Returns:
             Normalized data dictionary
         """
-        normalized_data = {}
-        for key, value in data.items():
-            if isinstance(value, (int, float)):
-                # Apply min-max normalization
-                normalized_data[key] = (value - self.feature_mins.get(key, 0)) / \
-                                     (self.feature_maxs.get(key, 1) - self.feature_mins.get(key, 0) + 1e-8)
-            else:
-                normalized_data[key] = value
-        return normalized_data
+        return self._require_scaler(scaler).transform_dict(data)
     
-    def update_normalization_params(self, training_data: List[Dict[str, Any]]):
+    def normalize_frame(self, data: pd.DataFrame, scaler: Optional[FeatureScaler] = None) -> pd.DataFrame:
         """
-        Update the normalization parameters based on training data.
+        Normalize a DataFrame of input features column-wise.
         
         Args:
-            training_data: List of training data dictionaries
+            data: Input feature DataFrame
+            scaler: Scaler to apply; defaults to the fitted one
+            
+        Returns:
+            Normalized DataFrame; columns without parameters are left unchanged
+        """
+        return self._require_scaler(scaler).transform(data)
+    
+    def fit_scaler(self, training_data: Union[pd.DataFrame, List[Dict[str, Any]]],
+                   base: Optional[FeatureScaler] = None) -> FeatureScaler:
         """
-        self.feature_mins = {}
-        self.feature_maxs = {}
+        Fit normalization parameters without changing the current ones.
         
-        for feature in training_data[0].keys():
-            if all(isinstance(d[feature], (int, float)) for d in training_data):
-                values = [d[feature] for d in training_data]
-                self.feature_mins[feature] = min(values)
-                self.feature_maxs[feature] = max(values) 
\ No newline at end of file
+        Args:
+            training_data: DataFrame (or list of dictionaries) of training features
+            base: Scaler to widen with the data instead of refitting; left unchanged
+            
+        Returns:
+            A new fitted scaler
+        """
+        if base is not None:
+            # Copy, so a scaler already stored with a live model is never changed
+            return FeatureScaler.from_dict(base.to_dict()).partial_fit(training_data)
+        return FeatureScaler.fit(training_data)
+    
+    def update_normalization_params(self, training_data: Union[pd.DataFrame, List[Dict[str, Any]]],
+                                    incremental: bool = False) -> FeatureScaler:
+        """
+        Update the normalization parameters based on training data.
+        
+        Args:
+            training_data: DataFrame (or list of dictionaries) of training features
+            incremental: Widen the current parameters instead of refitting them
+            
+        Returns:
+            The fitted scaler
+        """
+        self.scaler = self.fit_scaler(training_data, self.scaler if incremental else None)
+        return self.scaler
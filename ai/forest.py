@@ -0,0 +1,301 @@
+import threading
+import numpy as np
+from typing import List, Optional
+from joblib import Parallel, delayed
+from sklearn.tree._tree import NODE_DTYPE, TREE_LEAF, TREE_UNDEFINED, Tree
+
+# Largest batch scored by walking the node arrays with numpy. sklearn's compiled
+# trees are faster from about ten samples per call, but are rebuilt as private
+# copies, so single-row scoring keeps to the shared memory-mapped arrays
+FLAT_PREDICT_MAX_ROWS = 8
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous node arrays.
+
+    All trees share one set of arrays with global node indices, so the whole
+    forest is a handful of plain numpy arrays. Saved uncompressed with joblib
+    and loaded with mmap_mode='r', those arrays stay backed by the file and
+    every process loading the model shares the same pages, whereas sklearn's
+    own trees copy their nodes into private memory on unpickling.
+
+    Predictions match RandomForestClassifier.predict: the class with the
+    highest mean leaf proportion across trees, per output.
+    """
+
+    def __init__(self, children_left: np.ndarray, children_right: np.ndarray, feature: np.ndarray,
+                 threshold: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 classes: List[np.ndarray], n_features: int):
+        """
+        Args:
+            children_left: Global index of each node's left child (leaves point to themselves)
+            children_right: Global index of each node's right child (leaves point to themselves)
+            feature: Feature index each node splits on (-1 for leaves)
+            threshold: Split threshold of each node (samples <= threshold go left)
+            value: Class proportions per node, shape (nodes, outputs, max classes)
+            roots: Global index of each tree's root node
+            classes: Class labels per output
+            n_features: Number of input features
+        """
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.n_features = n_features
+
+    @classmethod
+    def from_estimator(cls, estimator) -> 'FlatForest':
+        """Flatten a fitted RandomForestClassifier."""
+        trees = [tree.tree_ for tree in estimator.estimators_]
+        classes = estimator.classes_ if estimator.n_outputs_ > 1 else [estimator.classes_]
+        max_classes = max(len(c) for c in classes)
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        
+        left, right, feature, threshold, value = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count)
+            leaves = tree.children_left == -1
+            left.append(np.where(leaves, nodes, tree.children_left) + offset)
+            right.append(np.where(leaves, nodes, tree.children_right) + offset)
+            feature.append(np.where(leaves, -1, tree.feature))
+            threshold.append(tree.threshold)
+            # Older sklearn versions store class counts, newer ones proportions
+            tree_value = np.zeros((tree.node_count, len(classes), max_classes))
+            tree_value[:, :, :tree.value.shape[2]] = tree.value
+            totals = tree_value.sum(axis=2, keepdims=True)
+            value.append(np.divide(tree_value, totals, out=np.zeros_like(tree_value), where=totals > 0))
+        
+        return cls(
+            children_left=np.concatenate(left).astype(np.int32),
+            children_right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            value=np.concatenate(value),
+            roots=offsets[:-1].astype(np.int32),
+            classes=[np.asarray(c) for c in classes],
+            n_features=int(estimator.n_features_in_)
+        )
+
+    @classmethod
+    def concat(cls, forests: List['FlatForest']) -> 'FlatForest':
+        """
+        Join the trees of several forests into one, oldest first.
+        
+        Class labels are merged per output, so a forest fitted on newer data
+        may know classes the older ones never saw.
+        """
+        outputs = len(forests[0].classes)
+        if any(len(forest.classes) != outputs or forest.n_features != forests[0].n_features
+               for forest in forests):
+            raise ValueError("Forests differ in outputs or features")
+        classes = [
+            np.unique(np.concatenate([forest.classes[output] for forest in forests]))
+            for output in range(outputs)
+        ]
+        max_classes = max(len(c) for c in classes)
+        
+        left, right, feature, threshold, value, roots = [], [], [], [], [], []
+        offset = 0
+        for forest in forests:
+            node_count = len(forest.feature)
+            left.append(forest.children_left + offset)
+            right.append(forest.children_right + offset)
+            feature.append(forest.feature)
+            threshold.append(forest.threshold)
+            roots.append(forest.roots + offset)
+            # Move each output's class columns to their position in the merged labels
+            forest_value = np.zeros((node_count, outputs, max_classes))
+            for output in range(outputs):
+                positions = np.searchsorted(classes[output], forest.classes[output])
+                forest_value[:, output, positions] = forest.value[:, output, :len(positions)]
+            value.append(forest_value)
+            offset += node_count
+        
+        return cls(
+            children_left=np.concatenate(left).astype(np.int32),
+            children_right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold),
+            value=np.concatenate(value),
+            roots=np.concatenate(roots).astype(np.int32),
+            classes=classes,
+            n_features=forests[0].n_features
+        )
+        
+    def latest_trees(self, count: int) -> 'FlatForest':
+        """Return a forest of the last count trees, dropping the oldest."""
+        if count >= self.n_trees:
+            return self
+        # Trees are stored contiguously in order, so the kept ones are one tail of every array
+        start = int(self.roots[-count])
+        return FlatForest(
+            children_left=self.children_left[start:] - start,
+            children_right=self.children_right[start:] - start,
+            feature=np.array(self.feature[start:]),
+            threshold=np.array(self.threshold[start:]),
+            value=np.array(self.value[start:]),
+            roots=self.roots[-count:] - start,
+            classes=self.classes,
+            n_features=self.n_features
+        )
+        
+    def rescaled(self, old_mins: np.ndarray, old_ranges: np.ndarray,
+                 new_mins: np.ndarray, new_ranges: np.ndarray) -> 'FlatForest':
+        """
+        Return the forest for inputs min-max scaled with new parameters.
+        
+        Min-max scaling is monotonic per feature, so moving each threshold
+        through the old scaling and back through the new one keeps every
+        split on the same raw value.
+        
+        Args:
+            old_mins: Per-feature minimums the forest was trained with
+            old_ranges: Per-feature ranges the forest was trained with
+            new_mins: Per-feature minimums of the new scaling
+            new_ranges: Per-feature ranges of the new scaling
+        """
+        splits = self.feature >= 0
+        feature = self.feature[splits]
+        threshold = np.array(self.threshold, dtype=np.float64)
+        raw = threshold[splits] * old_ranges[feature] + old_mins[feature]
+        threshold[splits] = (raw - new_mins[feature]) / new_ranges[feature]
+        return FlatForest(
+            children_left=self.children_left,
+            children_right=self.children_right,
+            feature=self.feature,
+            threshold=threshold,
+            value=self.value,
+            roots=self.roots,
+            classes=self.classes,
+            n_features=self.n_features
+        )
+        
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the node arrays."""
+        return sum(array.nbytes for array in (
+            self.children_left, self.children_right, self.feature, self.threshold, self.value
+        ))
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf reached in every tree, shape (samples, trees)."""
+        samples, trees = len(X), self.n_trees
+        leaves = np.tile(self.roots, samples)
+        # Offset of each (sample, tree) pair's feature row in the flattened X
+        row_offsets = np.repeat(np.arange(samples, dtype=np.int64) * X.shape[1], trees)
+        features = np.ravel(X)
+        # Only pairs still at a split node are advanced, so shallow paths stop costing early
+        active = np.arange(samples * trees)
+        nodes = leaves.copy()
+        while active.size:
+            go_right = features[row_offsets[active] + self.feature[nodes]] > self.threshold[nodes]
+            nodes = np.where(go_right, self.children_right[nodes], self.children_left[nodes])
+            leaves[active] = nodes
+            splits = self.feature[nodes] >= 0
+            active, nodes = active[splits], nodes[splits]
+        return leaves.reshape(samples, trees)
+
+    def _sklearn_trees(self) -> List[Tree]:
+        """
+        Rebuild sklearn trees from the node arrays, once per loaded forest.
+
+        The rebuilt trees are private copies and are never pickled, so
+        processes that only score single rows keep sharing the memory-mapped
+        arrays.
+        """
+        trees = self.__dict__.get('_trees')
+        if trees is None:
+            n_classes = np.array([len(c) for c in self.classes], dtype=np.intp)
+            ends = np.append(self.roots[1:], len(self.feature))
+            trees = []
+            for start, end in zip(self.roots, ends):
+                start, end = int(start), int(end)
+                leaves = self.feature[start:end] < 0
+                nodes = np.zeros(end - start, dtype=NODE_DTYPE)
+                nodes['left_child'] = np.where(leaves, TREE_LEAF, self.children_left[start:end] - start)
+                nodes['right_child'] = np.where(leaves, TREE_LEAF, self.children_right[start:end] - start)
+                nodes['feature'] = np.where(leaves, TREE_UNDEFINED, self.feature[start:end])
+                nodes['threshold'] = self.threshold[start:end]
+                # NaN fails the > comparison of the numpy traversal, so it goes left there too
+                nodes['missing_go_to_left'] = 1
+                tree = Tree(self.n_features, n_classes, len(self.classes))
+                # max_depth only sizes sklearn's export helpers, not prediction
+                tree.__setstate__({
+                    'max_depth': 0,
+                    'node_count': end - start,
+                    'nodes': nodes,
+                    'values': np.ascontiguousarray(self.value[start:end], dtype=np.float64)
+                })
+                trees.append(tree)
+            self._trees = trees
+        return trees
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop('_trees', None)
+        return state
+
+    def predict_proba(self, X: np.ndarray, n_jobs: Optional[int] = None) -> np.ndarray:
+        """
+        Return mean class proportions, shape (samples, outputs, max classes).
+
+        Up to FLAT_PREDICT_MAX_ROWS samples walk the node arrays directly; larger
+        batches go through sklearn's compiled trees, on n_jobs threads like
+        RandomForestClassifier. Either way the proportions are summed one tree
+        at a time.
+
+        Args:
+            X: Feature matrix
+            n_jobs: Threads evaluating trees for large batches (-1 for all cores)
+        """
+        # sklearn compares float32 features with float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+        proba = np.zeros((len(X), len(self.classes), self.value.shape[2]))
+        if len(X) <= FLAT_PREDICT_MAX_ROWS:
+            for leaves in self._leaves(X).T:
+                proba += self.value[leaves]
+        else:
+            lock = threading.Lock()
+            Parallel(n_jobs=n_jobs, prefer='threads', require='sharedmem')(
+                delayed(_accumulate)(tree, X, proba, lock) for tree in self._sklearn_trees()
+            )
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X: np.ndarray, n_jobs: Optional[int] = None) -> np.ndarray:
+        """
+        Predict class labels like RandomForestClassifier.predict.
+        
+        Args:
+            X: Feature matrix
+            n_jobs: Threads evaluating trees for large batches (-1 for all cores)
+        
+        Returns:
+            Labels of shape (samples, outputs), or (samples,) for a single output
+        """
+        best = self.predict_proba(X, n_jobs).argmax(axis=2)
+        predictions = np.column_stack([
+            classes[best[:, output]] for output, classes in enumerate(self.classes)
+        ])
+        return predictions[:, 0] if len(self.classes) == 1 else predictions
+
+    def score(self, X: np.ndarray, y: np.ndarray) -> float:
+        """Return the share of samples with every output predicted correctly."""
+        predictions = self.predict(X).reshape(len(X), -1)
+        return float(np.mean(np.all(predictions == np.asarray(y).reshape(len(X), -1), axis=1)))
+
+def _accumulate(tree: Tree, X: np.ndarray, proba: np.ndarray, lock: threading.Lock):
+    """Add one tree's leaf proportions to proba; the traversal itself releases the GIL."""
+    # Single-output trees drop the outputs axis
+    values = tree.predict(X).reshape(proba.shape)
+    with lock:
+        proba += values
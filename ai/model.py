@@ -1,83 +1,451 @@
 import numpy as np
+import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 import joblib
-from typing import Dict, List, Any
+from dataclasses import dataclass, field
+from datetime import datetime
+from operator import itemgetter
+from typing import Dict, List, Any, Optional, Union
+import json
 import os
+import re
+import threading
+from .forest import FlatForest
+from .scaler import FeatureScaler
+
+FeatureInput = Union[pd.DataFrame, np.ndarray, List[Dict[str, Any]]]
+
+@dataclass
+class ModelArtifact:
+    """A trained model together with everything needed to score inputs with it"""
+    version: int
+    model: FlatForest
+    feature_names: Optional[List[str]]  # training column order
+    scaler: Optional[FeatureScaler]  # normalization the model was trained with
+    metrics: Dict[str, float] = field(default_factory=dict)
+    created_at: datetime = field(default_factory=datetime.now)
 
 class AIModel:
-    def __init__(self, model_path: str = "ai_model.joblib"):
+    def __init__(self, model_path: str = "ai_model.joblib", keep_versions: int = 5,
+                 mmap_mode: Optional[str] = 'r', training_n_jobs: Optional[int] = None):
         """
         Initialize the AI model.
         
         Args:
-            model_path: Path to save/load the model
+            model_path: Path of the model; versions are kept in <model>_versions/
+            keep_versions: Number of published versions kept on disk for rollback
+            mmap_mode: joblib mmap mode for loading tree arrays ('r' shares the
+                       file's pages between processes, None reads a private copy)
+            training_n_jobs: Cores used to fit trees (-1 for all cores)
         """
         self.model_path = model_path
-        self.model = RandomForestClassifier(
+        self.versions_dir = f"{os.path.splitext(model_path)[0]}_versions"
+        self.keep_versions = keep_versions
+        self.mmap_mode = mmap_mode
+        self.training_n_jobs = training_n_jobs
+        # Live artifact; replaced by a single reference assignment, so readers never lock
+        self._artifact: Optional[ModelArtifact] = None
+        # Saved model found at startup but not read until the first prediction
+        self._pending_path: Optional[str] = None
+        self._load_lock = threading.Lock()
+        self.load_model_if_exists()
+        
+    @property
+    def current(self) -> Optional[ModelArtifact]:
+        """The live model artifact, or None before the first training."""
+        artifact = self._artifact
+        if artifact is None and self._pending_path is not None:
+            artifact = self._load_pending()
+        return artifact
+        
+    def _load_pending(self) -> Optional[ModelArtifact]:
+        """Load the model located by load_model_if_exists(), once, on first use."""
+        with self._load_lock:
+            path = self._pending_path
+            if self._artifact is None and path is not None:
+                if path == self.model_path:
+                    self._artifact = self._load_legacy()
+                else:
+                    self._artifact = self._load_artifact(path)
+                self._pending_path = None
+            return self._artifact
+        
+    @property
+    def model(self) -> Optional[FlatForest]:
+        """The live forest, or None before the first training."""
+        artifact = self.current
+        return artifact.model if artifact is not None else None
+        
+    @property
+    def feature_names(self) -> Optional[List[str]]:
+        """Feature column order of the live model."""
+        artifact = self.current
+        return artifact.feature_names if artifact is not None else None
+        
+    def _new_estimator(self) -> RandomForestClassifier:
+        return RandomForestClassifier(
             n_estimators=100,
             max_depth=None,
             min_samples_split=2,
             min_samples_leaf=1,
-            random_state=42
+            random_state=42,
+            n_jobs=self.training_n_jobs
+        )
+        
+    def _version_path(self, version: int) -> str:
+        return os.path.join(self.versions_dir, f"v{version:04d}.joblib")
+        
+    @property
+    def _current_pointer(self) -> str:
+        return os.path.join(self.versions_dir, "CURRENT")
+        
+    def versions(self) -> List[int]:
+        """Return the versions stored on disk, oldest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            int(match.group(1))
+            for match in (re.fullmatch(r"v(\d+)\.joblib", name) for name in os.listdir(self.versions_dir))
+            if match
         )
-        self.load_model_if_exists()
         
     def load_model_if_exists(self):
-        """Load the model if it exists at the specified path."""
+        """Locate the published version, or a model saved before versioning; it is loaded on first use."""
+        self._artifact = None
+        self._pending_path = self.artifact_path()
+        
+    def artifact_path(self) -> Optional[str]:
+        """Return the file of the published model, or None if nothing was saved."""
+        version = self.published_version()
+        if version is not None:
+            return self._version_path(version)
         if os.path.exists(self.model_path):
-            self.model = joblib.load(self.model_path)
+            return self.model_path
+        return None
+        
+    def published_version(self) -> Optional[int]:
+        """Return the version CURRENT points at, which another process may have published."""
+        if not os.path.exists(self._current_pointer):
+            return None
+        with open(self._current_pointer) as f:
+            return int(f.read().strip())
+        
+    def refresh(self) -> Optional[ModelArtifact]:
+        """
+        Make the published version live if it differs from the live one,
+        e.g. after a training process published a new model.
+        
+        Returns:
+            The live artifact
+        """
+        version = self.published_version()
+        current = self.current
+        if version is None or (current is not None and current.version == version):
+            return current
+        artifact = self._load_artifact(self._version_path(version))
+        with self._load_lock:
+            self._pending_path = None
+            self._artifact = artifact
+        return artifact
             
+    def _load_artifact(self, path: str) -> ModelArtifact:
+        """Load a version file; with mmap_mode the forest's node arrays stay file-backed."""
+        artifact = joblib.load(path, mmap_mode=self.mmap_mode)
+        if not isinstance(artifact.model, FlatForest):
+            # Versions saved with the sklearn estimator itself
+            artifact.model = FlatForest.from_estimator(artifact.model)
+        if 'scaler' not in vars(artifact):
+            # Versions saved with min/max dictionaries instead of a scaler
+            params = vars(artifact)
+            mins, maxs = params.pop('feature_mins', {}), params.pop('feature_maxs', {})
+            artifact.scaler = FeatureScaler.from_min_max(mins, maxs) if mins else None
+        return artifact
+        
+    def _load_legacy(self) -> ModelArtifact:
+        """Wrap a bare estimator saved at model_path, with its .features.json schema if present."""
+        schema_path = f"{os.path.splitext(self.model_path)[0]}.features.json"
+        feature_names = None
+        if os.path.exists(schema_path):
+            with open(schema_path) as f:
+                feature_names = json.load(f)['feature_names']
+        return ModelArtifact(
+            version=0,
+            model=FlatForest.from_estimator(joblib.load(self.model_path)),
+            feature_names=feature_names,
+            scaler=None
+        )
+        
     def save_model(self):
-        """Save the current model to disk."""
-        joblib.dump(self.model, self.model_path)
+        """Save the live artifact to its version file and mark it as current."""
+        artifact = self.current
+        if artifact is None:
+            raise Exception("No trained model to save")
+        self._save(artifact)
+        
+    def _save(self, artifact: ModelArtifact):
+        """Write an artifact's version file if missing, then point CURRENT at it atomically."""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        path = self._version_path(artifact.version)
+        if not os.path.exists(path):
+            # Uncompressed, so the tree arrays can be memory-mapped on load
+            joblib.dump(artifact, f"{path}.tmp", compress=0)
+            os.replace(f"{path}.tmp", path)
+        with open(f"{self._current_pointer}.tmp", 'w') as f:
+            f.write(str(artifact.version))
+        os.replace(f"{self._current_pointer}.tmp", self._current_pointer)
+        
+    def fit_candidate(self, input_vectors: FeatureInput, output_labels: Union[np.ndarray, List[List[float]]],
+                      scaler: Optional[FeatureScaler] = None) -> ModelArtifact:
+        """
+        Train a fresh estimator without touching the live model.
+        
+        Args:
+            input_vectors: DataFrame of normalized input features (or a list of feature dictionaries)
+            output_labels: Array or list of output label lists
+            scaler: Scaler the inputs were normalized with
+        
+        Returns:
+            Unpublished ModelArtifact with the next version number
+        """
+        feature_names = self._training_feature_names(input_vectors)
+        X = self._convert_to_feature_matrix(input_vectors, feature_names)
+        y = np.asarray(output_labels, dtype=np.float64)
         
-    def train(self, input_vectors: List[Dict[str, Any]], output_labels: List[List[float]]):
+        estimator = self._new_estimator()
+        estimator.fit(X, y)
+        return ModelArtifact(
+            version=self._next_version(),
+            model=FlatForest.from_estimator(estimator),
+            feature_names=feature_names,
+            scaler=scaler,
+            metrics={'training_rows': float(len(X))}
+        )
+        
+    def extend_candidate(self, input_vectors: FeatureInput, output_labels: Union[np.ndarray, List[List[float]]],
+                         scaler: FeatureScaler, new_trees: int, max_trees: int) -> ModelArtifact:
         """
-        Train the model on the provided data.
+        Warm-start the live model: fit a few new trees and add them to its forest.
+        
+        The live forest's thresholds are moved to the new scaler, so its trees
+        keep splitting on the same raw values, and the oldest trees beyond
+        max_trees are retired. The live model itself is not touched.
         
         Args:
-            input_vectors: List of input feature dictionaries
-            output_labels: List of output label lists
+            input_vectors: DataFrame of input features normalized with scaler
+            output_labels: Array or list of output label lists
+            scaler: Scaler the inputs were normalized with
+            new_trees: Number of trees to fit
+            max_trees: Largest forest to keep
+            
+        Returns:
+            Unpublished ModelArtifact with the next version number
         """
-        # Convert input dictionaries to feature matrix
-        X = self._convert_to_feature_matrix(input_vectors)
-        y = np.array(output_labels)
+        current = self.current
+        if current is None or current.scaler is None:
+            raise Exception("Incremental training needs a live model with a scaler; run a full retrain")
+        feature_names = self._training_feature_names(input_vectors)
+        if feature_names != current.feature_names:
+            raise Exception("Feature schema changed since the live model; run a full retrain")
+        X = self._convert_to_feature_matrix(input_vectors, feature_names)
+        y = np.asarray(output_labels, dtype=np.float64)
         
-        # Train the model
-        self.model.fit(X, y)
-        self.save_model()
+        version = self._next_version()
+        estimator = self._new_estimator()
+        # A different seed per version, so added trees differ from earlier ones
+        estimator.set_params(n_estimators=new_trees, random_state=version)
+        estimator.fit(X, y)
         
-    def predict(self, input_vector: Dict[str, Any]) -> List[float]:
+        old_mins, old_ranges = current.scaler.aligned(feature_names)
+        new_mins, new_ranges = scaler.aligned(feature_names)
+        base = current.model.rescaled(old_mins, old_ranges, new_mins, new_ranges)
+        forest = FlatForest.concat([base, FlatForest.from_estimator(estimator)]).latest_trees(max_trees)
+        return ModelArtifact(
+            version=version,
+            model=forest,
+            feature_names=feature_names,
+            scaler=scaler,
+            metrics={'training_rows': float(len(X)), 'new_trees': float(new_trees),
+                     'trees': float(forest.n_trees)}
+        )
+        
+    def _next_version(self) -> int:
+        current = self.current
+        return max(self.versions() + [current.version if current else 0]) + 1
+        
+    def score(self, artifact: ModelArtifact, input_vectors: FeatureInput,
+              output_labels: Union[np.ndarray, List[List[float]]],
+              scaler: Optional[FeatureScaler] = None) -> float:
+        """
+        Score an artifact on raw labelled data, normalized with the artifact's scaler.
+        
+        Args:
+            artifact: Artifact to score
+            input_vectors: Raw input features
+            output_labels: Array or list of output label lists
+            scaler: Scaler for artifacts saved without one
+        
+        Returns:
+            Subset accuracy of the artifact's predictions
+        """
+        X = self.feature_matrix(input_vectors, artifact, scaler)
+        return float(artifact.model.score(X, np.asarray(output_labels, dtype=np.float64)))
+        
+    def feature_matrix(self, input_vectors: FeatureInput, artifact: Optional[ModelArtifact] = None,
+                       scaler: Optional[FeatureScaler] = None) -> np.ndarray:
+        """
+        Build the normalized feature matrix an artifact predicts from.
+        
+        Args:
+            input_vectors: Raw DataFrame, list of input feature dictionaries, or
+                           an array in schema column order
+            artifact: Artifact whose schema and scaler to use; defaults to the live one
+            scaler: Scaler for artifacts saved without one
+            
+        Returns:
+            Numpy array of normalized features
+        """
+        artifact = artifact or self.current
+        feature_names = self._resolve_feature_names(
+            input_vectors, artifact.feature_names if artifact is not None else None
+        )
+        X = self._convert_to_feature_matrix(input_vectors, feature_names)
+        scaler = (artifact.scaler if artifact is not None else None) or scaler
+        if scaler is None:
+            raise Exception("No normalization parameters for the model; train it first")
+        return scaler.transform_matrix(X, feature_names)
+        
+    def publish(self, artifact: ModelArtifact):
+        """Persist an artifact and make it the live model."""
+        self._save(artifact)
+        # Writers serialize with a pending lazy load so it cannot overwrite the swap
+        with self._load_lock:
+            self._pending_path = None
+            self._artifact = artifact
+        self._prune_versions()
+        
+    def rollback(self, version: Optional[int] = None) -> ModelArtifact:
+        """
+        Make an earlier published version live again.
+        
+        Args:
+            version: Version to restore; defaults to the one before the live version
+        
+        Returns:
+            The restored artifact
+        """
+        current = self.current
+        if version is None:
+            older = [v for v in self.versions() if current is None or v < current.version]
+            if not older:
+                raise Exception("No earlier model version to roll back to")
+            version = older[-1]
+        path = self._version_path(version)
+        if not os.path.exists(path):
+            raise Exception(f"Model version {version} not found in {self.versions_dir}")
+        artifact = self._load_artifact(path)
+        self._save(artifact)
+        with self._load_lock:
+            self._pending_path = None
+            self._artifact = artifact
+        return artifact
+        
+    def _prune_versions(self):
+        """Delete the oldest version files beyond keep_versions, never the live one."""
+        current = self.current
+        for version in self.versions()[:-self.keep_versions]:
+            if current is None or version != current.version:
+                os.remove(self._version_path(version))
+        
+    def train(self, input_vectors: FeatureInput, output_labels: Union[np.ndarray, List[List[float]]],
+              scaler: Optional[FeatureScaler] = None):
+        """
+        Train a new model on the provided data and publish it unconditionally.
+        
+        Args:
+            input_vectors: DataFrame of input features (or a list of feature dictionaries)
+            output_labels: Array or list of output label lists
+            scaler: Scaler the inputs were normalized with
+        """
+        self.publish(self.fit_candidate(input_vectors, output_labels, scaler))
+        
+    def predict(self, input_vector: Dict[str, Any], artifact: Optional[ModelArtifact] = None) -> List[float]:
         """
         Make predictions for a single input vector.
         
         Args:
             input_vector: Dictionary of input features
-            
+            artifact: Artifact to predict with; defaults to the live one
+        
         Returns:
             List of predicted values
         """
-        X = self._convert_to_feature_matrix([input_vector])
-        predictions = self.model.predict(X)
+        artifact = artifact or self.current
+        if artifact is None:
+            raise Exception("Model has not been trained")
+        X = self._convert_to_feature_matrix([input_vector], artifact.feature_names)
+        predictions = artifact.model.predict(X)
         return predictions[0].tolist()
-    
-    def _convert_to_feature_matrix(self, input_vectors: List[Dict[str, Any]]) -> np.ndarray:
+        
+    def predict_batch(self, input_vectors: FeatureInput, n_jobs: Optional[int] = None,
+                      artifact: Optional[ModelArtifact] = None) -> np.ndarray:
         """
-        Convert a list of input dictionaries to a numpy feature matrix.
+        Make predictions for many input vectors with a single predict call.
         
         Args:
-            input_vectors: List of input feature dictionaries
+            input_vectors: DataFrame, list of input feature dictionaries, or an
+                           array in schema column order
+            n_jobs: Threads used to evaluate the trees (-1 for all cores)
+            artifact: Artifact to predict with; defaults to the live one
+        
+        Returns:
+            Numpy array with one row of predicted values per input
+        """
+        artifact = artifact or self.current
+        if artifact is None:
+            raise Exception("Model has not been trained")
+        X = self._convert_to_feature_matrix(input_vectors, artifact.feature_names)
+        return artifact.model.predict(X, n_jobs)
+        
+    def _training_feature_names(self, input_vectors: FeatureInput) -> Optional[List[str]]:
+        """The training columns, which become the fixed schema for all predictions with the model."""
+        if isinstance(input_vectors, pd.DataFrame):
+            return [str(column) for column in input_vectors.columns]
+        if isinstance(input_vectors, list):
+            return list(input_vectors[0].keys())
+        return self.feature_names
+        
+    def _resolve_feature_names(self, input_vectors: FeatureInput,
+                               feature_names: Optional[List[str]] = None) -> List[str]:
+        """Return the schema column order, falling back to the input's own columns."""
+        feature_names = feature_names or self.feature_names
+        if feature_names is not None:
+            return feature_names
+        if isinstance(input_vectors, pd.DataFrame):
+            return [str(column) for column in input_vectors.columns]
+        if isinstance(input_vectors, np.ndarray):
+            raise Exception("Array input needs a model with a feature schema")
+        return list(input_vectors[0].keys())
+        
+    def _convert_to_feature_matrix(self, input_vectors: FeatureInput,
+                                   feature_names: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Convert input features to a numpy feature matrix in schema column order.
+        
+        Args:
+            input_vectors: DataFrame, list of input feature dictionaries, or an
+                           array already in schema column order
+            feature_names: Schema column order; defaults to the live model's
             
         Returns:
             Numpy array of features
         """
-        # Get all feature names from the first dictionary
-        feature_names = list(input_vectors[0].keys())
+        if isinstance(input_vectors, np.ndarray):
+            return np.asarray(input_vectors, dtype=np.float64).reshape(len(input_vectors), -1)
+        
+        feature_names = self._resolve_feature_names(input_vectors, feature_names)
+        if isinstance(input_vectors, pd.DataFrame):
+            return input_vectors[feature_names].to_numpy(dtype=np.float64)
         
-        # Create the feature matrix
-        X = np.zeros((len(input_vectors), len(feature_names)))
-        for i, vector in enumerate(input_vectors):
-            for j, feature in enumerate(feature_names):
-                X[i, j] = float(vector[feature])
-                
-        return X 
\ No newline at end of file
+        # One C-level itemgetter call per row instead of a Python loop per cell
+        rows = map(itemgetter(*feature_names), input_vectors)
+        return np.array(list(rows), dtype=np.float64).reshape(len(input_vectors), len(feature_names))
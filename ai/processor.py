@@ -1,7 +1,17 @@
-from typing import Dict, List, Any
+from dataclasses import dataclass
+from typing import Dict, List, Any, Union
+import numpy as np
+import pandas as pd
 from .model import AIModel
 from .data_organizer import DataOrganizer
 
+@dataclass
+class BatchRecommendations:
+    """Recommendations for a batch of inputs and how long scoring took"""
+    recommendations: List[List[Dict[str, Any]]]  # one recommendation list per input
+    batch_size: int
+    latency_ms: float  # organize + normalize + predict for the whole batch
+
 class RequestProcessor:
     def __init__(self, model: AIModel, data_organizer: DataOrganizer):
         """
@@ -24,16 +34,38 @@ class RequestProcessor:
         Returns:
             List of recommendations
         """
+        # Normalize and predict with one artifact, even if a new model is swapped in meanwhile
+        artifact = self.model.current
+        
         # Organize the input data
         organized_data = self.data_organizer.organize_live_data(input_data)
         
-        # Normalize the data
-        normalized_data = self.data_organizer.normalize_data(organized_data)
+        # Normalize the data with the model's own scaler
+        X = self.model.feature_matrix([organized_data], artifact, self.data_organizer.scaler)
         
         # Get predictions from the model
-        predictions = self.model.predict(normalized_data)
+        predictions = self.model.predict_batch(X, None, artifact)
+        
+        return predictions[0].tolist()
+    
+    def process_batch(self, input_data: Union[pd.DataFrame, np.ndarray, List[Dict[str, Any]]],
+                      n_jobs: int = None) -> np.ndarray:
+        """
+        Process many live requests with one vectorized predict call.
         
-        return predictions
+        Args:
+            input_data: DataFrame, list of input dictionaries, or an array in
+                        the model's feature order
+            n_jobs: Threads used by the model's predict (-1 for all cores)
+            
+        Returns:
+            Array with one row of predictions per input
+        """
+        artifact = self.model.current
+        feature_names = artifact.feature_names if artifact is not None else None
+        organized = self.data_organizer.organize_live_batch(input_data, feature_names)
+        X = self.model.feature_matrix(organized, artifact, self.data_organizer.scaler)
+        return self.model.predict_batch(X, n_jobs, artifact)
     
     def format_recommendations(self, predictions: List[float]) -> List[Dict[str, Any]]:
         """
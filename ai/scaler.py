@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+# Added to every range so constant features do not divide by zero
+RANGE_EPSILON = 1e-8
+
+class FeatureScaler:
+    """
+    Min-max scaler over named numeric features.
+
+    Parameters are kept as arrays aligned with feature_names, so scaling a
+    matrix is one subtract and one divide. The scaler pickles with the model
+    artifact and can be rebuilt from to_dict() output.
+    """
+
+    def __init__(self, feature_names: Optional[List[str]] = None,
+                 mins: Optional[np.ndarray] = None, maxs: Optional[np.ndarray] = None,
+                 rows_seen: int = 0):
+        """
+        Args:
+            feature_names: Names of the scaled features
+            mins: Minimum of each feature
+            maxs: Maximum of each feature
+            rows_seen: Number of rows the parameters were computed from
+        """
+        self.feature_names = list(feature_names or [])
+        self.mins = np.asarray(mins if mins is not None else [], dtype=np.float64)
+        self.maxs = np.asarray(maxs if maxs is not None else [], dtype=np.float64)
+        self.rows_seen = rows_seen
+        self._index = {name: i for i, name in enumerate(self.feature_names)}
+
+    @classmethod
+    def fit(cls, data: Union[pd.DataFrame, List[Dict[str, Any]]]) -> 'FeatureScaler':
+        """Compute parameters from the numeric (and boolean) columns of the data."""
+        return cls().partial_fit(data)
+
+    @classmethod
+    def from_dict(cls, params: Dict[str, Any]) -> 'FeatureScaler':
+        """Rebuild a scaler from to_dict() output."""
+        return cls(params['feature_names'], params['mins'], params['maxs'], params.get('rows_seen', 0))
+
+    @classmethod
+    def from_min_max(cls, feature_mins: Dict[str, float], feature_maxs: Dict[str, float]) -> 'FeatureScaler':
+        """Build a scaler from per-feature minimum and maximum dictionaries."""
+        names = list(feature_mins)
+        return cls(names, [feature_mins[n] for n in names], [feature_maxs[n] for n in names])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the parameters as JSON-serializable values."""
+        return {
+            'feature_names': self.feature_names,
+            'mins': self.mins.tolist(),
+            'maxs': self.maxs.tolist(),
+            'rows_seen': self.rows_seen
+        }
+
+    @property
+    def feature_mins(self) -> Dict[str, float]:
+        return dict(zip(self.feature_names, self.mins.tolist()))
+
+    @property
+    def feature_maxs(self) -> Dict[str, float]:
+        return dict(zip(self.feature_names, self.maxs.tolist()))
+
+    def partial_fit(self, data: Union[pd.DataFrame, List[Dict[str, Any]]]) -> 'FeatureScaler':
+        """
+        Widen the parameters to cover another batch of rows.
+
+        Features not seen before are added; existing minimums and maximums
+        only ever move outwards, so rows can be streamed in any order.
+
+        Args:
+            data: DataFrame (or list of dictionaries) of training features
+
+        Returns:
+            The scaler itself
+        """
+        if not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame(data)
+        # Booleans are ints to isinstance() in transform_dict, so they get parameters too
+        numeric = data.select_dtypes(include=['number', 'bool']).astype(np.float64)
+        if numeric.empty:
+            return self
+        batch_mins = numeric.min().to_numpy()
+        batch_maxs = numeric.max().to_numpy()
+
+        new_names = [str(name) for name in numeric.columns if str(name) not in self._index]
+        if new_names:
+            self.feature_names.extend(new_names)
+            self._index = {name: i for i, name in enumerate(self.feature_names)}
+            self.mins = np.concatenate([self.mins, np.full(len(new_names), np.inf)])
+            self.maxs = np.concatenate([self.maxs, np.full(len(new_names), -np.inf)])
+        positions = np.array([self._index[str(name)] for name in numeric.columns])
+        # fmin/fmax skip the NaN of all-null batches
+        self.mins[positions] = np.fmin(self.mins[positions], batch_mins)
+        self.maxs[positions] = np.fmax(self.maxs[positions], batch_maxs)
+        self.rows_seen += len(numeric)
+        return self
+
+    def aligned(self, columns: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (mins, ranges) for the given columns; unknown ones scale by (x - 0) / 1."""
+        mins = np.zeros(len(columns))
+        maxs = np.ones(len(columns))
+        for i, column in enumerate(columns):
+            position = self._index.get(column)
+            if position is not None:
+                mins[i] = self.mins[position]
+                maxs[i] = self.maxs[position]
+        return mins, maxs - mins + RANGE_EPSILON
+
+    def transform_matrix(self, X: np.ndarray, columns: List[str]) -> np.ndarray:
+        """
+        Scale a feature matrix whose columns follow the given names.
+
+        Args:
+            X: Feature matrix
+            columns: Name of each column of X
+
+        Returns:
+            Scaled copy of X
+        """
+        mins, ranges = self.aligned(columns)
+        return (np.asarray(X, dtype=np.float64) - mins) / ranges
+
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Scale the known feature columns of a DataFrame; other columns are left unchanged."""
+        columns = [column for column in data.columns if column in self._index]
+        normalized = data.copy()
+        if columns:
+            normalized[columns] = self.transform_matrix(data[columns].to_numpy(dtype=np.float64), columns)
+        return normalized
+
+    def transform_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Scale the numeric values of a single input dictionary."""
+        normalized_data = {}
+        for key, value in data.items():
+            if isinstance(value, (int, float)):
+                position = self._index.get(key)
+                low, high = (self.mins[position], self.maxs[position]) if position is not None else (0, 1)
+                normalized_data[key] = (value - low) / (high - low + RANGE_EPSILON)
+            else:
+                normalized_data[key] = value
+        return normalized_data
@@ -1,13 +1,20 @@
-from typing import Dict, Any
-import schedule
-import time
-import threading
-from .model import AIModel
+from typing import Dict, Any, Callable, Optional
+import numpy as np
+import pandas as pd
+from utils.scheduler import Scheduler
+from .model import AIModel, ModelArtifact
 from .data_organizer import DataOrganizer
+from .window import TrainingWindow
+from .worker import TrainingProgress, TrainingWorker
+import os
 
 class ModelTrainer:
     def __init__(self, model: AIModel, data_organizer: DataOrganizer, 
-                 training_query: str, training_interval_hours: int = 24):
+                 training_query: str, training_interval_hours: int = 24,
+                 validation_fraction: float = 0.2, incremental_query: Optional[str] = None,
+                 window_rows: int = 50000, max_trees: int = 200,
+                 worker: Optional[TrainingWorker] = None, scheduler: Optional[Scheduler] = None,
+                 jitter_minutes: float = 5):
         """
         Initialize the model trainer.
         
@@ -16,66 +23,295 @@ class ModelTrainer:
             data_organizer: Instance of DataOrganizer
             training_query: SQL query to fetch training data
             training_interval_hours: Hours between training sessions
+            validation_fraction: Share of rows held out to compare a new model with the live one
+            incremental_query: SQL query for rows newer than %(since)s; enables
+                               incremental training when given
+            window_rows: Most recent rows kept on disk for incremental training
+            max_trees: Largest forest incremental training grows to before
+                       retiring the oldest trees
+            worker: Runs each training iteration in a separate process; without
+                    one, training runs in the calling thread
+            scheduler: Scheduler shared with other periodic jobs; by default the
+                       trainer starts its own
+            jitter_minutes: Random delay added to each scheduled run, so trainers
+                            sharing an interval do not all start together
         """
         self.model = model
         self.data_organizer = data_organizer
         self.training_query = training_query
         self.training_interval_hours = training_interval_hours
-        self._stop_event = threading.Event()
+        self.validation_fraction = validation_fraction
+        self.incremental_query = incremental_query
+        self.max_trees = max_trees
+        self.window_rows = window_rows
+        self.worker = worker
+        # The worker process keeps its own window, so it is only loaded here when training in-thread
+        self.window = TrainingWindow(
+            os.path.join(model.versions_dir, "window.joblib"), window_rows
+        ) if incremental_query and worker is None else None
+        # Called with (stage, fraction, message) as training advances
+        self.progress: Optional[Callable[[str, float, str], None]] = None
+        # Called without arguments from the training thread when an iteration starts
+        self.started: Optional[Callable[[], None]] = None
+        self._progress = TrainingProgress('idle', 0.0)
+        self.jitter_minutes = jitter_minutes
+        self.scheduler = scheduler
+        self._owns_scheduler = scheduler is None
+        # One job per model, so trainers of several accounts can share a scheduler
+        self.job_name = f"train:{model.model_path}"
         
     def start_training_schedule(self):
-        """Start the scheduled training process in a separate thread."""
-        schedule.every(self.training_interval_hours).hours.do(self.train_model)
-        
-        def run_schedule():
-            while not self._stop_event.is_set():
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
-                
-        self.schedule_thread = threading.Thread(target=run_schedule)
-        self.schedule_thread.start()
+        """Register periodic training with the scheduler and start it."""
+        if self.scheduler is None:
+            self.scheduler = Scheduler(max_workers=1, name="ModelTrainer")
+        # A run missed while the machine slept happens once on wake-up; runs never overlap
+        self.scheduler.add_job(
+            self.job_name,
+            self.train_model,
+            self.training_interval_hours * 3600,
+            jitter_seconds=self.jitter_minutes * 60,
+            missed='run_once',
+            max_instances=1
+        )
+        self.scheduler.start()
         
     def stop_training_schedule(self):
-        """Stop the scheduled training process."""
-        self._stop_event.set()
-        if hasattr(self, 'schedule_thread'):
-            self.schedule_thread.join()
+        """Stop scheduled training and cancel an iteration running in the worker process."""
+        if self.scheduler is None:
+            return
+        self.scheduler.remove_job(self.job_name)
+        self.cancel_training()
+        if self._owns_scheduler:
+            self.scheduler.stop()
             
-    def train_model(self):
+    def train_model(self, full: Optional[bool] = None):
         """
         Perform one training iteration.
         
+        Incremental trainers fit new trees for the rows added since the last
+        watermark and train them on the rolling window; they fall back to a
+        full retrain until a live model and a window exist. Either way the
+        new model is published only if it scores better than the live one
+        on held-out rows.
+        
+        Args:
+            full: Force a full retrain (True) or an incremental one (False);
+                  defaults to incremental when an incremental query is set
+        
         Returns:
             bool: True if training was successful
         """
+        if self.started is not None:
+            self.started()
+        if self.worker is not None:
+            return self._train_in_worker(full)
         try:
-            # Fetch and organize training data
-            input_vectors, output_labels = self.data_organizer.fetch_training_data(
-                self.training_query
-            )
-            
-            # Update normalization parameters
-            self.data_organizer.update_normalization_params(input_vectors)
-            
-            # Normalize input vectors
-            normalized_vectors = [
-                self.data_organizer.normalize_data(vector)
-                for vector in input_vectors
-            ]
+            if full is None:
+                full = self.window is None
+            if not full and (self.window is None or self.window.watermark is None
+                             or self.model.current is None):
+                full = True
+            return self._train_full() if full else self._train_incremental()
             
-            # Train the model
-            self.model.train(normalized_vectors, output_labels)
-            return True
+        except Exception as e:
+            print(f"Training failed: {str(e)}")
+            self._report('failed', 1.0, str(e))
+            return False
             
+    def _train_in_worker(self, full: Optional[bool]) -> bool:
+        """Train in the worker process, then make the model it published live here."""
+        try:
+            succeeded = self.worker.run(_train_in_process, (self._process_settings(), full))
         except Exception as e:
             print(f"Training failed: {str(e)}")
             return False
+        artifact = self.model.refresh()
+        if artifact is not None and artifact.scaler is not None:
+            self.data_organizer.scaler = artifact.scaler
+        if not succeeded:
+            print(f"Training failed: {self.worker.progress().message}")
+        return succeeded
+        
+    def _process_settings(self) -> Dict[str, Any]:
+        """Everything a worker process needs to rebuild this trainer."""
+        return {
+            'db_config': self.data_organizer.db_config,
+            'model_path': self.model.model_path,
+            'keep_versions': self.model.keep_versions,
+            'n_jobs': self.worker.n_jobs,
+            'training_query': self.training_query,
+            'validation_fraction': self.validation_fraction,
+            'incremental_query': self.incremental_query,
+            'window_rows': self.window_rows,
+            'max_trees': self.max_trees
+        }
+        
+    def cancel_training(self) -> bool:
+        """
+        Cancel a training iteration running in the worker process.
+        
+        Returns:
+            bool: True if one was running
+        """
+        return self.worker is not None and self.worker.cancel()
+        
+    def training_progress(self) -> TrainingProgress:
+        """Return the progress of the current or last training iteration."""
+        return self.worker.progress() if self.worker is not None else self._progress
+        
+    def _report(self, stage: str, fraction: float, message: str = ''):
+        self._progress = TrainingProgress(stage, fraction, message)
+        if self.progress is not None:
+            self.progress(stage, fraction, message)
+            
+    def _split(self, row_count: int):
+        """Return (training rows, validation rows) positions."""
+        order = np.random.default_rng(42).permutation(row_count)
+        validation_count = int(row_count * self.validation_fraction)
+        return order[validation_count:], order[:validation_count]
+        
+    def _train_full(self) -> bool:
+        # Fetch and organize training data
+        self._report('fetching', 0.0)
+        input_features, output_labels, sample_times = self.data_organizer.fetch_training_rows(
+            self.training_query
+        )
+        
+        # Hold out validation rows
+        training_rows, validation_rows = self._split(len(input_features))
+        training_features = input_features.iloc[training_rows]
+        
+        # Fit the candidate's normalization parameters; the live ones change only on publish
+        scaler = self.data_organizer.fit_scaler(training_features)
+        
+        # Train a candidate without touching the live model
+        self._report('fitting', 0.2)
+        candidate = self.model.fit_candidate(
+            self.data_organizer.normalize_frame(training_features, scaler),
+            output_labels[training_rows],
+            scaler
+        )
+        self._publish_if_better(
+            candidate, input_features.iloc[validation_rows], output_labels[validation_rows]
+        )
+        
+        # Restart the rolling window from the full fetch
+        if self.window is not None and sample_times is not None:
+            self._report('saving window', 0.95)
+            self.window.reset(input_features, output_labels, sample_times)
+            self.window.save()
+        self._report('done', 1.0)
+        return True
+        
+    def _train_incremental(self) -> bool:
+        # Fetch only the rows added since the newest row in the window
+        self._report('fetching', 0.0)
+        new_features, new_labels, new_times = self.data_organizer.fetch_training_rows(
+            self.incremental_query, {'since': self.window.watermark}
+        )
+        if len(new_features) == 0:
+            self._report('done', 1.0, "No new rows")
+            return True
+        if new_times is None:
+            raise Exception("The incremental query must select a sample_time column")
+        
+        training_rows, validation_rows = self._split(len(new_features))
+        window_features, window_labels = self.window.rows()
+        training_features = pd.concat(
+            [window_features, new_features.iloc[training_rows]], ignore_index=True
+        )
+        training_labels = np.concatenate([window_labels, new_labels[training_rows]])
+        
+        # Widen a copy of the live model's normalization parameters with the new rows only
+        scaler = self.data_organizer.fit_scaler(
+            new_features.iloc[training_rows], self.model.current.scaler
+        )
+        
+        # New trees in proportion to the new rows, so the cost follows the data added
+        new_trees = int(np.clip(
+            np.ceil(self.max_trees * len(new_features) / self.window.max_rows), 1, self.max_trees
+        ))
+        self._report('fitting', 0.2)
+        candidate = self.model.extend_candidate(
+            self.data_organizer.normalize_frame(training_features, scaler),
+            training_labels,
+            scaler,
+            new_trees,
+            self.max_trees
+        )
+        self._publish_if_better(
+            candidate, new_features.iloc[validation_rows], new_labels[validation_rows]
+        )
+        
+        self._report('saving window', 0.95)
+        self.window.append(new_features, new_labels, new_times)
+        self.window.save()
+        self._report('done', 1.0)
+        return True
+        
+    def _publish_if_better(self, candidate: ModelArtifact, validation_features: pd.DataFrame,
+                           validation_labels: np.ndarray) -> bool:
+        """Publish the candidate unless the live model scores at least as well on the validation rows."""
+        self._report('validating', 0.8)
+        if len(validation_features) == 0:
+            self._publish(candidate)
+            return True
+        
+        candidate.metrics['validation_score'] = self._validation_score(
+            candidate, validation_features, validation_labels
+        )
+        incumbent = self.model.current
+        if incumbent is not None:
+            incumbent_score = self._validation_score(incumbent, validation_features, validation_labels)
+            if incumbent_score is not None:
+                candidate.metrics['incumbent_score'] = incumbent_score
+                if candidate.metrics['validation_score'] <= incumbent_score:
+                    print(f"Keeping model v{incumbent.version}: candidate scored "
+                          f"{candidate.metrics['validation_score']:.4f} vs {incumbent_score:.4f}")
+                    return False
+        
+        self._publish(candidate)
+        return True
+        
+    def _publish(self, candidate: ModelArtifact):
+        """Swap the live model and its normalization parameters together."""
+        self.model.publish(candidate)
+        self.data_organizer.scaler = candidate.scaler
+        
+    def _validation_score(self, artifact: ModelArtifact, features: pd.DataFrame,
+                          labels: np.ndarray) -> Optional[float]:
+        """Score an artifact on raw validation rows, normalized with the artifact's own scaler."""
+        try:
+            return self.model.score(artifact, features, labels, self.data_organizer.scaler)
+        except Exception as e:
+            # e.g. a model trained on a different feature schema
+            print(f"Could not score model v{artifact.version}: {str(e)}")
+            return None
             
-    def train_now(self):
+    def train_now(self, full: Optional[bool] = None):
         """
         Trigger an immediate training iteration.
         
+        Args:
+            full: Force a full retrain (True) or an incremental one (False)
+        
         Returns:
             bool: True if training was successful
         """
-        return self.train_model() 
\ No newline at end of file
+        return self.train_model(full)
+
+def _train_in_process(settings: Dict[str, Any], full: Optional[bool],
+                      report: Callable[[str, float, str], None]) -> bool:
+    """Worker process entry: rebuild the trainer from its settings and train once."""
+    model = AIModel(settings['model_path'], settings['keep_versions'], training_n_jobs=settings['n_jobs'])
+    trainer = ModelTrainer(
+        model,
+        DataOrganizer(settings['db_config']),
+        settings['training_query'],
+        validation_fraction=settings['validation_fraction'],
+        incremental_query=settings['incremental_query'],
+        window_rows=settings['window_rows'],
+        max_trees=settings['max_trees']
+    )
+    trainer.progress = report
+    return trainer.train_model(full)
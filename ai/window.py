@@ -0,0 +1,73 @@
+import joblib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional, Tuple
+import os
+
+class TrainingWindow:
+    """
+    Rolling window of the most recent training rows, kept on disk.
+
+    Incremental training appends the rows fetched since the watermark and
+    trains on the window instead of refetching the full history.
+    """
+
+    def __init__(self, path: str, max_rows: int = 50000):
+        """
+        Args:
+            path: File the window is stored in
+            max_rows: Rows kept; the oldest are dropped first
+        """
+        self.path = path
+        self.max_rows = max_rows
+        self.features: Optional[pd.DataFrame] = None
+        self.labels: Optional[np.ndarray] = None
+        self.times: Optional[np.ndarray] = None
+        self.load()
+
+    @property
+    def watermark(self) -> Optional[datetime]:
+        """Time of the newest row in the window."""
+        if self.times is None or len(self.times) == 0:
+            return None
+        return pd.Timestamp(self.times.max()).to_pydatetime()
+
+    def __len__(self) -> int:
+        return 0 if self.features is None else len(self.features)
+
+    def load(self):
+        """Read the window from disk if it was saved before."""
+        if os.path.exists(self.path):
+            stored = joblib.load(self.path)
+            self.features, self.labels, self.times = stored['features'], stored['labels'], stored['times']
+
+    def save(self):
+        """Write the window atomically."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        joblib.dump(
+            {'features': self.features, 'labels': self.labels, 'times': self.times},
+            f"{self.path}.tmp"
+        )
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def reset(self, features: pd.DataFrame, labels: np.ndarray, times: np.ndarray):
+        """Replace the window, e.g. after a full retrain."""
+        self.features, self.labels, self.times = None, None, None
+        self.append(features, labels, times)
+
+    def append(self, features: pd.DataFrame, labels: np.ndarray, times: np.ndarray):
+        """Add rows and drop the oldest beyond max_rows."""
+        times = pd.to_datetime(pd.Series(times)).to_numpy()
+        if self.features is not None:
+            features = pd.concat([self.features, features], ignore_index=True)
+            labels = np.concatenate([self.labels, labels])
+            times = np.concatenate([self.times, times])
+        order = np.argsort(times, kind='stable')[-self.max_rows:]
+        self.features = features.iloc[order].reset_index(drop=True)
+        self.labels = labels[order]
+        self.times = times[order]
+
+    def rows(self) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Return the window's features and labels."""
+        return self.features, self.labels
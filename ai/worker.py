@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Stages after which a training process has nothing more to report
+FINAL_STAGES = ('done', 'failed', 'cancelled')
+
+@dataclass
+class TrainingProgress:
+    """Latest state of a training job, as reported by the worker process"""
+    stage: str
+    fraction: float
+    message: str = ''
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def finished(self) -> bool:
+        return self.stage in FINAL_STAGES
+
+class TrainingWorker:
+    """
+    Runs training jobs in a separate process.
+
+    Fitting a forest holds the GIL for long stretches, so training in a
+    thread stalls the UI and trading threads of the same process. Each job
+    runs in a freshly spawned process instead, with its CPU cores, priority
+    and address space limited, and can be cancelled by terminating it.
+    Models are published atomically, so a cancelled job never leaves a
+    partial version behind.
+    """
+
+    def __init__(self, n_jobs: Optional[int] = 1, cpu_affinity: Optional[List[int]] = None,
+                 memory_limit_mb: Optional[int] = None, niceness: int = 10):
+        """
+        Args:
+            n_jobs: Cores the estimator fits trees on (-1 for all allowed cores)
+            cpu_affinity: Cores the process may run on (Linux only)
+            memory_limit_mb: Address space limit of the process (POSIX only)
+            niceness: Scheduling priority decrease of the process (POSIX only)
+        """
+        self.n_jobs = n_jobs
+        self.cpu_affinity = cpu_affinity
+        self.memory_limit_mb = memory_limit_mb
+        self.niceness = niceness
+        self._process: Optional[multiprocessing.Process] = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+        # Replaced by a single reference assignment, so the UI polls without locking
+        self._progress = TrainingProgress('idle', 0.0)
+
+    @property
+    def running(self) -> bool:
+        process = self._process
+        return process is not None and process.is_alive()
+
+    def progress(self) -> TrainingProgress:
+        """Return the latest progress of the current or last job."""
+        return self._progress
+
+    def run(self, target: Callable[..., bool], args: Tuple[Any, ...] = ()) -> bool:
+        """
+        Run target(*args, report) in a worker process and wait for it.
+
+        Args:
+            target: Module-level function, so it can be imported by the spawned
+                    process; report(stage, fraction, message='') sends progress
+            args: Picklable arguments for target
+
+        Returns:
+            bool: True if target returned True
+        """
+        context = multiprocessing.get_context('spawn')
+        updates = context.Queue()
+        process = context.Process(
+            target=_worker_main,
+            args=(target, args, self._limits(), updates),
+            daemon=True
+        )
+        with self._lock:
+            if self.running:
+                raise Exception("A training job is already running")
+            self._cancelled = False
+            self._progress = TrainingProgress('starting', 0.0)
+            process.start()
+            self._process = process
+
+        # Waiting on the queue releases the GIL, so this thread costs the app nothing
+        result = None
+        while result is None:
+            try:
+                update = updates.get(timeout=0.5)
+            except queue.Empty:
+                if not process.is_alive():
+                    break
+                continue
+            self._progress = update
+            if update.finished:
+                result = update.stage == 'done'
+        process.join()
+
+        if result is None:
+            if self._cancelled:
+                self._progress = TrainingProgress('cancelled', self._progress.fraction, "Cancelled")
+            else:
+                # Killed from outside, e.g. by the system when out of memory
+                self._progress = TrainingProgress(
+                    'failed', self._progress.fraction, f"Worker exited with code {process.exitcode}"
+                )
+        return bool(result)
+
+    def cancel(self) -> bool:
+        """
+        Terminate the running job.
+
+        Returns:
+            bool: True if a job was running
+        """
+        with self._lock:
+            if not self.running:
+                return False
+            self._cancelled = True
+            self._process.terminate()
+            return True
+
+    def _limits(self) -> dict:
+        return {
+            'cpu_affinity': self.cpu_affinity,
+            'memory_limit_mb': self.memory_limit_mb,
+            'niceness': self.niceness
+        }
+
+def _apply_limits(cpu_affinity: Optional[List[int]], memory_limit_mb: Optional[int], niceness: int):
+    """Restrict the current process; limits the platform cannot enforce are skipped."""
+    if cpu_affinity and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpu_affinity)
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if niceness and hasattr(os, 'nice'):
+        os.nice(niceness)
+
+def _worker_main(target: Callable[..., bool], args: Tuple[Any, ...], limits: dict, updates):
+    """Entry point of the worker process."""
+    def report(stage: str, fraction: float, message: str = ''):
+        updates.put(TrainingProgress(stage, fraction, message))
+
+    try:
+        _apply_limits(**limits)
+        succeeded = target(*args, report)
+        report('done' if succeeded else 'failed', 1.0)
+    except MemoryError:
+        report('failed', 1.0, "Memory limit reached")
+    except Exception as e:
+        report('failed', 1.0, str(e))
+    # Let the queue's feeder thread deliver the final update before exiting
+    updates.close()
+    updates.join_thread()
@@ -1,17 +1,44 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from database.classes import AIMetrics
 
+# Fitted models kept across analyzer instances, keyed by account and data signature
+MODEL_CACHE_SIZE = 16
+
+@dataclass
+class FittedModel:
+    """A forest fitted on the train split, with the scores derived from it"""
+    model: RandomForestRegressor
+    accuracy: float
+    confidence: float
+    feature_importance: Dict[str, float]
+
+_model_cache: "OrderedDict[Tuple[Any, ...], FittedModel]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+
 class AICalculator:
-    def __init__(self, trades_df: pd.DataFrame):
+    def __init__(self, trades_df: pd.DataFrame, account_id: Optional[int] = None):
         self.trades_df = trades_df
-        self.model = None
+        # Fitted models are only shared between calculators that name their account
+        self.account_id = account_id
         self.X = None
         self.y = None
-        self._prepare_features()
+        self.watermark = None
+        self._fitted: Optional[FittedModel] = None
+        self._prepared = False
+        
+    @property
+    def model(self) -> Optional[RandomForestRegressor]:
+        """Forest fitted on the train split; fitted on first use"""
+        fitted = self._fit()
+        return fitted.model if fitted is not None else None
         
     def _prepare_features(self):
         """Prepare features for ML analysis"""
@@ -48,21 +75,60 @@ class AICalculator:
         
         self.X = closed_trades[feature_columns]
         self.y = closed_trades['return']
+        # Upserts change closed trades in place, so count and latest close alone
+        # would keep serving a stale fit; a hash of the fitted values catches that
+        self.watermark = (len(closed_trades), closed_trades['close_time'].max(),
+                          self._signature(self.X, self.y))
         
-        # Train the model
-        self._train_model()
+    @staticmethod
+    def _signature(X: pd.DataFrame, y: pd.Series) -> str:
+        """Digest of the rows, features and target a forest would be fitted on"""
+        digest = hashlib.sha1()
+        digest.update(pd.util.hash_pandas_object(X).values.tobytes())
+        digest.update(pd.util.hash_pandas_object(y).values.tobytes())
+        return digest.hexdigest()
         
-    def _train_model(self):
-        """Train the ML model"""
+    def _fit(self) -> Optional[FittedModel]:
+        """Fit once on a train split and score the holdout from the same fit, reusing a cached fit"""
+        if self._fitted is not None:
+            return self._fitted
+        if not self._prepared:
+            self._prepare_features()
+            self._prepared = True
         if self.X is None or len(self.X) < 2:
-            return
+            return None
             
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.model.fit(self.X, self.y)
+        key = (self.account_id, self.watermark)
+        if self.account_id is not None:
+            with _model_cache_lock:
+                fitted = _model_cache.get(key)
+                if fitted is not None:
+                    _model_cache.move_to_end(key)
+                    self._fitted = fitted
+                    return fitted
+                    
+        X_train, X_test, y_train, y_test = train_test_split(
+            self.X, self.y, test_size=0.2, random_state=42
+        )
+        model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+        model.fit(X_train, y_train)
+        self._fitted = FittedModel(
+            model=model,
+            accuracy=model.score(X_test, y_test),
+            confidence=self._prediction_confidence(model, self.X),
+            feature_importance=dict(zip(self.X.columns, model.feature_importances_))
+        )
+        
+        if self.account_id is not None:
+            with _model_cache_lock:
+                _model_cache[key] = self._fitted
+                while len(_model_cache) > MODEL_CACHE_SIZE:
+                    _model_cache.popitem(last=False)
+        return self._fitted
         
     def calculate_metrics(self) -> AIMetrics:
         """Calculate all AI-related metrics"""
-        if self.model is None:
+        if self._fit() is None:
             return AIMetrics(
                 model_accuracy=0.0,
                 prediction_confidence=0.0,
@@ -89,24 +155,25 @@ class AICalculator:
         
     def _calculate_model_accuracy(self) -> float:
         """Calculate model accuracy using out-of-sample predictions"""
-        if self.model is None or self.X is None or len(self.X) < 2:
-            return 0.0
-            
-        X_train, X_test, y_train, y_test = train_test_split(
-            self.X, self.y, test_size=0.2, random_state=42
-        )
-        
-        self.model.fit(X_train, y_train)
-        return self.model.score(X_test, y_test)
+        fitted = self._fit()
+        return fitted.accuracy if fitted is not None else 0.0
         
     def _calculate_prediction_confidence(self) -> float:
         """Calculate prediction confidence based on model variance"""
-        if self.model is None or self.X is None or len(self.X) < 2:
-            return 0.0
-            
-        # Use the variance of predictions from individual trees as confidence measure
-        predictions = np.array([tree.predict(self.X) for tree in self.model.estimators_])
-        confidence = 1 - np.std(predictions, axis=0).mean()
+        fitted = self._fit()
+        return fitted.confidence if fitted is not None else 0.0
+        
+    @staticmethod
+    def _prediction_confidence(model: RandomForestRegressor, X: pd.DataFrame) -> float:
+        """One minus the mean spread of the individual trees' predictions"""
+        # apply() finds every tree's leaf in one parallel call; the leaf values of all
+        # trees are then looked up with a single gather instead of one predict per tree
+        leaves = model.apply(X)
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        leaf_values = np.concatenate([tree.value[:, 0, 0] for tree in trees])
+        predictions = leaf_values[leaves + offsets]
+        confidence = 1 - np.std(predictions, axis=1).mean()
         return max(0.0, min(1.0, confidence))
         
     def _determine_market_regime(self) -> str:
@@ -211,8 +278,5 @@ class AICalculator:
         
     def _calculate_feature_importance(self) -> Dict[str, float]:
         """Calculate feature importance from the ML model"""
-        if self.model is None or self.X is None:
-            return {}
-            
-        importance = self.model.feature_importances_
-        return dict(zip(self.X.columns, importance)) 
\ No newline at end of file
+        fitted = self._fit()
+        return fitted.feature_importance if fitted is not None else {} 
\ No newline at end of file
@@ -1,33 +1,126 @@
 from datetime import datetime, timedelta
+from functools import cached_property
 import pandas as pd
-from typing import List, Dict
+from typing import Any, Iterable, List, Dict, Optional, Set, Union
 from database.classes import (
     Trade, Account, OverviewMetrics, ProfitLossMetrics,
     SessionAnalysis, RiskMetrics, PortfolioMetrics,
     LongShortMetrics, AIMetrics, SequenceMetrics,
-    SummaryMetrics, Direction
+    SummaryMetrics, Direction, ChangeEvent
 )
+from database.change_feed import trade_from_row
+from database.trade_batch import TradeBatch
 from .risk_calculator import RiskCalculator
 from .profit_loss_calculator import ProfitLossCalculator
 from .portfolio_calculator import PortfolioCalculator
 from .ai_calculator import AICalculator
 from .sequence_calculator import SequenceCalculator
 
+# Calculators each metric group uses; groups are named like write_all_metrics() keys
+METRIC_DEPENDENCIES = {
+    'overview': (),
+    'profit_loss': ('profit_loss_calculator',),
+    'risk': ('risk_calculator',),
+    'portfolio': ('portfolio_calculator',),
+    'long_short': (),
+    'ai': ('ai_calculator',),
+    'sequence': ('sequence_calculator',),
+    'summary': ('risk_calculator', 'sequence_calculator'),
+}
+
+# Every lazily built attribute, dropped when the trades change
+CACHED_ATTRIBUTES = ('trades_df',) + tuple(sorted({
+    name for names in METRIC_DEPENDENCIES.values() for name in names
+}))
+
 class TradingAnalyzer:
-    def __init__(self, trades: List[Trade], account: Account):
+    """Computes every tab's metrics from one account's trades
+
+    Nothing is computed on construction: the trades frame and each
+    calculator are built on first access, so asking for one metric group
+    only pays for the calculators METRIC_DEPENDENCIES lists for it.
+    """
+    
+    def __init__(self, trades: Union[List[Trade], TradeBatch], account: Account,
+                 trades_df: Optional[pd.DataFrame] = None):
         self.trades = trades
         self.account = account
-        self.trades_df = self._create_trades_dataframe()
+        # A prebuilt frame (e.g. ParquetStore.load_trades_frame) skips the per-trade conversion
+        if trades_df is not None:
+            self.trades_df = trades_df
+            
+    @cached_property
+    def trades_df(self) -> pd.DataFrame:
+        return self._create_trades_dataframe()
+        
+    # Specialized calculators, created on first use
+    @cached_property
+    def risk_calculator(self) -> RiskCalculator:
+        return RiskCalculator(self.trades_df, self.account)
+        
+    @cached_property
+    def profit_loss_calculator(self) -> ProfitLossCalculator:
+        return ProfitLossCalculator(self.trades_df)
+        
+    @cached_property
+    def portfolio_calculator(self) -> PortfolioCalculator:
+        return PortfolioCalculator(self.trades_df, self.account)
+        
+    @cached_property
+    def ai_calculator(self) -> AICalculator:
+        return AICalculator(self.trades_df, self.account.id)
+        
+    @cached_property
+    def sequence_calculator(self) -> SequenceCalculator:
+        return SequenceCalculator(self.trades_df)
+        
+    @staticmethod
+    def required_calculators(groups: Iterable[str]) -> Set[str]:
+        """Return the calculators that computing the given metric groups needs"""
+        return {name for group in groups for name in METRIC_DEPENDENCIES[group]}
+        
+    def calculate(self, groups: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Calculate the given metric groups (all by default), building only the calculators they need
+        
+        The result can be passed to DatabaseWriter.write_all_metrics().
+        """
+        groups = list(METRIC_DEPENDENCIES) if groups is None else list(groups)
+        unknown = set(groups) - METRIC_DEPENDENCIES.keys()
+        if unknown:
+            raise ValueError(f"Unknown metric groups: {sorted(unknown)}")
+        return {group: getattr(self, f"calculate_{group}_metrics")() for group in groups}
+        
+    def apply_changes(self, events: Iterable[ChangeEvent]) -> bool:
+        """Merge new and changed trades delivered by a ChangeFeed
+        
+        Changed trades replace the ones with the same id and new ones are
+        appended; an analyzer given only a trades_df merges into that frame's
+        trades. The frame and calculators are rebuilt on next use.
+        Returns True if any trade of this account changed.
+        """
+        changed = {}
+        for event in events:
+            if event.table == 'trades' and event.account_id == self.account.id:
+                trade = trade_from_row(event.row)
+                changed[trade.id] = trade
+        if not changed:
+            return False
         
-        # Initialize specialized calculators
-        self.risk_calculator = RiskCalculator(self.trades_df, account)
-        self.profit_loss_calculator = ProfitLossCalculator(self.trades_df)
-        self.portfolio_calculator = PortfolioCalculator(self.trades_df, account)
-        self.ai_calculator = AICalculator(self.trades_df)
-        self.sequence_calculator = SequenceCalculator(self.trades_df)
+        if not len(self.trades) and 'trades_df' in self.__dict__:
+            # Built from a frame alone: the frame holds the history to merge into
+            self.trades = TradeBatch.from_dataframe(self.trades_df)
+        is_batch = isinstance(self.trades, TradeBatch)
+        trades = self.trades.to_trades() if is_batch else list(self.trades)
+        merged = [changed.pop(trade.id, trade) for trade in trades] + list(changed.values())
+        self.trades = TradeBatch.from_trades(merged) if is_batch else merged
+        for name in CACHED_ATTRIBUTES:
+            self.__dict__.pop(name, None)
+        return True
         
     def _create_trades_dataframe(self) -> pd.DataFrame:
         """Convert trades list to pandas DataFrame for easier analysis"""
+        if isinstance(self.trades, TradeBatch):
+            return self.trades.to_dataframe()
         return pd.DataFrame([{
             'id': t.id,
             'symbol': t.symbol,
@@ -80,10 +80,10 @@ class RiskCalculator:
     def _calculate_risk_per_trade(self) -> float:
         """Calculate average risk per trade based on stop loss"""
         closed_trades = self.trades_df[self.trades_df['status'] == 'closed']
-        risk_amounts = closed_trades.apply(lambda x: 
-            abs(x['open_price'] - x['stop_loss']) * x['volume'] 
-            if x['stop_loss'] is not None else 0, axis=1)
-        return risk_amounts.mean()
+        # Missing stop losses are None in object columns and NaN in float ones
+        stop_loss = closed_trades['stop_loss'].astype(float)
+        risk_amounts = ((closed_trades['open_price'] - stop_loss).abs() * closed_trades['volume'])
+        return risk_amounts.where(stop_loss.notna(), 0).mean()
         
     def _calculate_var_95(self, returns: pd.Series) -> float:
         """Calculate Value at Risk (95% confidence)"""
@@ -3,6 +3,7 @@ import numpy as np
 from typing import Dict, List
 from datetime import datetime, timedelta
 from database.classes import Trade, SequenceMetrics
+from database.trade_batch import TradeBatch
 
 class SequenceCalculator:
     def __init__(self, trades_df: pd.DataFrame):
@@ -10,8 +11,7 @@ class SequenceCalculator:
         
     def calculate_metrics(self) -> SequenceMetrics:
         """Calculate all sequence-related metrics"""
-        closed_trades = [Trade(**t) for t in 
-                        self.trades_df[self.trades_df['status'] == 'closed'].to_dict('records')]
+        closed_trades = TradeBatch.from_dataframe(self.trades_df[self.trades_df['status'] == 'closed'])
         
         return SequenceMetrics(
             trades=closed_trades,
@@ -108,24 +108,15 @@ class SequenceCalculator:
         if len(closed_trades) < 2:
             return []
             
-        clusters = []
-        current_cluster = [closed_trades.iloc[0]]
-        
-        for i in range(1, len(closed_trades)):
-            current_trade = closed_trades.iloc[i]
-            previous_trade = closed_trades.iloc[i-1]
-            
-            if (current_trade['open_time'] - previous_trade['open_time']) <= time_window:
-                current_cluster.append(current_trade)
-            else:
-                if len(current_cluster) > 1:
-                    clusters.append([Trade(**t) for t in current_cluster])
-                current_cluster = [current_trade]
-                
-        if len(current_cluster) > 1:
-            clusters.append([Trade(**t) for t in current_cluster])
-            
-        return clusters
+        # A cluster ends wherever the gap to the next trade exceeds the window
+        batch = TradeBatch.from_dataframe(closed_trades)
+        gaps = np.diff(batch.column('open_time')) > np.timedelta64(time_window)
+        bounds = np.concatenate(([0], np.flatnonzero(gaps) + 1, [len(batch)]))
+        return [
+            batch[start:end].to_trades()
+            for start, end in zip(bounds[:-1], bounds[1:])
+            if end - start > 1
+        ]
         
     def calculate_trade_patterns(self, window_size: int = 3) -> Dict[str, int]:
         """Identify common patterns in trade sequences"""
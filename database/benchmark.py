@@ -0,0 +1,491 @@
+"""
+Benchmarks for the database layer.
+
+The profit-loss mode migrates the PostgreSQL schema, loads one synthetic
+account of each size and compares get_profit_loss_metrics with the legacy
+two-query implementation, checking its figures against the loaded trades. The suite mode loads synthetic accounts (see
+database.synthetic) into PostgreSQL or sqlite at each size and times every
+get_* method of the reader and every DatabaseWriter.write_* method,
+reporting p50/p95 latency and peak Python memory per call.
+
+The suite also checks results: trades and profit/loss read back are
+compared with totals accumulated while loading and writing. Any mismatch
+or failed call exits with status 1, so the PostgreSQL suite needs the
+TimescaleDB and pg_stat_statements extensions that the migrations and
+the health readers use.
+
+Run from the repository root:
+
+    python -m database.benchmark --dbname bench --user postgres --password postgres
+    python -m database.benchmark --mode suite --backend sqlite --sizes 10000 100000 1000000 10000000
+    python -m database.benchmark --mode suite --backend postgres --dbname bench --output run.json
+    python -m database.benchmark --mode suite --backend sqlite --baseline run.json --tolerance 0.25
+"""
+import argparse
+import inspect
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from .classes import (
+    Trade, OverviewMetrics, ProfitLossMetrics, RiskMetrics, PortfolioMetrics,
+    LongShortMetrics, AIMetrics, SequenceMetrics, SummaryMetrics
+)
+from .db_retrieve import DatabaseConnection
+from .db_write import DatabaseWriter
+from .migrations import SchemaMigrator
+from .sqlite_reader import SqliteReader
+from .synthetic import SyntheticAccount, synthetic_accounts
+
+BENCHMARK_ACCOUNT_ID = 900001
+# Far above the ids of real trades and of the suite's synthetic accounts
+BENCHMARK_FIRST_TRADE_ID = 10 ** 11
+
+# Two-round-trip implementation kept for comparison with get_profit_loss_metrics
+LEGACY_PROFIT_LOSS_QUERIES = [
+    """
+        WITH trade_stats AS (
+            SELECT
+                sum(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
+                count(*) as total_trades,
+                sum(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END) as total_profit,
+                sum(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END) as total_loss,
+                max(profit_loss) as best_trade,
+                min(profit_loss) as worst_trade,
+                avg(CASE WHEN profit_loss > 0 THEN profit_loss END) as avg_win,
+                avg(CASE WHEN profit_loss < 0 THEN profit_loss END) as avg_loss
+            FROM trades
+            WHERE account_id = %s
+            AND open_time BETWEEN %s AND %s
+            AND close_time IS NOT NULL
+        )
+        SELECT * FROM trade_stats
+    """,
+    """
+        SELECT
+            max(win_streak) as max_win_streak,
+            max(loss_streak) as max_loss_streak
+        FROM (
+            SELECT
+                sum(CASE WHEN profit_loss > 0
+                    THEN 1 ELSE 0 END) OVER (ORDER BY close_time) as win_streak,
+                sum(CASE WHEN profit_loss < 0
+                    THEN 1 ELSE 0 END) OVER (ORDER BY close_time) as loss_streak
+            FROM trades
+            WHERE account_id = %s
+            AND close_time BETWEEN %s AND %s
+        ) streaks
+    """
+]
+
+
+def time_call(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Run func repeatedly and return latency statistics in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'min_ms': samples[0],
+        'p50_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def benchmark_profit_loss(db: DatabaseConnection, account_id: int,
+                          start_date: datetime, end_date: datetime,
+                          repeat: int = 20) -> Dict[str, Dict[str, float]]:
+    """Compare the legacy two-query P/L path with get_profit_loss_metrics"""
+    def legacy():
+        with db.conn.cursor() as cur:
+            for query in LEGACY_PROFIT_LOSS_QUERIES:
+                cur.execute(query, (account_id, start_date, end_date))
+                cur.fetchone()
+
+    return {
+        'legacy_two_queries': time_call(legacy, repeat),
+        'single_query': time_call(
+            lambda: db.get_profit_loss_metrics(account_id, start_date, end_date), repeat
+        ),
+    }
+
+
+@dataclass
+class TradeTotals:
+    """Reference figures for one account's trades, accumulated as they are generated"""
+    start_date: datetime
+    end_date: datetime
+    opened: int = 0  # trades opened in range, as get_trades returns them
+    closed: int = 0  # closed trades opened in range, as get_profit_loss_metrics counts them
+    winning: int = 0
+    closed_pl: float = 0.0
+
+    def add(self, trades: Iterable[Trade]) -> None:
+        for trade in trades:
+            if not self.start_date <= trade.open_time <= self.end_date:
+                continue
+            self.opened += 1
+            if trade.close_time is not None:
+                self.closed += 1
+                self.winning += trade.profit_loss > 0
+                self.closed_pl += trade.profit_loss
+
+    def mismatches(self, metrics: ProfitLossMetrics) -> List[str]:
+        """Describe every profit/loss figure that differs from these totals"""
+        problems = []
+        if (metrics.total_trades, metrics.winning_trades) != (self.closed, self.winning):
+            problems.append(f"get_profit_loss_metrics: {metrics.total_trades} trades, "
+                            f"{metrics.winning_trades} winning; expected {self.closed}, {self.winning}")
+        if not math.isclose(metrics.total_pl, self.closed_pl, rel_tol=1e-9, abs_tol=0.01):
+            problems.append(f"get_profit_loss_metrics: total P/L {metrics.total_pl:.2f}, "
+                            f"expected {self.closed_pl:.2f}")
+        return problems
+
+
+def check_reads(reader, account_id: int, totals: TradeTotals) -> List[str]:
+    """Compare trades and profit/loss read back with the totals of what was loaded"""
+    problems = []
+    trades = reader.get_trades(account_id, totals.start_date, totals.end_date)
+    if len(trades) != totals.opened:
+        problems.append(f"get_trades: {len(trades)} trades, expected {totals.opened}")
+    problems.extend(totals.mismatches(
+        reader.get_profit_loss_metrics(account_id, totals.start_date, totals.end_date)
+    ))
+    return problems
+
+
+# Sample metrics written by the write_* benchmarks and seeded for snapshot readers
+SAMPLE_METRICS = {
+    'overview': OverviewMetrics(10000.0, 10050.0, 120.0, 8375.0, 50.0, 35.0, 3, 1, [], []),
+    'profit_loss': ProfitLossMetrics(1250.0, 0.62, 2.5, 1.8, 310.0, -220.0, 500, 310, 190,
+                                     9, 5, 14.2, -9.8, 1.45),
+    'risk': RiskMetrics(1.1, 640.0, 6.4, 1.8, 12.0, 1.95, 14.0, 1.0, -85.0, -120.0),
+    'portfolio': PortfolioMetrics(10050.0, 35.0, 410.0, 1250.0,
+                                  {'EURUSD': 45.0, 'XAUUSD': 55.0},
+                                  {'EURUSD': 2.1, 'XAUUSD': 3.4}, {}),
+    'long_short': LongShortMetrics(260, 52.0, 240, 48.0, 700.0, 550.0, 0.63, 0.61, 15.0, 13.1),
+    'ai': AIMetrics(0.71, 0.64, 'trending', 0.012, 0.4, [1.08, 1.075], [1.09, 1.095], {}, {}),
+    'sequence': SequenceMetrics([], 9, 5, 6.5, {}, {}, {}),
+    'summary': SummaryMetrics(4400.0, -3150.0, 1250.0, 500, 0.62, 1.4, 2.5, 640.0, 640.0,
+                              6.4, 3.2, 6.5, 156),
+}
+
+
+def load_postgres(conn, accounts: List[SyntheticAccount], chunk_size: int = 100000,
+                  totals: Optional[Dict[int, TradeTotals]] = None) -> List[int]:
+    """Replace the synthetic accounts' rows in PostgreSQL and return their ids
+
+    totals, keyed by synthetic account id, accumulate the trades loaded for those accounts.
+    """
+    totals = totals or {}
+    account_sql = """
+        INSERT INTO accounts (
+            id, login, name, balance, equity, margin, margin_level,
+            floating_pl, server, max_positions, max_volume
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (id) DO UPDATE SET
+            balance = EXCLUDED.balance,
+            equity = EXCLUDED.equity
+    """
+    for synthetic in accounts:
+        with conn.cursor() as cur:
+            account = synthetic.account()
+            cur.execute(account_sql, tuple(vars(account).values()))
+            for table in ('account_daily_rollups', 'account_snapshots', 'orders', 'trades'):
+                cur.execute(f"DELETE FROM {table} WHERE account_id = %s", (account.id,))
+            for chunk in synthetic.history(chunk_size):
+                if synthetic.account_id in totals:
+                    totals[synthetic.account_id].add(chunk.trades)
+                execute_values(cur, """
+                    INSERT INTO trades (
+                        id, account_id, symbol, direction, open_time, close_time,
+                        open_price, close_price, volume, profit_loss, swap,
+                        commission, take_profit, stop_loss, comment, status
+                    ) VALUES %s
+                """, [
+                    (t.id, account.id, t.symbol, t.direction.value, t.open_time, t.close_time,
+                     t.open_price, t.close_price, t.volume, t.profit_loss, t.swap,
+                     t.commission, t.take_profit, t.stop_loss, t.comment, t.status)
+                    for t in chunk.trades
+                ], page_size=10000)
+                execute_values(cur, """
+                    INSERT INTO account_snapshots (
+                        account_id, time, balance, equity, margin, margin_level, floating_pl
+                    ) VALUES %s
+                """, [(account.id,) + snapshot for snapshot in chunk.snapshots], page_size=10000)
+            # The final balance is only known once the history has been generated
+            cur.execute(account_sql, tuple(vars(synthetic.account()).values()))
+            cur.execute("ANALYZE trades")
+            cur.execute("ANALYZE account_snapshots")
+        conn.commit()
+    return [synthetic.account_id for synthetic in accounts]
+
+
+def load_sqlite(writer: DatabaseWriter, accounts: List[SyntheticAccount],
+                chunk_size: int = 100000, totals: Optional[Dict[int, TradeTotals]] = None) -> List[int]:
+    """Write the synthetic accounts through DatabaseWriter and return their sqlite ids
+
+    The sqlite store has no snapshot table; one set of SAMPLE_METRICS is
+    written per account instead so the snapshot-backed readers have data.
+    totals, keyed by synthetic account id, accumulate the trades written for those accounts.
+    """
+    totals = totals or {}
+    account_ids = []
+    for synthetic in accounts:
+        account_id = writer.write_account(synthetic.account())
+        for chunk in synthetic.history(chunk_size):
+            if synthetic.account_id in totals:
+                totals[synthetic.account_id].add(chunk.trades)
+            writer.write_trades(chunk.trades, account_id)
+        writer.write_account(synthetic.account())
+        with writer.transaction():
+            for name, metrics in SAMPLE_METRICS.items():
+                getattr(writer, f"write_{name}_metrics")(metrics, account_id)
+        account_ids.append(account_id)
+    return account_ids
+
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Latency statistics over repeat calls plus the peak Python memory of one call"""
+    stats = time_call(func, repeat)
+    tracemalloc.start()
+    try:
+        func()
+        stats['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+    return stats
+
+
+def _call_args(method: Callable, account_id: int, start_date: datetime,
+               end_date: datetime) -> Dict[str, Any]:
+    """Arguments for a get_* method, chosen by parameter name"""
+    available = {'account_id': account_id, 'start_date': start_date, 'end_date': end_date}
+    return {
+        name: available[name]
+        for name in inspect.signature(method).parameters
+        if name in available
+    }
+
+
+def benchmark_reads(reader, account_id: int, start_date: datetime, end_date: datetime,
+                    repeat: int) -> Dict[str, Dict[str, float]]:
+    """Time every get_* method of a DatabaseConnection or SqliteReader"""
+    results = {}
+    for name, method in inspect.getmembers(reader, inspect.ismethod):
+        if not name.startswith('get_'):
+            continue
+        kwargs = _call_args(method, account_id, start_date, end_date)
+        try:
+            results[name] = measure(lambda: method(**kwargs), repeat)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+            if isinstance(reader, DatabaseConnection):
+                reader.conn.rollback()
+    return results
+
+
+def benchmark_writes(writer: DatabaseWriter, repeat: int, start_date: datetime, end_date: datetime,
+                     batch_size: int = 1000) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+    """Time every DatabaseWriter.write_* method against the loaded store
+
+    Returns the statistics and the mismatches found reading the written trades back.
+    """
+    # Fresh trade ids per call, so write_trades measures inserts rather than no-op upserts
+    # (repeat + 1 calls per method, the extra one being the tracemalloc run)
+    batch_account = SyntheticAccount(
+        account_id=0, trade_count=batch_size * 2 * (repeat + 1), seed=7, first_trade_id=10 ** 12
+    )
+    trades = [trade for chunk in batch_account.history() for trade in chunk.trades]
+    batches = iter([trades[i:i + batch_size] for i in range(0, len(trades), batch_size)])
+    written = TradeTotals(start_date, end_date)
+    account = batch_account.account()
+    account_id = writer.write_account(account)
+
+    def next_batch() -> List[Trade]:
+        batch = next(batches)
+        written.add(batch)
+        return batch
+
+    calls = {
+        'write_account': lambda: writer.write_account(account),
+        'write_trades': lambda: writer.write_trades(next_batch(), account_id),
+        'write_all_metrics': lambda: writer.write_all_metrics(account, next_batch(), SAMPLE_METRICS),
+    }
+    for name, metrics in SAMPLE_METRICS.items():
+        calls[f"write_{name}_metrics"] = (
+            lambda write=getattr(writer, f"write_{name}_metrics"), m=metrics: write(m, account_id)
+        )
+    results = {name: measure(call, repeat) for name, call in calls.items()}
+    with SqliteReader(writer.db_path) as reader:
+        problems = check_reads(reader, account_id, written)
+    return results, problems
+
+
+def run_suite(args) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+    """Load each size and benchmark reads on the chosen backend and sqlite writes
+
+    Returns the statistics and a message for every failed call or wrong result.
+    """
+    results = {}
+    problems = []
+    start_date = datetime(2019, 1, 1)
+    end_date = datetime.now() + timedelta(days=1)
+    for size in args.sizes:
+        accounts = synthetic_accounts(args.accounts, max(1, size // args.accounts), args.seed)
+        # Reads run against the first account, so only its trades are totalled
+        totals = {accounts[0].account_id: TradeTotals(start_date, end_date)}
+        sqlite_path = args.sqlite_path or os.path.join(tempfile.mkdtemp(), f"bench_{size}.db")
+        if os.path.exists(sqlite_path):
+            os.remove(sqlite_path)
+        writer = DatabaseWriter(sqlite_path)
+        try:
+            started = time.perf_counter()
+            if args.backend == 'postgres':
+                db = DatabaseConnection(args.host, args.port, args.dbname, args.user, args.password)
+                db.connect()
+                SchemaMigrator(db.conn).upgrade()
+                account_ids = load_postgres(db.conn, accounts, totals=totals)
+                # Writes are always measured on sqlite, the only DatabaseWriter backend
+                load_sqlite(writer, accounts)
+            else:
+                account_ids = load_sqlite(writer, accounts, totals=totals)
+                db = SqliteReader(sqlite_path)
+                db.connect()
+            print(f"Loaded {size} trades into {args.backend} in {time.perf_counter() - started:.1f} s")
+            try:
+                reads = benchmark_reads(db, account_ids[0], start_date, end_date, args.repeat)
+                read_problems = check_reads(db, account_ids[0], totals[accounts[0].account_id])
+            finally:
+                db.disconnect()
+            writes, write_problems = benchmark_writes(writer, args.repeat, start_date, end_date)
+        finally:
+            writer.close()
+        for name, stats in list(reads.items()) + list(writes.items()):
+            key = f"{args.backend}/{size}/{name}"
+            results[key] = stats
+            if 'error' in stats:
+                problems.append(f"{key}: {stats['error']}")
+        problems.extend(f"{args.backend}/{size} reads: {message}" for message in read_problems)
+        problems.extend(f"sqlite/{size} writes: {message}" for message in write_problems)
+    return results, problems
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                        tolerance: float) -> List[str]:
+    """Return a message for every call whose p95 grew by more than tolerance"""
+    regressions = []
+    for key, stats in results.items():
+        previous = baseline.get(key)
+        if not previous or 'p95_ms' not in stats or 'p95_ms' not in previous:
+            continue
+        if stats['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{key}: p95 {previous['p95_ms']:.2f} ms -> {stats['p95_ms']:.2f} ms"
+            )
+    return regressions
+
+
+def _print_suite(results: Dict[str, Dict[str, float]]) -> None:
+    for key, stats in results.items():
+        if 'error' in stats:
+            print(f"{key:<55} | error: {stats['error']}")
+            continue
+        print(f"{key:<55} | p50 {stats['p50_ms']:9.2f} ms | p95 {stats['p95_ms']:9.2f} ms | "
+              f"peak {stats['peak_kb']:10.1f} KB")
+
+
+def _print_results(trade_count: int, results: Dict[str, Dict[str, float]]) -> None:
+    for name, stats in results.items():
+        print(f"{trade_count:>10} trades | {name:<20} | "
+              f"min {stats['min_ms']:8.2f} ms | p50 {stats['p50_ms']:8.2f} ms | "
+              f"p95 {stats['p95_ms']:8.2f} ms")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the database layer")
+    parser.add_argument('--mode', choices=['profit-loss', 'suite'], default='profit-loss')
+    parser.add_argument('--backend', choices=['postgres', 'sqlite'], default='postgres')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5432)
+    parser.add_argument('--dbname', default='postgres')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--sqlite-path', default=None,
+                        help="sqlite file to (re)create for each size; a temp file by default")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--accounts', type=int, default=4, help="Accounts the trades are spread over")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help="Write suite results to this JSON file")
+    parser.add_argument('--baseline', help="Fail when p95 regresses against this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative p95 growth over the baseline")
+    args = parser.parse_args(argv)
+
+    if args.mode == 'suite':
+        results, problems = run_suite(args)
+        _print_suite(results)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        regressions = []
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+            for message in regressions:
+                print(f"REGRESSION {message}")
+        for message in problems:
+            print(f"FAILED {message}")
+        if regressions or problems:
+            sys.exit(1)
+        return
+
+    db = DatabaseConnection(args.host, args.port, args.dbname, args.user, args.password)
+    db.connect()
+    problems = []
+    try:
+        SchemaMigrator(db.conn).upgrade()
+        end_date = datetime.now() + timedelta(days=1)
+        start_date = end_date - timedelta(days=3650)
+        for size in args.sizes:
+            synthetic = SyntheticAccount(BENCHMARK_ACCOUNT_ID, size, args.seed,
+                                         first_trade_id=BENCHMARK_FIRST_TRADE_ID)
+            totals = {BENCHMARK_ACCOUNT_ID: TradeTotals(start_date, end_date)}
+            load_postgres(db.conn, [synthetic], totals=totals)
+            _print_results(size, benchmark_profit_loss(
+                db, BENCHMARK_ACCOUNT_ID, start_date, end_date, args.repeat
+            ))
+            problems.extend(
+                f"{size} trades: {message}"
+                for message in totals[BENCHMARK_ACCOUNT_ID].mismatches(
+                    db.get_profit_loss_metrics(BENCHMARK_ACCOUNT_ID, start_date, end_date)
+                )
+            )
+        with db.conn.cursor() as cur:
+            for table in ('account_daily_rollups', 'account_snapshots', 'orders', 'trades', 'accounts'):
+                column = 'id' if table == 'accounts' else 'account_id'
+                cur.execute(f"DELETE FROM {table} WHERE {column} = %s", (BENCHMARK_ACCOUNT_ID,))
+        db.conn.commit()
+    finally:
+        db.disconnect()
+    for message in problems:
+        print(f"FAILED {message}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
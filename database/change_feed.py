@@ -0,0 +1,247 @@
+import abc
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .classes import ChangeEvent, Trade, Direction
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[List[ChangeEvent]], None]
+
+# Columns holding timestamps, which both feeds receive as text
+TIME_COLUMNS = {'open_time', 'close_time', 'time', 'timestamp'}
+
+# sqlite limits the number of bound parameters per statement
+ID_CHUNK_SIZE = 500
+
+def parse_row_times(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert ISO timestamp strings of known time columns to datetimes in place"""
+    for column in TIME_COLUMNS & row.keys():
+        if isinstance(row[column], str):
+            row[column] = datetime.fromisoformat(row[column])
+    return row
+
+def _row_ids(entry: sqlite3.Row) -> range:
+    """Ids of the rows a change_log entry covers: one, or a range logged by a bulk write"""
+    return range(entry['row_id'], (entry['last_row_id'] or entry['row_id']) + 1)
+
+def trade_from_row(row: Dict[str, Any]) -> Trade:
+    """Build a Trade from a trades row delivered in a ChangeEvent"""
+    trade_id = row.get('broker_trade_id') or row['id']
+    return Trade(
+        id=trade_id,
+        symbol=row['symbol'],
+        direction=Direction(row['direction']),
+        open_time=row['open_time'],
+        close_time=row.get('close_time'),
+        open_price=row['open_price'],
+        close_price=row.get('close_price'),
+        volume=row['volume'],
+        profit_loss=row.get('profit_loss'),
+        swap=row.get('swap') or 0,
+        commission=row.get('commission') or 0,
+        take_profit=row.get('take_profit'),
+        stop_loss=row.get('stop_loss'),
+        comment=row.get('comment') or '',
+        status=row['status']
+    )
+
+def _coalesce(events: List[ChangeEvent]) -> List[ChangeEvent]:
+    """Keep the latest event per row; a row inserted and then updated stays an INSERT"""
+    latest: Dict[Any, ChangeEvent] = {}
+    for position, event in enumerate(events):
+        row_id = event.row.get('id')
+        key = (event.table, row_id) if row_id is not None else position
+        previous = latest.pop(key, None)
+        if previous is not None and previous.operation == 'INSERT':
+            event.operation = 'INSERT'
+        latest[key] = event
+    return list(latest.values())
+
+class ChangeFeed(abc.ABC):
+    """Pushes new and changed rows to subscribers from a background thread
+
+    Subscribers are called on the feed's thread with a list of events per
+    poll, already filtered to the tables/account they asked for. Qt widgets
+    should re-emit the events through a Signal to update on the GUI thread.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Tuple[Subscriber, Optional[Set[str]], Optional[int]]] = {}
+        self._subscribers_lock = threading.Lock()
+        self._next_token = 1
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Subscriber, tables: Optional[Sequence[str]] = None,
+                  account_id: Optional[int] = None) -> int:
+        """Register a callback and return a token for unsubscribe()"""
+        with self._subscribers_lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subscribers[token] = (callback, set(tables) if tables else None, account_id)
+        return token
+
+    def unsubscribe(self, token: int):
+        """Remove a callback registered with subscribe()"""
+        with self._subscribers_lock:
+            self._subscribers.pop(token, None)
+
+    def start(self):
+        """Open the feed and start delivering events"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop delivering events and close the feed"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                events = self._poll()
+            except Exception as e:
+                logger.error(f"{type(self).__name__} poll failed: {str(e)}")
+                self._stop.wait(1.0)
+                continue
+            if events:
+                self._publish(_coalesce(events))
+
+    def _publish(self, events: List[ChangeEvent]):
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers.values())
+        for callback, tables, account_id in subscribers:
+            selected = [
+                event for event in events
+                if (tables is None or event.table in tables)
+                and (account_id is None or event.account_id == account_id)
+            ]
+            if not selected:
+                continue
+            try:
+                callback(selected)
+            except Exception as e:
+                logger.error(f"Change feed subscriber failed: {str(e)}")
+
+    @abc.abstractmethod
+    def _open(self):
+        """Connect to the source; called by start() on the caller's thread"""
+
+    @abc.abstractmethod
+    def _close(self):
+        """Release the connection; called by stop()"""
+
+    @abc.abstractmethod
+    def _poll(self) -> List[ChangeEvent]:
+        """Wait briefly for changes and return them, or an empty list"""
+
+class SqliteChangeFeed(ChangeFeed):
+    """Change feed over the change_log table that DatabaseWriter's triggers fill
+
+    Each poll first compares PRAGMA data_version, so an idle database costs
+    one pragma per interval; only log entries past the watermark are read.
+    """
+
+    def __init__(self, db_path: str, poll_interval: float = 0.25,
+                 since: Optional[int] = None, batch_size: int = 10000):
+        """
+        Args:
+            db_path: sqlite file written by DatabaseWriter
+            poll_interval: Seconds between checks for new commits
+            since: change_log id to resume after; None starts at the current end
+            batch_size: Log entries read per poll at most
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.watermark = since
+        self.conn = None
+        self._data_version = None
+
+    def _open(self):
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        if self.watermark is None:
+            self.watermark = self.conn.execute(
+                "SELECT coalesce(max(id), 0) FROM change_log"
+            ).fetchone()[0]
+
+    def _close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _poll(self) -> List[ChangeEvent]:
+        if self._stop.wait(self.poll_interval):
+            return []
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return []
+
+        entries = self.conn.execute("""
+            SELECT id, table_name, row_id, last_row_id, account_id, operation
+            FROM change_log
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (self.watermark, self.batch_size)).fetchall()
+        full = len(entries) == self.batch_size
+        # Range entries of bulk writes stand for many rows; stop at a batch of rows
+        row_count = 0
+        for index, entry in enumerate(entries):
+            row_count += len(_row_ids(entry))
+            if row_count >= self.batch_size:
+                full = full or index + 1 < len(entries)
+                entries = entries[:index + 1]
+                break
+        # A full batch may leave more entries behind, so check again next poll
+        self._data_version = None if full else data_version
+        if not entries:
+            return []
+
+        rows = self._fetch_rows(entries)
+        events = []
+        for entry in entries:
+            for row_id in _row_ids(entry):
+                row = rows.get((entry['table_name'], row_id))
+                if row is not None:
+                    events.append(ChangeEvent(
+                        table=entry['table_name'],
+                        operation=entry['operation'],
+                        account_id=entry['account_id'],
+                        row=row
+                    ))
+        self.watermark = entries[-1]['id']
+        return events
+
+    def _fetch_rows(self, entries: List[sqlite3.Row]) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        """Load the current version of every row referenced by the log entries"""
+        ids_by_table: Dict[str, Set[int]] = {}
+        for entry in entries:
+            ids_by_table.setdefault(entry['table_name'], set()).update(_row_ids(entry))
+        rows = {}
+        for table, ids in ids_by_table.items():
+            ids = sorted(ids)
+            for start in range(0, len(ids), ID_CHUNK_SIZE):
+                chunk = ids[start:start + ID_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                for row in self.conn.execute(
+                    f"SELECT * FROM {table} WHERE id IN ({placeholders})", chunk
+                ):
+                    rows[(table, row['id'])] = parse_row_times(dict(row))
+        return rows
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Sequence
 from enum import Enum
 
 @dataclass
@@ -60,6 +60,42 @@ class DatabaseHealth:
     index_usage: List[IndexUsage]
     last_check: datetime
 
+@dataclass
+class WriteThroughput:
+    """Result of a bulk write"""
+    rows: int
+    seconds: float
+    rows_per_second: float
+    changed_rows: int = 0
+
+@dataclass
+class RetentionPolicy:
+    """How long metric snapshots are kept at each resolution"""
+    raw_days: int = 7
+    hourly_days: int = 90
+    daily_days: Optional[int] = None  # None keeps daily snapshots forever
+
+@dataclass
+class WriteQueueStats:
+    """Background write queue counters"""
+    depth: int
+    max_depth: int
+    enqueued: int
+    written: int
+    rejected: int
+    batches: int
+    failed_batches: int
+    last_batch_ms: float
+    dead_lettered: int = 0
+
+@dataclass
+class ChangeEvent:
+    """A new or changed row delivered by a change feed"""
+    table: str
+    operation: str  # 'INSERT' or 'UPDATE'
+    account_id: Optional[int]
+    row: Dict[str, object]  # column -> value
+
 # Enums for various types
 class Direction(Enum):
     BUY = "Buy"
@@ -76,7 +112,7 @@ class TimeFrame(Enum):
     W1 = "1 week"
     MN1 = "1 month"
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Trade:
     """Individual trade information"""
     id: int
@@ -208,7 +244,7 @@ class AIMetrics:
 @dataclass
 class SequenceMetrics:
     """Trade sequence analysis"""
-    trades: List[Trade]
+    trades: Sequence[Trade]  # List[Trade] or a TradeBatch
     win_streak: int
     loss_streak: int
     avg_trade_duration: float
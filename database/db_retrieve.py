@@ -9,9 +9,38 @@ from .classes import (
     RiskMetrics, PortfolioMetrics, LongShortMetrics,
     AIMetrics, SequenceMetrics, SummaryMetrics
 )
+from .instrumentation import (
+    InstrumentedCursor, QueryMetricsRegistry, default_registry, instrumented
+)
+
+# Win and loss runs of a trades CTE, shared by the P/L and sequence queries
+# so both count streaks the same way. Runs are found with the gaps-and-islands
+# technique: within a run of identical outcomes the difference between the
+# global and per-outcome row numbers is constant. Breakeven and open (NULL
+# profit_loss) trades are left out, so they neither extend nor break a run.
+STREAKS_CTE = """
+            outcomes AS (
+                SELECT 
+                    sign(profit_loss) as outcome,
+                    row_number() OVER (ORDER BY {order_by}, id) as seq
+                FROM {source}
+                WHERE profit_loss <> 0
+            ),
+            streaks AS (
+                SELECT outcome, count(*) as streak_length
+                FROM (
+                    SELECT 
+                        outcome,
+                        seq - row_number() OVER (PARTITION BY outcome ORDER BY seq) as island
+                    FROM outcomes
+                ) islands
+                GROUP BY outcome, island
+            )"""
 
 class DatabaseConnection:
-    def __init__(self, host: str, port: int, dbname: str, user: str, password: str):
+    def __init__(self, host: str, port: int, dbname: str, user: str, password: str,
+                 slow_call_ms: float = 1000.0, metrics: Optional[QueryMetricsRegistry] = None,
+                 explain_interval_s: float = 300.0):
         self.connection_params = {
             'host': host,
             'port': port,
@@ -20,11 +49,17 @@ class DatabaseConnection:
             'password': password
         }
         self.conn = None
+        # Every get_* call is timed into this registry; calls slower than
+        # slow_call_ms have their statements logged with EXPLAIN ANALYZE plans,
+        # each statement at most once per explain_interval_s.
+        self.slow_call_ms = slow_call_ms
+        self.metrics = metrics or default_registry
+        self.explain_interval_s = explain_interval_s
         
     def connect(self) -> None:
         """Establish database connection"""
         try:
-            self.conn = psycopg2.connect(**self.connection_params)
+            self.conn = psycopg2.connect(**self.connection_params, cursor_factory=InstrumentedCursor)
         except psycopg2.Error as e:
             raise Exception(f"Failed to connect to database: {str(e)}")
             
@@ -33,6 +68,7 @@ class DatabaseConnection:
         if self.conn:
             self.conn.close()
             
+    @instrumented
     def get_database_metrics(self) -> DatabaseMetrics:
         """Retrieve core database metrics"""
         query = """
@@ -53,6 +89,7 @@ class DatabaseConnection:
                 last_updated=datetime.now()
             )
             
+    @instrumented
     def get_table_space_usage(self) -> List[TableSpaceUsage]:
         """Retrieve table space usage information"""
         query = """
@@ -79,6 +116,7 @@ class DatabaseConnection:
                 for row in cur.fetchall()
             ]
             
+    @instrumented
     def get_slow_queries(self) -> List[SlowQuery]:
         """Retrieve information about slow queries"""
         query = """
@@ -108,6 +146,7 @@ class DatabaseConnection:
                 for row in cur.fetchall()
             ]
             
+    @instrumented
     def get_cache_statistics(self) -> List[CacheStatistics]:
         """Retrieve cache performance metrics"""
         query = """
@@ -139,11 +178,12 @@ class DatabaseConnection:
                 for row in cur.fetchall()
             ]
             
+    @instrumented
     def get_index_usage(self) -> List[IndexUsage]:
         """Retrieve index usage statistics"""
         query = """
             SELECT
-                i.indexrelname as index_name,
+                s.indexrelname as index_name,
                 t.relname as table_name,
                 pg_relation_size(i.indexrelid) / (1024 * 1024.0) as size_mb,
                 s.idx_scan as scan_count,
@@ -168,6 +208,7 @@ class DatabaseConnection:
                 for row in cur.fetchall()
             ]
             
+    @instrumented
     def get_database_health(self) -> DatabaseHealth:
         """Retrieve overall database health information"""
         return DatabaseHealth(
@@ -179,6 +220,7 @@ class DatabaseConnection:
             last_check=datetime.now()
         )
 
+    @instrumented
     def get_account(self, account_id: int) -> Account:
         """Retrieve account information"""
         query = """
@@ -196,6 +238,7 @@ class DatabaseConnection:
                 raise Exception(f"Account {account_id} not found")
             return Account(*row)
 
+    @instrumented
     def get_trades(self, account_id: int, start_date: datetime, end_date: datetime) -> List[Trade]:
         """Retrieve trades for a specific account within date range"""
         query = """
@@ -232,36 +275,48 @@ class DatabaseConnection:
                 for row in cur.fetchall()
             ]
 
+    @instrumented
     def get_overview_metrics(self, account_id: int) -> OverviewMetrics:
         """Retrieve overview metrics for an account"""
+        # Daily closing balances come from account_daily_rollups, which triggers
+        # keep current, so the cost depends on the number of days rather than
+        # on the number of snapshots.
         query = """
-            WITH daily_balance AS (
-                SELECT date_trunc('day', time) as date, 
-                       last(balance, time) as balance
+            WITH latest AS (
+                SELECT balance, equity, margin, margin_level, floating_pl
                 FROM account_snapshots
                 WHERE account_id = %s
-                GROUP BY date_trunc('day', time)
-                ORDER BY date
+                ORDER BY time DESC
+                LIMIT 1
             )
             SELECT 
-                a.balance as total_balance,
-                a.equity,
-                a.margin as margin_used,
-                a.margin_level,
-                a.floating_pl,
-                (a.equity - lag(a.equity, 1) OVER (ORDER BY time)) as daily_pl,
+                l.balance as total_balance,
+                l.equity,
+                l.margin as margin_used,
+                l.margin_level,
+                l.floating_pl,
+                l.equity - (SELECT equity
+                            FROM account_daily_rollups
+                            WHERE account_id = %s
+                            AND date < (now() AT TIME ZONE 'UTC')::date
+                            AND equity IS NOT NULL
+                            ORDER BY date DESC
+                            LIMIT 1) as daily_pl,
                 (SELECT count(*) FROM trades WHERE account_id = %s AND close_time IS NULL) as open_positions,
                 (SELECT count(*) FROM orders WHERE account_id = %s AND status = 'active') as active_orders,
-                array_agg(db.balance ORDER BY db.date) as growth_values,
-                array_agg(db.date ORDER BY db.date) as growth_dates
-            FROM account_snapshots a
-            JOIN daily_balance db ON a.account_id = %s
-            WHERE a.account_id = %s
-            AND a.time = (SELECT max(time) FROM account_snapshots WHERE account_id = %s)
+                (SELECT array_agg(balance ORDER BY date)
+                 FROM account_daily_rollups
+                 WHERE account_id = %s AND balance IS NOT NULL) as growth_values,
+                (SELECT array_agg(date ORDER BY date)
+                 FROM account_daily_rollups
+                 WHERE account_id = %s AND balance IS NOT NULL) as growth_dates
+            FROM latest l
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (account_id,) * 6)
             row = cur.fetchone()
+            if not row:
+                raise Exception(f"No snapshots found for account {account_id}")
             return OverviewMetrics(
                 total_balance=row[0],
                 equity=row[1],
@@ -271,29 +326,44 @@ class DatabaseConnection:
                 daily_pl=row[5] or 0,
                 open_positions=row[6],
                 active_orders=row[7],
-                account_growth=row[8],
-                growth_dates=row[9]
+                account_growth=row[8] or [],
+                growth_dates=row[9] or []
             )
 
+    # Not @instrumented: a slow refresh would be re-run by EXPLAIN ANALYZE
+    def refresh_daily_rollups(self, account_id: int) -> None:
+        """Rebuild the daily rollup rows of an account from its snapshots and trades"""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT rebuild_account_daily_rollups(%s)", (account_id,))
+        self.conn.commit()
+
+    @instrumented
     def get_profit_loss_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> ProfitLossMetrics:
         """Retrieve profit/loss metrics for an account"""
+        # Aggregates and streaks come from one scan of the closed trades opened
+        # in range, served by the (account_id, open_time) index.
         query = """
-            WITH trade_stats AS (
+            WITH closed_trades AS (
+                SELECT id, close_time, profit_loss
+                FROM trades
+                WHERE account_id = %s
+                AND open_time BETWEEN %s AND %s
+                AND close_time IS NOT NULL
+            ),
+""" + STREAKS_CTE.format(source='closed_trades', order_by='close_time') + """,
+            trade_stats AS (
                 SELECT 
-                    sum(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
+                    coalesce(sum(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END), 0) as winning_trades,
                     count(*) as total_trades,
-                    sum(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END) as total_profit,
-                    sum(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END) as total_loss,
+                    coalesce(sum(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END), 0) as total_profit,
+                    coalesce(sum(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END), 0) as total_loss,
                     max(profit_loss) as best_trade,
                     min(profit_loss) as worst_trade,
                     avg(CASE WHEN profit_loss > 0 THEN profit_loss END) as avg_win,
                     avg(CASE WHEN profit_loss < 0 THEN profit_loss END) as avg_loss
-                FROM trades
-                WHERE account_id = %s
-                AND open_time BETWEEN %s AND %s
-                AND close_time IS NOT NULL
+                FROM closed_trades
             )
-            SELECT *,
+            SELECT ts.*,
                    CASE WHEN total_trades > 0 
                         THEN winning_trades::float / total_trades 
                         ELSE 0 
@@ -301,49 +371,33 @@ class DatabaseConnection:
                    CASE WHEN total_loss != 0 
                         THEN abs(total_profit / total_loss)
                         ELSE 0
-                   END as profit_factor
-            FROM trade_stats
+                   END as profit_factor,
+                   (SELECT coalesce(max(streak_length), 0) FROM streaks WHERE outcome > 0) as max_win_streak,
+                   (SELECT coalesce(max(streak_length), 0) FROM streaks WHERE outcome < 0) as max_loss_streak
+            FROM trade_stats ts
         """
         with self.conn.cursor() as cur:
             cur.execute(query, (account_id, start_date, end_date))
             row = cur.fetchone()
             
-            # Get consecutive wins/losses
-            streak_query = """
-                SELECT 
-                    max(win_streak) as max_win_streak,
-                    max(loss_streak) as max_loss_streak
-                FROM (
-                    SELECT 
-                        sum(CASE WHEN profit_loss > 0 
-                            THEN 1 ELSE 0 END) OVER (ORDER BY close_time) as win_streak,
-                        sum(CASE WHEN profit_loss < 0 
-                            THEN 1 ELSE 0 END) OVER (ORDER BY close_time) as loss_streak
-                    FROM trades
-                    WHERE account_id = %s
-                    AND close_time BETWEEN %s AND %s
-                ) streaks
-            """
-            cur.execute(streak_query, (account_id, start_date, end_date))
-            streak_row = cur.fetchone()
-            
             return ProfitLossMetrics(
                 total_pl=row[2] + row[3],  # total_profit + total_loss
                 win_rate=row[8],
                 avg_trade=(row[2] + row[3]) / row[1] if row[1] > 0 else 0,
                 profit_factor=row[9],
-                best_trade=row[4],
-                worst_trade=row[5],
+                best_trade=row[4] or 0,
+                worst_trade=row[5] or 0,
                 total_trades=row[1],
                 winning_trades=row[0],
                 losing_trades=row[1] - row[0],
-                consecutive_wins=streak_row[0],
-                consecutive_losses=streak_row[1],
+                consecutive_wins=row[10],
+                consecutive_losses=row[11],
                 average_win=row[6] or 0,
                 average_loss=row[7] or 0,
-                risk_reward_ratio=abs(row[6] / row[7]) if row[7] else 0
+                risk_reward_ratio=abs(row[6] / row[7]) if row[6] and row[7] else 0
             )
 
+    @instrumented
     def get_session_analysis(self, account_id: int, start_date: datetime, end_date: datetime) -> List[SessionAnalysis]:
         """Retrieve session analysis metrics"""
         query = """
@@ -394,62 +448,60 @@ class DatabaseConnection:
                 for row in cur.fetchall()
             ]
 
+    @instrumented
     def get_risk_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> RiskMetrics:
         """Retrieve risk management metrics"""
+        # Per-day P/L, trade counts and closing balances are read from
+        # account_daily_rollups instead of joining trades to snapshots.
         query = """
-            WITH daily_returns AS (
+            WITH days AS (
                 SELECT 
-                    date_trunc('day', close_time) as date,
-                    sum(profit_loss) / lag(balance) OVER (ORDER BY date_trunc('day', close_time)) as daily_return,
-                    max(balance) as balance
-                FROM trades t
-                JOIN account_snapshots a ON t.account_id = a.account_id 
-                    AND date_trunc('day', t.close_time) = date_trunc('day', a.time)
-                WHERE t.account_id = %s
-                AND t.close_time BETWEEN %s AND %s
-                GROUP BY date_trunc('day', close_time)
+                    date,
+                    balance,
+                    realized_pl,
+                    gross_profit,
+                    gross_loss,
+                    trade_count,
+                    realized_pl / nullif(lag(balance) OVER (ORDER BY date), 0) as daily_return
+                FROM account_daily_rollups
+                WHERE account_id = %s
+                AND date BETWEEN (%s::timestamptz AT TIME ZONE 'UTC')::date
+                    AND (%s::timestamptz AT TIME ZONE 'UTC')::date
             ),
             drawdown AS (
                 SELECT 
-                    max(balance) OVER (ORDER BY time) - balance as drawdown_amount,
-                    (max(balance) OVER (ORDER BY time) - balance) / max(balance) OVER (ORDER BY time) as drawdown_percentage
-                FROM account_snapshots
-                WHERE account_id = %s
-                AND time BETWEEN %s AND %s
+                    max(balance) OVER (ORDER BY date) - balance as drawdown_amount,
+                    (max(balance) OVER (ORDER BY date) - balance) / nullif(max(balance) OVER (ORDER BY date), 0) as drawdown_percentage
+                FROM days
+                WHERE balance IS NOT NULL
             )
             SELECT 
-                (avg(daily_return) / stddev(daily_return)) * sqrt(252) as sharp_ratio,
-                max(drawdown_amount) as max_drawdown,
-                max(drawdown_percentage) as max_drawdown_percentage,
-                (SELECT abs(sum(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END) / 
-                        NULLIF(sum(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END), 0))
-                 FROM trades 
-                 WHERE account_id = %s
-                 AND close_time BETWEEN %s AND %s) as profit_factor,
-                (SELECT count(*) / extract(epoch from %s - %s) * 604800
-                 FROM trades
-                 WHERE account_id = %s
-                 AND close_time BETWEEN %s AND %s) as trades_per_week
-            FROM daily_returns
+                (SELECT (avg(daily_return) / nullif(stddev(daily_return), 0)) * sqrt(252) FROM days) as sharp_ratio,
+                (SELECT max(drawdown_amount) FROM drawdown) as max_drawdown,
+                (SELECT max(drawdown_percentage) FROM drawdown) as max_drawdown_percentage,
+                abs(sum(gross_profit) / nullif(sum(gross_loss), 0)) as profit_factor,
+                sum(trade_count) / extract(epoch from %s - %s) * 604800 as trades_per_week
+            FROM days
         """
         with self.conn.cursor() as cur:
-            cur.execute(query, (account_id, start_date, end_date) * 3 + (start_date, end_date))
+            cur.execute(query, (account_id, start_date, end_date, end_date, start_date))
             row = cur.fetchone()
             
             # Calculate VaR and Expected Shortfall
             returns_query = """
-                SELECT profit_loss / balance as return
+                SELECT t.profit_loss / r.balance as return
                 FROM trades t
-                JOIN account_snapshots a ON t.account_id = a.account_id 
-                    AND date_trunc('day', t.close_time) = date_trunc('day', a.time)
+                JOIN account_daily_rollups r ON r.account_id = t.account_id 
+                    AND r.date = (t.close_time AT TIME ZONE 'UTC')::date
                 WHERE t.account_id = %s
                 AND t.close_time BETWEEN %s AND %s
+                AND r.balance IS NOT NULL
                 ORDER BY return
             """
             cur.execute(returns_query, (account_id, start_date, end_date))
             returns = [r[0] for r in cur.fetchall()]
             
-            var_95 = sorted(returns)[int(len(returns) * 0.05)] if returns else 0
+            var_95 = returns[int(len(returns) * 0.05)] if returns else 0
             expected_shortfall = sum(r for r in returns if r <= var_95) / (len(returns) * 0.05) if returns else 0
             
             return RiskMetrics(
@@ -465,6 +517,7 @@ class DatabaseConnection:
                 expected_shortfall=expected_shortfall
             )
 
+    @instrumented
     def get_portfolio_metrics(self, account_id: int) -> PortfolioMetrics:
         """Retrieve portfolio metrics"""
         query = """
@@ -557,6 +610,7 @@ class DatabaseConnection:
                 correlation_matrix=correlation_matrix
             )
 
+    @instrumented
     def get_long_short_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> LongShortMetrics:
         """Retrieve long/short analysis metrics"""
         query = """
@@ -597,66 +651,78 @@ class DatabaseConnection:
                 avg_short_profit=short_stats[4] if short_stats else 0
             )
 
-    def get_sequence_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> SequenceMetrics:
-        """Retrieve trade sequence metrics"""
-        # Get trades
-        trades = self.get_trades(account_id, start_date, end_date)
-        
-        # Calculate streaks
-        current_streak = 0
-        max_win_streak = 0
-        max_loss_streak = 0
-        
-        for trade in trades:
-            if trade.profit_loss and trade.profit_loss > 0:
-                if current_streak > 0:
-                    current_streak += 1
-                else:
-                    current_streak = 1
-                max_win_streak = max(max_win_streak, current_streak)
-            elif trade.profit_loss and trade.profit_loss < 0:
-                if current_streak < 0:
-                    current_streak -= 1
-                else:
-                    current_streak = -1
-                max_loss_streak = max(max_loss_streak, abs(current_streak))
+    @instrumented
+    def get_sequence_metrics(self, account_id: int, start_date: datetime, end_date: datetime,
+                             include_trades: bool = False) -> SequenceMetrics:
+        """Retrieve trade sequence metrics
+
+        Streaks, distributions and the average duration are computed by the
+        database in one round-trip. The trade list itself is only fetched when
+        include_trades is set.
+        """
+        # Each branch returns (kind, label, key, value)
+        query = """
+            WITH period_trades AS (
+                SELECT id, open_time, close_time, volume, profit_loss
+                FROM trades
+                WHERE account_id = %s
+                AND open_time BETWEEN %s AND %s
+            ),
+""" + STREAKS_CTE.format(source='period_trades', order_by='open_time') + """
+            SELECT 'hour', NULL, extract(hour from open_time)::float, count(*)::float
+            FROM period_trades
+            GROUP BY extract(hour from open_time)
+            UNION ALL
+            SELECT 'weekday', trim(to_char(open_time, 'Day')), NULL, count(*)::float
+            FROM period_trades
+            GROUP BY trim(to_char(open_time, 'Day'))
+            UNION ALL
+            SELECT 'volume', NULL, volume::float, count(*)::float
+            FROM period_trades
+            GROUP BY volume
+            UNION ALL
+            SELECT 'win_streak', NULL, NULL, coalesce(max(streak_length), 0)::float
+            FROM streaks
+            WHERE outcome > 0
+            UNION ALL
+            SELECT 'loss_streak', NULL, NULL, coalesce(max(streak_length), 0)::float
+            FROM streaks
+            WHERE outcome < 0
+            UNION ALL
+            SELECT 'avg_duration', NULL, NULL, extract(epoch from avg(close_time - open_time)) / 3600
+            FROM period_trades
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (account_id, start_date, end_date))
+            rows = cur.fetchall()
         
-        # Calculate distributions
         time_dist = {}
         weekday_dist = {}
         volume_dist = {}
+        totals = {}
+        for kind, label, key, value in rows:
+            if kind == 'hour':
+                time_dist[int(key)] = int(value)
+            elif kind == 'weekday':
+                weekday_dist[label] = int(value)
+            elif kind == 'volume':
+                volume_dist[key] = int(value)
+            else:
+                totals[kind] = value
         
-        for trade in trades:
-            # Hour distribution
-            hour = trade.open_time.hour
-            time_dist[hour] = time_dist.get(hour, 0) + 1
-            
-            # Weekday distribution
-            weekday = trade.open_time.strftime('%A')
-            weekday_dist[weekday] = weekday_dist.get(weekday, 0) + 1
-            
-            # Volume distribution
-            volume_dist[trade.volume] = volume_dist.get(trade.volume, 0) + 1
-        
-        # Calculate average trade duration
-        durations = []
-        for trade in trades:
-            if trade.close_time:
-                duration = (trade.close_time - trade.open_time).total_seconds() / 3600  # hours
-                durations.append(duration)
-        
-        avg_duration = sum(durations) / len(durations) if durations else 0
+        trades = self.get_trades(account_id, start_date, end_date) if include_trades else []
         
         return SequenceMetrics(
             trades=trades,
-            win_streak=max_win_streak,
-            loss_streak=max_loss_streak,
-            avg_trade_duration=avg_duration,
+            win_streak=int(totals.get('win_streak') or 0),
+            loss_streak=int(totals.get('loss_streak') or 0),
+            avg_trade_duration=totals.get('avg_duration') or 0,
             time_distribution=time_dist,
             weekday_distribution=weekday_dist,
             volume_distribution=volume_dist
         )
 
+    @instrumented
     def get_summary_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> SummaryMetrics:
         """Retrieve summary metrics"""
         query = """
@@ -688,7 +754,7 @@ class DatabaseConnection:
                 max(d.drawdown_amount) as absolute_drawdown,
                 max(d.drawdown_percentage) as relative_drawdown
             FROM trade_stats ts
-            CROSS JOIN drawdown d
+            LEFT JOIN drawdown d ON true
             GROUP BY 
                 ts.gross_profit, ts.gross_loss, ts.total_trades, ts.win_rate,
                 ts.profit_factor, ts.expected_payoff, ts.avg_trade_length, ts.trading_days
@@ -705,9 +771,9 @@ class DatabaseConnection:
                 win_rate=row[3] or 0,
                 profit_factor=row[4] or 0,
                 expected_payoff=row[5] or 0,
-                absolute_drawdown=row[9] or 0,
-                maximal_drawdown=row[9] or 0,  # Same as absolute for now
-                relative_drawdown=row[10] or 0,
+                absolute_drawdown=row[8] or 0,
+                maximal_drawdown=row[8] or 0,  # Same as absolute for now
+                relative_drawdown=row[9] or 0,
                 trades_per_day=row[2] / row[7] if row[7] > 0 else 0,
                 avg_trade_length=row[6] or 0,
                 trading_days=row[7]
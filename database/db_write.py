@@ -1,22 +1,177 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+import hashlib
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
 from datetime import datetime
 from database.classes import (
     Trade, Account, OverviewMetrics, ProfitLossMetrics,
     SessionAnalysis, RiskMetrics, PortfolioMetrics,
     LongShortMetrics, AIMetrics, SequenceMetrics,
-    SummaryMetrics
+    SummaryMetrics, WriteThroughput, RetentionPolicy
 )
+from utils.scheduler import Scheduler
+
+TRADE_INDEXES = {
+    'trades_account_open_time_idx': "CREATE INDEX IF NOT EXISTS trades_account_open_time_idx ON trades (account_id, open_time)",
+    'trades_account_close_time_idx': "CREATE INDEX IF NOT EXISTS trades_account_close_time_idx ON trades (account_id, close_time)",
+}
+
+# Tables whose rows belong to an account, used when merging duplicate accounts
+ACCOUNT_CHILD_TABLES = [
+    'trades', 'overview_metrics', 'profit_loss_metrics', 'risk_metrics',
+    'portfolio_metrics', 'long_short_metrics', 'ai_metrics',
+    'sequence_metrics', 'summary_metrics'
+]
+
+# Append-only metric snapshot tables managed by the retention policy
+METRIC_TABLES = [
+    'overview_metrics', 'profit_loss_metrics', 'risk_metrics',
+    'portfolio_metrics', 'long_short_metrics', 'ai_metrics',
+    'sequence_metrics', 'summary_metrics'
+]
+
+# Child rows removed together with the snapshot they belong to
+METRIC_CHILD_TABLES = {
+    'portfolio_allocation': ('portfolio_metric_id', 'portfolio_metrics'),
+    'ai_levels': ('ai_metric_id', 'ai_metrics'),
+}
+
+# Rows whose inserts/updates are recorded in change_log for SqliteChangeFeed
+CHANGE_LOG_TRIGGERS = {
+    'trades_change_insert': ('trades', 'INSERT'),
+    'trades_change_update': ('trades', 'UPDATE'),
+    'overview_metrics_change_insert': ('overview_metrics', 'INSERT'),
+}
+
+def change_log_trigger_sql(trigger: str) -> str:
+    """CREATE TRIGGER statement of one of CHANGE_LOG_TRIGGERS"""
+    table, operation = CHANGE_LOG_TRIGGERS[trigger]
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS {trigger}
+        AFTER {operation} ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, row_id, account_id, operation)
+            VALUES ('{table}', NEW.id, NEW.account_id, '{operation}');
+        END
+    """
+
+# Trades written before broker ids were stored have a NULL broker_trade_id;
+# these columns identify the same position when it is written again
+LEGACY_TRADE_KEY = ('symbol', 'direction', 'open_time', 'open_price', 'volume')
+
+# Re-sent trades only rewrite their row when the content hash changed
+INSERT_TRADE_SQL = """
+    INSERT INTO trades (
+        broker_trade_id, account_id, symbol, direction, open_time, close_time,
+        open_price, close_price, volume, profit_loss, swap,
+        commission, take_profit, stop_loss, comment, status, content_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (account_id, broker_trade_id) DO UPDATE SET
+        symbol = excluded.symbol,
+        direction = excluded.direction,
+        open_time = excluded.open_time,
+        close_time = excluded.close_time,
+        open_price = excluded.open_price,
+        close_price = excluded.close_price,
+        volume = excluded.volume,
+        profit_loss = excluded.profit_loss,
+        swap = excluded.swap,
+        commission = excluded.commission,
+        take_profit = excluded.take_profit,
+        stop_loss = excluded.stop_loss,
+        comment = excluded.comment,
+        status = excluded.status,
+        content_hash = excluded.content_hash
+    WHERE trades.content_hash IS NOT excluded.content_hash
+"""
+
+def content_hash(values: Tuple) -> str:
+    """Stable digest of a row's values used to skip unchanged upserts"""
+    return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).hexdigest()
 
 class DatabaseWriter:
-    def __init__(self, db_path: str):
+    # Imports at least this large drop the trade indexes and rebuild them afterwards
+    DEFER_INDEX_THRESHOLD = 50000
+    # change_log entries older than this are dropped by compact()
+    CHANGE_LOG_HOURS = 24
+    
+    def __init__(self, db_path: str, journal_mode: str = 'WAL', synchronous: str = 'NORMAL',
+                 retention: Optional[RetentionPolicy] = None):
         self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        # Time-series mode: metric snapshots are downsampled and expired by compact()
+        self.retention = retention
+        self._compaction_scheduler: Optional[Scheduler] = None
+        self._owns_compaction_scheduler = False
+        self._compaction_job = f"compact:{db_path}"
+        # One long-lived connection per thread, tracked so close() can release them all
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         self.setup_database()
         
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the configured journaling and sync pragmas"""
+        # Transactions are managed explicitly by transaction()
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        # Lets compact() return freed pages without a full VACUUM. On a new file
+        # this must come before journal_mode, which writes the database header;
+        # existing files are converted once by setup_database()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if self.journal_mode:
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous:
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+        
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+        
+    def close(self):
+        """Close every connection opened by this writer"""
+        self.stop_compaction_schedule()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+        
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run the enclosed writes atomically; nested calls join the outer transaction"""
+        conn = self._connection()
+        if conn.in_transaction:
+            yield conn.cursor()
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        
     def setup_database(self):
         """Create necessary tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             
             # Create tables for each metric type
             cursor.execute("""
@@ -32,6 +187,7 @@ class DatabaseWriter:
                     server TEXT,
                     max_positions INTEGER,
                     max_volume REAL,
+                    content_hash TEXT,
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
@@ -39,6 +195,7 @@ class DatabaseWriter:
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS trades (
                     id INTEGER PRIMARY KEY,
+                    broker_trade_id INTEGER,
                     account_id INTEGER,
                     symbol TEXT,
                     direction TEXT,
@@ -54,10 +211,19 @@ class DatabaseWriter:
                     stop_loss REAL,
                     comment TEXT,
                     status TEXT,
+                    content_hash TEXT,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
             """)
             
+            # Databases created before upserts were introduced lack these columns
+            self._ensure_column(cursor, 'accounts', 'content_hash', 'TEXT')
+            self._ensure_column(cursor, 'trades', 'broker_trade_id', 'INTEGER')
+            self._ensure_column(cursor, 'trades', 'content_hash', 'TEXT')
+            
+            for statement in TRADE_INDEXES.values():
+                cursor.execute(statement)
+            
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS overview_metrics (
                     id INTEGER PRIMARY KEY,
@@ -70,6 +236,7 @@ class DatabaseWriter:
                     daily_pl REAL,
                     open_positions INTEGER,
                     active_orders INTEGER,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
@@ -93,6 +260,7 @@ class DatabaseWriter:
                     average_win REAL,
                     average_loss REAL,
                     risk_reward_ratio REAL,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
@@ -112,6 +280,7 @@ class DatabaseWriter:
                     risk_per_trade REAL,
                     var_95 REAL,
                     expected_shortfall REAL,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
@@ -125,6 +294,7 @@ class DatabaseWriter:
                     daily_pl REAL,
                     monthly_pl REAL,
                     yearly_pl REAL,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
@@ -155,6 +325,7 @@ class DatabaseWriter:
                     short_win_rate REAL,
                     avg_long_profit REAL,
                     avg_short_profit REAL,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
@@ -169,6 +340,7 @@ class DatabaseWriter:
                     market_regime TEXT,
                     volatility_forecast REAL,
                     trend_strength REAL,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
@@ -191,6 +363,7 @@ class DatabaseWriter:
                     win_streak INTEGER,
                     loss_streak INTEGER,
                     avg_trade_duration REAL,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
@@ -213,53 +386,316 @@ class DatabaseWriter:
                     trades_per_day REAL,
                     avg_trade_length REAL,
                     trading_days INTEGER,
+                    resolution TEXT NOT NULL DEFAULT 'raw',
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(account_id) REFERENCES accounts(id)
                 )
             """)
             
-            conn.commit()
+            for table in METRIC_TABLES:
+                self._ensure_column(cursor, table, 'resolution', "TEXT NOT NULL DEFAULT 'raw'")
+                cursor.execute(f"""
+                    CREATE INDEX IF NOT EXISTS {table}_account_timestamp_idx
+                    ON {table} (account_id, timestamp)
+                """)
+            
+            # AUTOINCREMENT keeps change ids monotonic after compact() trims the log.
+            # last_row_id is set on entries covering the id range row_id..last_row_id
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS change_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    last_row_id INTEGER,
+                    account_id INTEGER,
+                    operation TEXT NOT NULL,
+                    changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            self._ensure_column(cursor, 'change_log', 'last_row_id', "INTEGER")
+            for trigger in CHANGE_LOG_TRIGGERS:
+                cursor.execute(change_log_trigger_sql(trigger))
+            
+            # Child rows are looked up per snapshot by the read model and compact()
+            for child, (column, _) in METRIC_CHILD_TABLES.items():
+                cursor.execute(f"""
+                    CREATE INDEX IF NOT EXISTS {child}_{column}_idx
+                    ON {child} ({column})
+                """)
+            
+            self._merge_duplicate_accounts(cursor)
+            # A NULL server never conflicts in a plain (login, server) index
+            cursor.execute("DROP INDEX IF EXISTS accounts_login_server_idx")
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS accounts_login_server_key_idx
+                ON accounts (login, coalesce(server, ''))
+            """)
+            self._dedupe_legacy_trades(cursor)
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS trades_account_broker_id_idx
+                ON trades (account_id, broker_trade_id)
+            """)
+        
+        # Files created without incremental auto_vacuum switch over with one
+        # full VACUUM, which rewrites the file in the mode set by _connect()
+        conn = self._connection()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("VACUUM")
+            
+    def _ensure_column(self, cursor: sqlite3.Cursor, table: str, column: str, declaration: str):
+        """Add a column to an existing table if it is missing"""
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+            
+    def _merge_duplicate_accounts(self, cursor: sqlite3.Cursor):
+        """Collapse accounts sharing a login/server onto the newest row"""
+        duplicates = cursor.execute("""
+            SELECT login, server, max(id), group_concat(id)
+            FROM accounts
+            GROUP BY login, coalesce(server, '')
+            HAVING count(*) > 1
+        """).fetchall()
+        for login, server, keep_id, ids in duplicates:
+            stale_ids = [int(i) for i in ids.split(',') if int(i) != keep_id]
+            placeholders = ', '.join('?' * len(stale_ids))
+            for table in ACCOUNT_CHILD_TABLES:
+                cursor.execute(
+                    f"UPDATE OR IGNORE {table} SET account_id = ? WHERE account_id IN ({placeholders})",
+                    [keep_id] + stale_ids
+                )
+            # Trades left behind collided with ones the kept account already has
+            cursor.execute(f"DELETE FROM trades WHERE account_id IN ({placeholders})", stale_ids)
+            cursor.execute(f"DELETE FROM accounts WHERE id IN ({placeholders})", stale_ids)
+            
+    def _dedupe_legacy_trades(self, cursor: sqlite3.Cursor):
+        """Keep the newest of legacy trades repeated by re-syncs before upserts existed"""
+        key = ', '.join(LEGACY_TRADE_KEY)
+        cursor.execute(f"""
+            DELETE FROM trades
+            WHERE broker_trade_id IS NULL
+            AND id NOT IN (
+                SELECT max(id) FROM trades
+                WHERE broker_trade_id IS NULL
+                GROUP BY account_id, {key}
+            )
+        """)
+            
+    def _replace_legacy_trades(self, cursor: sqlite3.Cursor, account_id: int):
+        """Drop legacy trades of an account that have been written again with a broker id"""
+        match = ' AND '.join(f"current.{column} IS trades.{column}" for column in LEGACY_TRADE_KEY)
+        # Served by the (account_id, broker_trade_id) index; no-op once legacy rows are gone
+        cursor.execute(f"""
+            DELETE FROM trades
+            WHERE account_id = ?
+            AND broker_trade_id IS NULL
+            AND EXISTS (
+                SELECT 1 FROM trades AS current
+                WHERE current.account_id = trades.account_id
+                AND current.broker_trade_id IS NOT NULL
+                AND {match}
+            )
+        """, (account_id,))
+            
+    def compact(self, policy: Optional[RetentionPolicy] = None, vacuum: bool = True) -> Dict[str, int]:
+        """Downsample and expire metric snapshots, returning deleted rows per table
+
+        Raw snapshots older than policy.raw_days are thinned to the last one
+        per account and hour, hourly ones older than policy.hourly_days to the
+        last one per day, and daily ones older than policy.daily_days removed.
+        """
+        policy = policy or self.retention or RetentionPolicy()
+        steps = [
+            ('raw', 'hour', '%Y-%m-%d %H', policy.raw_days),
+            ('hour', 'day', '%Y-%m-%d', policy.hourly_days),
+        ]
+        deleted = {}
+        with self.transaction() as cursor:
+            for table in METRIC_TABLES:
+                deleted[table] = 0
+                for resolution, coarser, bucket, days in steps:
+                    cutoff = f"-{days} days"
+                    cursor.execute(f"""
+                        DELETE FROM {table}
+                        WHERE resolution = ?
+                        AND timestamp < datetime('now', ?)
+                        AND id NOT IN (
+                            SELECT max(id) FROM {table}
+                            WHERE resolution = ?
+                            AND timestamp < datetime('now', ?)
+                            GROUP BY account_id, strftime(?, timestamp)
+                        )
+                    """, (resolution, cutoff, resolution, cutoff, bucket))
+                    deleted[table] += cursor.rowcount
+                    cursor.execute(f"""
+                        UPDATE {table} SET resolution = ?
+                        WHERE resolution = ?
+                        AND timestamp < datetime('now', ?)
+                    """, (coarser, resolution, cutoff))
+                if policy.daily_days is not None:
+                    cursor.execute(f"""
+                        DELETE FROM {table}
+                        WHERE resolution = 'day'
+                        AND timestamp < datetime('now', ?)
+                    """, (f"-{policy.daily_days} days",))
+                    deleted[table] += cursor.rowcount
+            for child, (column, parent) in METRIC_CHILD_TABLES.items():
+                cursor.execute(f"""
+                    DELETE FROM {child}
+                    WHERE {column} NOT IN (SELECT id FROM {parent})
+                """)
+            cursor.execute("""
+                DELETE FROM change_log
+                WHERE changed_at < datetime('now', ?)
+            """, (f"-{self.CHANGE_LOG_HOURS} hours",))
+        if vacuum:
+            self.vacuum()
+        return deleted
+        
+    def vacuum(self):
+        """Return free pages to the filesystem"""
+        conn = self._connection()
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if auto_vacuum == 2:
+            # Each step of the pragma frees one page; execute() steps it only once
+            conn.executescript("PRAGMA incremental_vacuum")
+        else:
+            conn.execute("VACUUM")
+            
+    def start_compaction_schedule(self, interval_hours: float = 6, scheduler: Optional[Scheduler] = None):
+        """Run compact() periodically, on the given scheduler or on one owned by the writer"""
+        if self._compaction_scheduler is not None:
+            return
+        self._owns_compaction_scheduler = scheduler is None
+        self._compaction_scheduler = scheduler or Scheduler(max_workers=1, name="Compaction")
+        # Compaction is idempotent, so runs missed while asleep collapse into one
+        self._compaction_scheduler.add_job(
+            self._compaction_job, self._run_compaction, interval_hours * 3600, missed='run_once'
+        )
+        self._compaction_scheduler.start()
+        
+    def _run_compaction(self):
+        try:
+            self.compact()
+        except sqlite3.Error as e:
+            print(f"Metric compaction failed: {str(e)}")
+            
+    def stop_compaction_schedule(self):
+        """Stop periodic compaction"""
+        if self._compaction_scheduler is None:
+            return
+        self._compaction_scheduler.remove_job(self._compaction_job)
+        if self._owns_compaction_scheduler:
+            self._compaction_scheduler.stop()
+        self._compaction_scheduler = None
             
     def write_account(self, account: Account) -> int:
-        """Write account data and return the account_id"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        """Insert or update an account keyed on login/server and return the account_id"""
+        values = (
+            account.login, account.name, account.balance, account.equity,
+            account.margin, account.margin_level, account.floating_pl,
+            account.server, account.max_positions, account.max_volume
+        )
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO accounts (
                     login, name, balance, equity, margin, margin_level,
-                    floating_pl, server, max_positions, max_volume
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                account.login, account.name, account.balance, account.equity,
-                account.margin, account.margin_level, account.floating_pl,
-                account.server, account.max_positions, account.max_volume
-            ))
-            return cursor.lastrowid
+                    floating_pl, server, max_positions, max_volume, content_hash
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (login, coalesce(server, '')) DO UPDATE SET
+                    name = excluded.name,
+                    balance = excluded.balance,
+                    equity = excluded.equity,
+                    margin = excluded.margin,
+                    margin_level = excluded.margin_level,
+                    floating_pl = excluded.floating_pl,
+                    max_positions = excluded.max_positions,
+                    max_volume = excluded.max_volume,
+                    content_hash = excluded.content_hash,
+                    timestamp = CURRENT_TIMESTAMP
+                WHERE accounts.content_hash IS NOT excluded.content_hash
+            """, values + (content_hash(values),))
+            cursor.execute(
+                "SELECT id FROM accounts WHERE login = ? AND coalesce(server, '') = coalesce(?, '')",
+                (account.login, account.server)
+            )
+            return cursor.fetchone()[0]
             
-    def write_trades(self, trades: List[Trade], account_id: int):
-        """Write trade data"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            for trade in trades:
-                cursor.execute("""
-                    INSERT INTO trades (
-                        account_id, symbol, direction, open_time, close_time,
-                        open_price, close_price, volume, profit_loss, swap,
-                        commission, take_profit, stop_loss, comment, status
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    account_id, trade.symbol, trade.direction.value,
-                    trade.open_time, trade.close_time, trade.open_price,
-                    trade.close_price, trade.volume, trade.profit_loss,
-                    trade.swap, trade.commission, trade.take_profit,
-                    trade.stop_loss, trade.comment, trade.status
-                ))
-            conn.commit()
+    def write_trades(self, trades: List[Trade], account_id: int, batch_size: int = 5000,
+                     defer_indexes: Optional[bool] = None) -> WriteThroughput:
+        """Upsert trade data in batches keyed on the broker trade id and return the throughput
+
+        Bulk writes (defer_indexes) also log the trades each batch inserts as
+        one change_log range entry rather than one trigger row per trade.
+        """
+        if defer_indexes is None:
+            defer_indexes = len(trades) >= self.DEFER_INDEX_THRESHOLD
+            
+        started = time.perf_counter()
+        with self.transaction() as cursor:
+            # Counted per statement: total_changes would include change_log trigger rows
+            changed = 0
+            if defer_indexes:
+                for name in TRADE_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {name}")
+                cursor.execute("DROP TRIGGER IF EXISTS trades_change_insert")
+                    
+            # executemany reuses one prepared statement; chunking bounds the
+            # number of parameter tuples held in memory at once
+            rows = (self._trade_row(trade, account_id) for trade in trades)
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                if defer_indexes:
+                    last_id = cursor.execute("SELECT coalesce(max(id), 0) FROM trades").fetchone()[0]
+                cursor.executemany(INSERT_TRADE_SQL, batch)
+                changed += cursor.rowcount
+                if defer_indexes:
+                    self._log_inserted_trades(cursor, account_id, last_id)
+            self._replace_legacy_trades(cursor, account_id)
+                
+            if defer_indexes:
+                for statement in TRADE_INDEXES.values():
+                    cursor.execute(statement)
+                cursor.execute(change_log_trigger_sql('trades_change_insert'))
+            
+        elapsed = time.perf_counter() - started
+        return WriteThroughput(
+            rows=len(trades),
+            seconds=elapsed,
+            rows_per_second=len(trades) / elapsed if elapsed > 0 else 0.0,
+            changed_rows=changed
+        )
+        
+    def _log_inserted_trades(self, cursor: sqlite3.Cursor, account_id: int, last_id: int):
+        """Record the trades inserted after id last_id as one change_log range entry
+
+        New rows take ids above the current maximum, so a batch's inserts are
+        exactly the ids past last_id; its updates are still logged by the update trigger.
+        """
+        cursor.execute("""
+            INSERT INTO change_log (table_name, row_id, last_row_id, account_id, operation)
+            SELECT 'trades', min(id), max(id), ?, 'INSERT'
+            FROM trades
+            WHERE id > ?
+            HAVING count(*) > 0
+        """, (account_id, last_id))
+            
+    def _trade_row(self, trade: Trade, account_id: int) -> Tuple:
+        """Convert a trade into INSERT_TRADE_SQL parameters"""
+        values = (
+            account_id, trade.symbol, trade.direction.value,
+            trade.open_time, trade.close_time, trade.open_price,
+            trade.close_price, trade.volume, trade.profit_loss,
+            trade.swap, trade.commission, trade.take_profit,
+            trade.stop_loss, trade.comment, trade.status
+        )
+        return (trade.id,) + values + (content_hash(values),)
             
     def write_overview_metrics(self, metrics: OverviewMetrics, account_id: int):
         """Write overview metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO overview_metrics (
                     account_id, total_balance, equity, margin_used,
@@ -271,12 +707,10 @@ class DatabaseWriter:
                 metrics.margin_used, metrics.margin_level, metrics.floating_pl,
                 metrics.daily_pl, metrics.open_positions, metrics.active_orders
             ))
-            conn.commit()
             
     def write_profit_loss_metrics(self, metrics: ProfitLossMetrics, account_id: int):
         """Write profit/loss metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO profit_loss_metrics (
                     account_id, total_pl, win_rate, avg_trade, profit_factor,
@@ -291,12 +725,10 @@ class DatabaseWriter:
                 metrics.consecutive_wins, metrics.consecutive_losses,
                 metrics.average_win, metrics.average_loss, metrics.risk_reward_ratio
             ))
-            conn.commit()
             
     def write_risk_metrics(self, metrics: RiskMetrics, account_id: int):
         """Write risk metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO risk_metrics (
                     account_id, sharp_ratio, max_drawdown, max_drawdown_percentage,
@@ -310,12 +742,10 @@ class DatabaseWriter:
                 metrics.trades_per_week, metrics.risk_per_trade,
                 metrics.var_95, metrics.expected_shortfall
             ))
-            conn.commit()
             
     def write_portfolio_metrics(self, metrics: PortfolioMetrics, account_id: int):
         """Write portfolio metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO portfolio_metrics (
                     account_id, total_value, daily_pl, monthly_pl, yearly_pl
@@ -336,12 +766,10 @@ class DatabaseWriter:
                     portfolio_id, symbol, metrics.allocation[symbol],
                     metrics.performance[symbol]
                 ))
-            conn.commit()
             
     def write_long_short_metrics(self, metrics: LongShortMetrics, account_id: int):
         """Write long/short metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO long_short_metrics (
                     account_id, long_count, long_percentage, short_count,
@@ -354,12 +782,10 @@ class DatabaseWriter:
                 metrics.short_pl, metrics.long_win_rate, metrics.short_win_rate,
                 metrics.avg_long_profit, metrics.avg_short_profit
             ))
-            conn.commit()
             
     def write_ai_metrics(self, metrics: AIMetrics, account_id: int):
         """Write AI metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO ai_metrics (
                     account_id, model_accuracy, prediction_confidence,
@@ -384,12 +810,10 @@ class DatabaseWriter:
                     INSERT INTO ai_levels (ai_metric_id, level_type, value)
                     VALUES (?, 'resistance', ?)
                 """, (ai_metric_id, level))
-            conn.commit()
             
     def write_sequence_metrics(self, metrics: SequenceMetrics, account_id: int):
         """Write sequence metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO sequence_metrics (
                     account_id, win_streak, loss_streak, avg_trade_duration
@@ -398,12 +822,10 @@ class DatabaseWriter:
                 account_id, metrics.win_streak, metrics.loss_streak,
                 metrics.avg_trade_duration
             ))
-            conn.commit()
             
     def write_summary_metrics(self, metrics: SummaryMetrics, account_id: int):
         """Write summary metrics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.transaction() as cursor:
             cursor.execute("""
                 INSERT INTO summary_metrics (
                     account_id, gross_profit, gross_loss, net_profit,
@@ -419,26 +841,26 @@ class DatabaseWriter:
                 metrics.relative_drawdown, metrics.trades_per_day,
                 metrics.avg_trade_length, metrics.trading_days
             ))
-            conn.commit()
             
     def write_all_metrics(self, account: Account, trades: List[Trade], metrics: Dict[str, Any]):
-        """Write all metrics to the database"""
-        account_id = self.write_account(account)
-        self.write_trades(trades, account_id)
-        
-        if 'overview' in metrics:
-            self.write_overview_metrics(metrics['overview'], account_id)
-        if 'profit_loss' in metrics:
-            self.write_profit_loss_metrics(metrics['profit_loss'], account_id)
-        if 'risk' in metrics:
-            self.write_risk_metrics(metrics['risk'], account_id)
-        if 'portfolio' in metrics:
-            self.write_portfolio_metrics(metrics['portfolio'], account_id)
-        if 'long_short' in metrics:
-            self.write_long_short_metrics(metrics['long_short'], account_id)
-        if 'ai' in metrics:
-            self.write_ai_metrics(metrics['ai'], account_id)
-        if 'sequence' in metrics:
-            self.write_sequence_metrics(metrics['sequence'], account_id)
-        if 'summary' in metrics:
-            self.write_summary_metrics(metrics['summary'], account_id)
+        """Write all metrics to the database in a single transaction"""
+        with self.transaction():
+            account_id = self.write_account(account)
+            self.write_trades(trades, account_id)
+            
+            if 'overview' in metrics:
+                self.write_overview_metrics(metrics['overview'], account_id)
+            if 'profit_loss' in metrics:
+                self.write_profit_loss_metrics(metrics['profit_loss'], account_id)
+            if 'risk' in metrics:
+                self.write_risk_metrics(metrics['risk'], account_id)
+            if 'portfolio' in metrics:
+                self.write_portfolio_metrics(metrics['portfolio'], account_id)
+            if 'long_short' in metrics:
+                self.write_long_short_metrics(metrics['long_short'], account_id)
+            if 'ai' in metrics:
+                self.write_ai_metrics(metrics['ai'], account_id)
+            if 'sequence' in metrics:
+                self.write_sequence_metrics(metrics['sequence'], account_id)
+            if 'summary' in metrics:
+                self.write_summary_metrics(metrics['summary'], account_id)
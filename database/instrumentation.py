@@ -0,0 +1,312 @@
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Only statements like these are re-run by EXPLAIN ANALYZE
+_SELECT = re.compile(r'\s*(SELECT|WITH)\b', re.IGNORECASE)
+_WRITE = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|DROP|ALTER|COPY|LOCK)\b', re.IGNORECASE)
+
+
+@dataclass
+class MethodStats:
+    """Accumulated call statistics for a single DatabaseConnection method"""
+    calls: int = 0
+    errors: int = 0
+    slow_calls: int = 0
+    total_ms: float = 0.0
+    rows: int = 0
+    bytes: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    durations_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+
+
+@dataclass
+class _CallRecord:
+    """Statements and result sizes observed during one instrumented call"""
+    statements: List[Tuple[str, Any]] = field(default_factory=list)
+    rows: int = 0
+    bytes: int = 0
+
+
+def _active_calls() -> List[_CallRecord]:
+    if not hasattr(_local, 'calls'):
+        _local.calls = []
+    return _local.calls
+
+
+def _estimate_row_bytes(row) -> int:
+    """Approximate the wire size of a result row"""
+    if row is None:
+        return 0
+    size = 0
+    for value in row:
+        if value is None:
+            continue
+        if isinstance(value, (str, bytes, bytearray, memoryview)):
+            size += len(value)
+        elif isinstance(value, (list, tuple)):
+            size += _estimate_row_bytes(value)
+        else:
+            size += 8
+    return size
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class QueryMetricsRegistry:
+    """Thread-safe in-process registry of per-method query statistics"""
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, MethodStats] = {}
+        # Statement text -> monotonic time it was last explained
+        self._explained: Dict[str, float] = {}
+
+    def record(self, method: str, duration_ms: float, rows: int, bytes_: int,
+               error: bool = False, slow: bool = False) -> None:
+        """Record one completed call"""
+        with self._lock:
+            stats = self._stats.setdefault(method, MethodStats())
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.slow_calls += int(slow)
+            stats.total_ms += duration_ms
+            stats.rows += rows
+            stats.bytes += bytes_
+            stats.durations_ms.append(duration_ms)
+
+    def record_buffers(self, method: str, hits: int, misses: int) -> None:
+        """Record shared buffer hits/reads measured by EXPLAIN (ANALYZE, BUFFERS)"""
+        with self._lock:
+            stats = self._stats.setdefault(method, MethodStats())
+            stats.cache_hits += hits
+            stats.cache_misses += misses
+
+    def claim_explain(self, query: str, interval_s: float) -> bool:
+        """Return True if query was not explained within the last interval_s seconds
+
+        A True result counts as explaining it now, so concurrent slow calls
+        running the same statement do not all re-run it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._explained.get(query)
+            if last is not None and now - last < interval_s:
+                return False
+            self._explained[query] = now
+            return True
+
+    def reset(self) -> None:
+        """Drop all recorded statistics"""
+        with self._lock:
+            self._stats.clear()
+            self._explained.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return method -> statistics including latency percentiles"""
+        with self._lock:
+            snapshot = {
+                name: (stats, sorted(stats.durations_ms))
+                for name, stats in self._stats.items()
+            }
+        result = {}
+        for name, (stats, durations) in snapshot.items():
+            buffers = stats.cache_hits + stats.cache_misses
+            result[name] = {
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'slow_calls': stats.slow_calls,
+                'total_ms': stats.total_ms,
+                'p50_ms': _percentile(durations, 0.5),
+                'p95_ms': _percentile(durations, 0.95),
+                'p99_ms': _percentile(durations, 0.99),
+                'max_ms': durations[-1] if durations else 0.0,
+                'rows': stats.rows,
+                'bytes': stats.bytes,
+                'cache_hits': stats.cache_hits,
+                'cache_misses': stats.cache_misses,
+                'cache_hit_ratio': stats.cache_hits / buffers if buffers else 0.0,
+            }
+        return result
+
+    def to_json(self) -> str:
+        """Export the summary as a JSON document"""
+        return json.dumps(self.summary(), indent=2, sort_keys=True)
+
+    def to_prometheus(self, prefix: str = 'slingshot_db') -> str:
+        """Export the summary in the Prometheus text exposition format"""
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_call_duration_ms DatabaseConnection call latency in milliseconds",
+            f"# TYPE {prefix}_call_duration_ms summary",
+        ]
+        for method, stats in sorted(summary.items()):
+            for q, key in zip(self.QUANTILES, ('p50_ms', 'p95_ms', 'p99_ms')):
+                lines.append(f'{prefix}_call_duration_ms{{method="{method}",quantile="{q}"}} {stats[key]}')
+            lines.append(f'{prefix}_call_duration_ms_sum{{method="{method}"}} {stats["total_ms"]}')
+            lines.append(f'{prefix}_call_duration_ms_count{{method="{method}"}} {stats["calls"]}')
+        counters = [
+            ('errors', 'Calls that raised an exception'),
+            ('slow_calls', 'Calls slower than the slow-call threshold'),
+            ('rows', 'Result rows returned'),
+            ('bytes', 'Approximate result bytes returned'),
+            ('cache_hits', 'Shared buffer hits measured on explained calls'),
+            ('cache_misses', 'Shared buffer reads measured on explained calls'),
+        ]
+        for key, help_text in counters:
+            lines.append(f"# HELP {prefix}_{key}_total {help_text}")
+            lines.append(f"# TYPE {prefix}_{key}_total counter")
+            for method, stats in sorted(summary.items()):
+                lines.append(f'{prefix}_{key}_total{{method="{method}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+
+default_registry = QueryMetricsRegistry()
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that reports statements, row counts and result sizes to active calls"""
+
+    def execute(self, query, vars=None):
+        calls = _active_calls()
+        if calls:
+            calls[-1].statements.append((query, vars))
+        return super().execute(query, vars)
+
+    def _account(self, rows: List[Any]) -> None:
+        calls = _active_calls()
+        if not calls:
+            return
+        size = sum(_estimate_row_bytes(row) for row in rows)
+        for call in calls:
+            call.rows += len(rows)
+            call.bytes += size
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self._account([row])
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        self._account(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._account(rows)
+        return rows
+
+
+def is_plain_select(query: Any) -> bool:
+    """Whether a statement only reads, so that running it again is harmless"""
+    return isinstance(query, str) and bool(_SELECT.match(query)) and not _WRITE.search(query)
+
+
+def explain_analyze(conn, statements: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+    """Run EXPLAIN (ANALYZE, BUFFERS) for each statement and return the JSON plans
+
+    The statements run read-only in a savepoint of the caller's open transaction,
+    or in a transaction of their own when none is open, and that is always rolled
+    back: a SELECT calling a writing function changes nothing, and the connection
+    is left in the state the caller left it.
+    """
+    plans = []
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+        if conn.autocommit:
+            cur.execute("BEGIN READ ONLY")
+            undo = lambda: cur.execute("ROLLBACK")
+        elif conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            cur.execute("SET TRANSACTION READ ONLY")
+            undo = conn.rollback
+        else:
+            cur.execute("SAVEPOINT explain_analyze")
+            cur.execute("SET LOCAL transaction_read_only = on")
+
+            def undo():
+                cur.execute("ROLLBACK TO SAVEPOINT explain_analyze")
+                cur.execute("RELEASE SAVEPOINT explain_analyze")
+        try:
+            for query, params in statements:
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                plans.append(plan[0])
+        finally:
+            undo()
+    return plans
+
+
+def instrumented(method: Callable) -> Callable:
+    """Time a DatabaseConnection method and record it in the connection's registry"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        calls = _active_calls()
+        call = _CallRecord()
+        calls.append(call)
+        error = False
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            calls.pop()
+            slow = not error and elapsed_ms >= self.slow_call_ms
+            self.metrics.record(method.__name__, elapsed_ms, call.rows, call.bytes, error, slow)
+            if slow and call.statements:
+                _log_slow_call(self, method.__name__, elapsed_ms, call.statements)
+    return wrapper
+
+
+def _log_slow_call(db, method: str, elapsed_ms: float, statements: List[Tuple[str, Any]]) -> None:
+    # EXPLAIN ANALYZE runs the statement again on the caller's thread, so only
+    # reads are explained, each at most once per explain_interval_s
+    reads = [(query, params) for query, params in statements if is_plain_select(query)]
+    statements = [
+        (query, params) for query, params in reads
+        if db.metrics.claim_explain(query, db.explain_interval_s)
+    ]
+    if not statements:
+        reason = (f"plan logged within the last {db.explain_interval_s:.0f} s" if reads
+                  else "no plain SELECT to explain")
+        logger.warning(
+            f"Slow call {method} took {elapsed_ms:.1f} ms (threshold {db.slow_call_ms:.0f} ms, {reason})"
+        )
+        return
+    try:
+        plans = explain_analyze(db.conn, statements)
+    except psycopg2.Error as e:
+        logger.warning(f"{method} took {elapsed_ms:.1f} ms; EXPLAIN ANALYZE failed: {str(e)}")
+        return
+    hits = sum(p['Plan'].get('Shared Hit Blocks', 0) for p in plans)
+    misses = sum(p['Plan'].get('Shared Read Blocks', 0) for p in plans)
+    db.metrics.record_buffers(method, hits, misses)
+    logger.warning(
+        f"Slow call {method} took {elapsed_ms:.1f} ms "
+        f"(threshold {db.slow_call_ms:.0f} ms, shared hit={hits} read={misses})\n"
+        + json.dumps(plans, indent=2, default=str)
+    )
@@ -0,0 +1,455 @@
+"""
+Schema and index management for the PostgreSQL/TimescaleDB side read by DatabaseConnection.
+
+Run from the repository root:
+
+    python -m database.migrations upgrade --dbname trading --user postgres
+    python -m database.migrations status  --dbname trading --user postgres
+    python -m database.migrations verify  --dbname trading --user postgres --account-id 1
+"""
+import argparse
+import functools
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+import psycopg2
+
+from .db_retrieve import DatabaseConnection
+from .instrumentation import InstrumentedCursor
+
+# Tables owned by the application; sequential scans on these are reported by verify
+APPLICATION_TABLES = {'accounts', 'trades', 'account_snapshots', 'orders', 'account_daily_rollups'}
+
+
+@dataclass
+class Migration:
+    """A single versioned schema change"""
+    version: int
+    description: str
+    statements: List[str]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Base tables", [
+        """
+            CREATE TABLE IF NOT EXISTS accounts (
+                id SERIAL PRIMARY KEY,
+                login TEXT NOT NULL,
+                name TEXT,
+                balance DOUBLE PRECISION,
+                equity DOUBLE PRECISION,
+                margin DOUBLE PRECISION,
+                margin_level DOUBLE PRECISION,
+                floating_pl DOUBLE PRECISION,
+                server TEXT,
+                max_positions INTEGER,
+                max_volume DOUBLE PRECISION
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS trades (
+                id BIGSERIAL,
+                account_id INTEGER NOT NULL REFERENCES accounts(id),
+                symbol TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                open_time TIMESTAMPTZ NOT NULL,
+                close_time TIMESTAMPTZ,
+                open_price DOUBLE PRECISION,
+                close_price DOUBLE PRECISION,
+                volume DOUBLE PRECISION,
+                profit_loss DOUBLE PRECISION,
+                swap DOUBLE PRECISION DEFAULT 0,
+                commission DOUBLE PRECISION DEFAULT 0,
+                take_profit DOUBLE PRECISION,
+                stop_loss DOUBLE PRECISION,
+                comment TEXT,
+                status TEXT,
+                PRIMARY KEY (id, open_time)
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS account_snapshots (
+                account_id INTEGER NOT NULL REFERENCES accounts(id),
+                time TIMESTAMPTZ NOT NULL,
+                balance DOUBLE PRECISION,
+                equity DOUBLE PRECISION,
+                margin DOUBLE PRECISION,
+                margin_level DOUBLE PRECISION,
+                floating_pl DOUBLE PRECISION
+            )
+        """,
+        """
+            CREATE TABLE IF NOT EXISTS orders (
+                id BIGSERIAL PRIMARY KEY,
+                account_id INTEGER NOT NULL REFERENCES accounts(id),
+                symbol TEXT,
+                status TEXT,
+                created_at TIMESTAMPTZ DEFAULT now()
+            )
+        """,
+    ]),
+    Migration(2, "TimescaleDB hypertables", [
+        "CREATE EXTENSION IF NOT EXISTS timescaledb",
+        """
+            SELECT create_hypertable('account_snapshots', 'time',
+                                     chunk_time_interval => INTERVAL '7 days',
+                                     if_not_exists => TRUE, migrate_data => TRUE)
+        """,
+        """
+            SELECT create_hypertable('trades', 'open_time',
+                                     chunk_time_interval => INTERVAL '30 days',
+                                     if_not_exists => TRUE, migrate_data => TRUE)
+        """,
+    ]),
+    Migration(3, "Composite indexes for per-account range queries", [
+        "CREATE INDEX IF NOT EXISTS trades_account_open_time_idx ON trades (account_id, open_time DESC)",
+        "CREATE INDEX IF NOT EXISTS trades_account_close_time_idx ON trades (account_id, close_time)",
+        "CREATE INDEX IF NOT EXISTS trades_account_symbol_idx ON trades (account_id, symbol)",
+        "CREATE INDEX IF NOT EXISTS account_snapshots_account_time_idx ON account_snapshots (account_id, time DESC)",
+        "CREATE INDEX IF NOT EXISTS orders_account_status_idx ON orders (account_id, status)",
+    ]),
+    Migration(4, "Partial indexes for open positions and active orders", [
+        """
+            CREATE INDEX IF NOT EXISTS trades_open_positions_idx
+            ON trades (account_id) WHERE close_time IS NULL
+        """,
+        """
+            CREATE INDEX IF NOT EXISTS orders_active_idx
+            ON orders (account_id) WHERE status = 'active'
+        """,
+    ]),
+    # Days are UTC calendar dates, whatever the session TimeZone
+    Migration(5, "Trigger-maintained daily rollups per account", [
+        """
+            CREATE TABLE IF NOT EXISTS account_daily_rollups (
+                account_id INTEGER NOT NULL REFERENCES accounts(id),
+                date DATE NOT NULL,
+                balance DOUBLE PRECISION,
+                equity DOUBLE PRECISION,
+                last_snapshot_time TIMESTAMPTZ,
+                realized_pl DOUBLE PRECISION NOT NULL DEFAULT 0,
+                gross_profit DOUBLE PRECISION NOT NULL DEFAULT 0,
+                gross_loss DOUBLE PRECISION NOT NULL DEFAULT 0,
+                trade_count INTEGER NOT NULL DEFAULT 0,
+                winning_trades INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (account_id, date)
+            )
+        """,
+        """
+            CREATE OR REPLACE FUNCTION rollup_account_snapshot() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO account_daily_rollups (account_id, date, balance, equity, last_snapshot_time)
+                VALUES (NEW.account_id, (NEW.time AT TIME ZONE 'UTC')::date, NEW.balance, NEW.equity, NEW.time)
+                ON CONFLICT (account_id, date) DO UPDATE
+                SET balance = EXCLUDED.balance,
+                    equity = EXCLUDED.equity,
+                    last_snapshot_time = EXCLUDED.last_snapshot_time
+                WHERE account_daily_rollups.last_snapshot_time IS NULL
+                   OR account_daily_rollups.last_snapshot_time <= EXCLUDED.last_snapshot_time;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """,
+        """
+            CREATE OR REPLACE FUNCTION rollup_trade() RETURNS trigger AS $$
+            BEGIN
+                -- Retract the previous contribution of a closed trade
+                IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.close_time IS NOT NULL THEN
+                    UPDATE account_daily_rollups
+                    SET realized_pl = realized_pl - coalesce(OLD.profit_loss, 0),
+                        gross_profit = gross_profit - greatest(coalesce(OLD.profit_loss, 0), 0),
+                        gross_loss = gross_loss - least(coalesce(OLD.profit_loss, 0), 0),
+                        trade_count = trade_count - 1,
+                        winning_trades = winning_trades - CASE WHEN OLD.profit_loss > 0 THEN 1 ELSE 0 END
+                    WHERE account_id = OLD.account_id
+                    AND date = (OLD.close_time AT TIME ZONE 'UTC')::date;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.close_time IS NOT NULL THEN
+                    INSERT INTO account_daily_rollups (
+                        account_id, date, realized_pl, gross_profit, gross_loss,
+                        trade_count, winning_trades
+                    ) VALUES (
+                        NEW.account_id, (NEW.close_time AT TIME ZONE 'UTC')::date, coalesce(NEW.profit_loss, 0),
+                        greatest(coalesce(NEW.profit_loss, 0), 0), least(coalesce(NEW.profit_loss, 0), 0),
+                        1, CASE WHEN NEW.profit_loss > 0 THEN 1 ELSE 0 END
+                    )
+                    ON CONFLICT (account_id, date) DO UPDATE
+                    SET realized_pl = account_daily_rollups.realized_pl + EXCLUDED.realized_pl,
+                        gross_profit = account_daily_rollups.gross_profit + EXCLUDED.gross_profit,
+                        gross_loss = account_daily_rollups.gross_loss + EXCLUDED.gross_loss,
+                        trade_count = account_daily_rollups.trade_count + 1,
+                        winning_trades = account_daily_rollups.winning_trades + EXCLUDED.winning_trades;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """,
+        """
+            CREATE OR REPLACE FUNCTION rebuild_account_daily_rollups(p_account_id INTEGER) RETURNS void AS $$
+            BEGIN
+                DELETE FROM account_daily_rollups WHERE account_id = p_account_id;
+                INSERT INTO account_daily_rollups (account_id, date, balance, equity, last_snapshot_time)
+                SELECT DISTINCT ON ((time AT TIME ZONE 'UTC')::date)
+                    account_id, (time AT TIME ZONE 'UTC')::date, balance, equity, time
+                FROM account_snapshots
+                WHERE account_id = p_account_id
+                ORDER BY (time AT TIME ZONE 'UTC')::date, time DESC;
+                INSERT INTO account_daily_rollups (
+                    account_id, date, realized_pl, gross_profit, gross_loss,
+                    trade_count, winning_trades
+                )
+                SELECT
+                    account_id,
+                    (close_time AT TIME ZONE 'UTC')::date,
+                    coalesce(sum(profit_loss), 0),
+                    coalesce(sum(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END), 0),
+                    coalesce(sum(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END), 0),
+                    count(*),
+                    sum(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END)
+                FROM trades
+                WHERE account_id = p_account_id
+                AND close_time IS NOT NULL
+                GROUP BY account_id, (close_time AT TIME ZONE 'UTC')::date
+                ON CONFLICT (account_id, date) DO UPDATE
+                SET realized_pl = EXCLUDED.realized_pl,
+                    gross_profit = EXCLUDED.gross_profit,
+                    gross_loss = EXCLUDED.gross_loss,
+                    trade_count = EXCLUDED.trade_count,
+                    winning_trades = EXCLUDED.winning_trades;
+            END;
+            $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS account_snapshots_rollup ON account_snapshots",
+        """
+            CREATE TRIGGER account_snapshots_rollup
+            AFTER INSERT ON account_snapshots
+            FOR EACH ROW EXECUTE FUNCTION rollup_account_snapshot()
+        """,
+        "DROP TRIGGER IF EXISTS trades_rollup ON trades",
+        """
+            CREATE TRIGGER trades_rollup
+            AFTER INSERT OR DELETE OR UPDATE OF close_time, profit_loss ON trades
+            FOR EACH ROW EXECUTE FUNCTION rollup_trade()
+        """,
+        "SELECT rebuild_account_daily_rollups(id) FROM accounts",
+    ]),
+    Migration(6, "NOTIFY triggers for the change feed", [
+        """
+            CREATE OR REPLACE FUNCTION notify_row_change() RETURNS trigger AS $$
+            DECLARE
+                payload TEXT;
+            BEGIN
+                payload := json_build_object(
+                    'table', TG_TABLE_NAME,
+                    'operation', TG_OP,
+                    'account_id', NEW.account_id,
+                    'row', row_to_json(NEW)
+                )::text;
+                -- NOTIFY payloads are limited to 8000 bytes; listeners fetch oversized rows
+                -- by id (trades) or by account_id and time (account_snapshots)
+                IF octet_length(payload) > 7900 THEN
+                    payload := json_build_object(
+                        'table', TG_TABLE_NAME,
+                        'operation', TG_OP,
+                        'account_id', NEW.account_id,
+                        'id', to_jsonb(NEW) -> 'id',
+                        'time', to_jsonb(NEW) -> 'time'
+                    )::text;
+                END IF;
+                PERFORM pg_notify('slingshot_changes', payload);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trades_notify_insert ON trades",
+        """
+            CREATE TRIGGER trades_notify_insert
+            AFTER INSERT ON trades
+            FOR EACH ROW EXECUTE FUNCTION notify_row_change()
+        """,
+        "DROP TRIGGER IF EXISTS trades_notify_update ON trades",
+        """
+            CREATE TRIGGER trades_notify_update
+            AFTER UPDATE ON trades
+            FOR EACH ROW
+            WHEN (OLD.* IS DISTINCT FROM NEW.*)
+            EXECUTE FUNCTION notify_row_change()
+        """,
+        "DROP TRIGGER IF EXISTS account_snapshots_notify ON account_snapshots",
+        """
+            CREATE TRIGGER account_snapshots_notify
+            AFTER INSERT ON account_snapshots
+            FOR EACH ROW EXECUTE FUNCTION notify_row_change()
+        """,
+    ]),
+]
+
+
+class RecordingCursor(InstrumentedCursor):
+    """Cursor that appends every statement executed through it to a caller-owned list"""
+
+    def __init__(self, *args, recorded: Optional[List[Tuple[str, Any]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorded = recorded if recorded is not None else []
+
+    def execute(self, query, vars=None):
+        self.recorded.append((query, vars))
+        return super().execute(query, vars)
+
+
+class SchemaMigrator:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def ensure_version_table(self) -> None:
+        """Create the schema_migrations bookkeeping table"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """)
+        self.conn.commit()
+
+    def current_version(self) -> int:
+        """Return the highest applied migration version (0 for an empty database)"""
+        self.ensure_version_table()
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT coalesce(max(version), 0) FROM schema_migrations")
+            return cur.fetchone()[0]
+
+    def pending(self) -> List[Migration]:
+        """Return migrations that have not been applied yet"""
+        version = self.current_version()
+        return [m for m in MIGRATIONS if m.version > version]
+
+    def upgrade(self, target: Optional[int] = None) -> List[int]:
+        """Apply pending migrations up to target (latest when None) and return applied versions"""
+        applied = []
+        for migration in self.pending():
+            if target is not None and migration.version > target:
+                break
+            self._apply(migration)
+            applied.append(migration.version)
+        return applied
+
+    def _apply(self, migration: Migration) -> None:
+        try:
+            with self.conn.cursor() as cur:
+                for statement in migration.statements:
+                    cur.execute(statement)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (migration.version, migration.description)
+                )
+            self.conn.commit()
+        except psycopg2.Error as e:
+            self.conn.rollback()
+            raise Exception(f"Migration {migration.version} ({migration.description}) failed: {str(e)}")
+
+
+def _collect_query_calls(db: DatabaseConnection, account_id: int) -> Dict[str, List[Tuple[str, Any]]]:
+    """Run every trade-data get_* method and record the statements each one executes"""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=90)
+    calls = {
+        'get_account': (account_id,),
+        'get_trades': (account_id, start_date, end_date),
+        'get_overview_metrics': (account_id,),
+        'get_profit_loss_metrics': (account_id, start_date, end_date),
+        'get_session_analysis': (account_id, start_date, end_date),
+        'get_risk_metrics': (account_id, start_date, end_date),
+        'get_portfolio_metrics': (account_id,),
+        'get_long_short_metrics': (account_id, start_date, end_date),
+        'get_sequence_metrics': (account_id, start_date, end_date),
+        'get_summary_metrics': (account_id, start_date, end_date),
+    }
+    previous_factory = db.conn.cursor_factory
+    recorded = {}
+    try:
+        for name, args in calls.items():
+            statements = recorded[name] = []
+            db.conn.cursor_factory = functools.partial(RecordingCursor, recorded=statements)
+            try:
+                getattr(db, name)(*args)
+            except Exception:
+                # Empty accounts make some methods fail while mapping rows;
+                # the statements they issued are still worth explaining.
+                db.conn.rollback()
+    finally:
+        db.conn.cursor_factory = previous_factory
+    return recorded
+
+
+def _find_seq_scans(plan: Dict[str, Any]) -> List[str]:
+    """Walk an EXPLAIN (FORMAT JSON) plan and return relations read by sequential scans"""
+    relations = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in APPLICATION_TABLES:
+        relations.append(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        relations.extend(_find_seq_scans(child))
+    return relations
+
+
+def verify_query_plans(db: DatabaseConnection, account_id: int) -> Dict[str, List[str]]:
+    """EXPLAIN every DatabaseConnection query and return method -> tables hit by sequential scans"""
+    findings = {}
+    for name, statements in _collect_query_calls(db, account_id).items():
+        seq_scans = []
+        with db.conn.cursor() as cur:
+            for query, params in statements:
+                cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                seq_scans.extend(_find_seq_scans(plan[0]['Plan']))
+        db.conn.rollback()
+        findings[name] = sorted(set(seq_scans))
+    return findings
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Manage the trading database schema")
+    parser.add_argument('command', choices=['upgrade', 'status', 'verify'])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5432)
+    parser.add_argument('--dbname', default='postgres')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--target', type=int, default=None, help="Upgrade up to this version")
+    parser.add_argument('--account-id', type=int, default=1, help="Account used to exercise queries")
+    args = parser.parse_args(argv)
+
+    db = DatabaseConnection(args.host, args.port, args.dbname, args.user, args.password)
+    db.connect()
+    try:
+        migrator = SchemaMigrator(db.conn)
+        if args.command == 'upgrade':
+            applied = migrator.upgrade(args.target)
+            print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+            print(f"Current version: {migrator.current_version()}")
+        elif args.command == 'status':
+            print(f"Current version: {migrator.current_version()}")
+            for migration in migrator.pending():
+                print(f"Pending: {migration.version} - {migration.description}")
+        else:
+            findings = verify_query_plans(db, args.account_id)
+            flagged = False
+            for name, tables in findings.items():
+                if tables:
+                    flagged = True
+                    print(f"SEQ SCAN  {name}: {', '.join(tables)}")
+                else:
+                    print(f"ok        {name}")
+            if flagged:
+                raise SystemExit(1)
+    finally:
+        db.disconnect()
+
+
+if __name__ == '__main__':
+    main()
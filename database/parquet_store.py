@@ -0,0 +1,246 @@
+"""
+Columnar export/import of trade history.
+
+Trades and account snapshots are written as Parquet datasets partitioned by
+account and month (hive layout, e.g. trades/account_id=7/month=2024-03/).
+Reads prune partitions and push date predicates down to row-group
+statistics, then hand columns to NumPy/pandas without per-row conversion.
+
+Requires pyarrow, which is only needed by this module:
+
+    pip install pyarrow
+"""
+import shutil
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+TRADES_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('account_id', pa.int32()),
+    ('symbol', pa.string()),
+    ('direction', pa.string()),
+    ('open_time', pa.timestamp('us')),
+    ('close_time', pa.timestamp('us')),
+    ('open_price', pa.float64()),
+    ('close_price', pa.float64()),
+    ('volume', pa.float64()),
+    ('profit_loss', pa.float64()),
+    ('swap', pa.float64()),
+    ('commission', pa.float64()),
+    ('take_profit', pa.float64()),
+    ('stop_loss', pa.float64()),
+    ('comment', pa.string()),
+    ('status', pa.string()),
+])
+
+SNAPSHOTS_SCHEMA = pa.schema([
+    ('account_id', pa.int32()),
+    ('time', pa.timestamp('us')),
+    ('balance', pa.float64()),
+    ('equity', pa.float64()),
+    ('margin', pa.float64()),
+    ('margin_level', pa.float64()),
+    ('floating_pl', pa.float64()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('account_id', pa.int32()), ('month', pa.string())]), flavor='hive'
+)
+
+# Column each dataset is partitioned and filtered on
+TIME_COLUMNS = {'trades': 'open_time', 'account_snapshots': 'time'}
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _next_month(value: datetime) -> datetime:
+    start = _month_start(value)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+def _select_trades(placeholder: str) -> str:
+    # DatabaseWriter keeps the broker's ticket in broker_trade_id
+    trade_id = 'coalesce(broker_trade_id, id)' if placeholder == '?' else 'id'
+    return f"""
+        SELECT
+            {trade_id}, account_id, symbol, direction, open_time, close_time,
+            open_price, close_price, volume, profit_loss,
+            swap, commission, take_profit, stop_loss,
+            comment, status
+        FROM trades
+        WHERE account_id = {placeholder}
+        AND open_time >= {placeholder}
+        AND open_time < {placeholder}
+        ORDER BY open_time
+    """
+
+def _select_snapshots(placeholder: str) -> str:
+    return f"""
+        SELECT
+            account_id, time, balance, equity, margin,
+            margin_level, floating_pl
+        FROM account_snapshots
+        WHERE account_id = {placeholder}
+        AND time >= {placeholder}
+        AND time < {placeholder}
+        ORDER BY time
+    """
+
+class ParquetStore:
+    """Partitioned Parquet copy of trades and account snapshots"""
+
+    def __init__(self, root: str, compression: str = 'zstd', chunk_size: int = 100000):
+        self.root = Path(root)
+        self.compression = compression
+        # Rows fetched from the database and converted to Arrow at a time
+        self.chunk_size = chunk_size
+
+    def export_account(self, db, account_id: int,
+                       start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None) -> Dict[str, int]:
+        """Export an account's trades and snapshots and return rows written per dataset
+
+        db is a connected DatabaseConnection or SqliteReader. The range is
+        widened to whole months and the months it covers are replaced,
+        including months that no longer have rows, so re-exporting a period
+        is idempotent. The sqlite store has no account_snapshots, so only
+        trades are exported from it.
+        """
+        start_date = _month_start(start_date or datetime(1970, 1, 1))
+        # The end is exclusive; a partial last month would lose its other rows
+        # when its partition is replaced
+        end_date = end_date or datetime.now()
+        if end_date != _month_start(end_date):
+            end_date = _next_month(end_date)
+        is_sqlite = isinstance(db.conn, sqlite3.Connection)
+        placeholder = '?' if is_sqlite else '%s'
+        params = (account_id, start_date, end_date)
+
+        exports = [('trades', _select_trades(placeholder), TRADES_SCHEMA)]
+        if not is_sqlite:
+            exports.append(('account_snapshots', _select_snapshots(placeholder), SNAPSHOTS_SCHEMA))
+
+        written = {}
+        for name, query, schema in exports:
+            counter = [0]
+            months = set()
+            # A named (server-side) cursor keeps PostgreSQL from sending the whole result at once
+            cursor = db.conn.cursor() if is_sqlite else db.conn.cursor(name=f"export_{name}")
+            batches = self._fetch_batches(cursor, query, params, schema, TIME_COLUMNS[name], counter, months)
+            partitioned = schema.append(pa.field('month', pa.string()))
+            ds.write_dataset(
+                pa.RecordBatchReader.from_batches(partitioned, batches),
+                self.root / name,
+                format='parquet',
+                partitioning=PARTITIONING,
+                basename_template="part-{i}.parquet",
+                existing_data_behavior='delete_matching',
+                file_options=ds.ParquetFileFormat().make_write_options(compression=self.compression),
+            )
+            self._remove_stale_months(name, account_id, start_date, end_date, months)
+            written[name] = counter[0]
+        return written
+
+    def _remove_stale_months(self, name: str, account_id: int, start_date: datetime,
+                             end_date: datetime, written_months: set):
+        """Delete partitions in the exported range that the export wrote nothing to"""
+        account_dir = self.root / name / f"account_id={account_id}"
+        if not account_dir.exists():
+            return
+        first, last = f"{start_date:%Y-%m}", f"{end_date:%Y-%m}"
+        for month_dir in account_dir.glob('month=*'):
+            month = month_dir.name.split('=', 1)[1]
+            if first <= month < last and month not in written_months:
+                shutil.rmtree(month_dir)
+
+    def _fetch_batches(self, cur, query: str, params: Sequence[Any], schema: pa.Schema,
+                       time_column: str, counter: List[int], months: set) -> Iterator[pa.RecordBatch]:
+        """Stream query results as record batches with a month partition column
+
+        Row counts are added to counter and the months seen to months.
+        """
+        try:
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                arrays = []
+                for field, values in zip(schema, columns):
+                    first = next((v for v in values if v is not None), None)
+                    if pa.types.is_timestamp(field.type) and isinstance(first, str):
+                        # sqlite returns DATETIME columns as ISO text
+                        arrays.append(pa.array(values, pa.string()).cast(field.type))
+                    else:
+                        arrays.append(pa.array(values, field.type))
+                batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+                month = pc.strftime(batch.column(time_column), format='%Y-%m')
+                counter[0] += batch.num_rows
+                months.update(pc.unique(month).to_pylist())
+                yield batch.append_column('month', month)
+        finally:
+            cur.close()
+
+    def _dataset(self, name: str) -> ds.Dataset:
+        path = self.root / name
+        if not path.exists():
+            raise Exception(f"No exported {name} under {self.root}")
+        return ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+
+    def _filter(self, name: str, account_ids: Optional[Sequence[int]],
+                start_date: Optional[datetime], end_date: Optional[datetime]) -> Optional[ds.Expression]:
+        """Build a filter that prunes account/month partitions before reading row groups"""
+        time_column = TIME_COLUMNS[name]
+        conditions = []
+        if account_ids is not None:
+            conditions.append(ds.field('account_id').isin(list(account_ids)))
+        if start_date is not None:
+            conditions.append(ds.field('month') >= f"{start_date:%Y-%m}")
+            conditions.append(ds.field(time_column) >= pa.scalar(start_date, pa.timestamp('us')))
+        if end_date is not None:
+            conditions.append(ds.field('month') <= f"{end_date:%Y-%m}")
+            conditions.append(ds.field(time_column) < pa.scalar(end_date, pa.timestamp('us')))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def load_table(self, name: str, account_ids: Optional[Sequence[int]] = None,
+                   start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                   columns: Optional[List[str]] = None) -> pa.Table:
+        """Read 'trades' or 'account_snapshots' as an Arrow table sorted by time"""
+        table = self._dataset(name).to_table(
+            columns=columns,
+            filter=self._filter(name, account_ids, start_date, end_date)
+        )
+        time_column = TIME_COLUMNS[name]
+        if time_column in table.column_names:
+            table = table.sort_by(time_column)
+        return table
+
+    def load_trades_frame(self, account_ids: Optional[Sequence[int]] = None,
+                          start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """Load trades as the DataFrame layout TradingAnalyzer works on"""
+        table = self.load_table('trades', account_ids, start_date, end_date)
+        table = table.drop_columns([c for c in ('month', 'comment') if c in table.column_names])
+        # self_destruct releases each Arrow column as soon as pandas owns it
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def load_trade_arrays(self, columns: List[str], account_ids: Optional[Sequence[int]] = None,
+                          start_date: Optional[datetime] = None,
+                          end_date: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """Load selected trade columns as NumPy arrays, zero-copy where Arrow allows it"""
+        table = self.load_table('trades', account_ids, start_date, end_date, columns)
+        return {
+            name: table.column(name).combine_chunks().to_numpy(zero_copy_only=False)
+            for name in columns
+        }
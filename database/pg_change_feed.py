@@ -0,0 +1,94 @@
+import json
+import select
+from typing import List, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from .change_feed import ChangeFeed, parse_row_times
+from .classes import ChangeEvent
+from .db_retrieve import DatabaseConnection
+
+# Channel the notify_row_change() trigger function (migration 6) publishes on
+CHANGE_CHANNEL = 'slingshot_changes'
+
+class PostgresChangeFeed(ChangeFeed):
+    """Change feed driven by LISTEN/NOTIFY triggers on trades and account_snapshots
+
+    Uses its own autocommit connection, so notifications arrive as soon as
+    the writing transaction commits.
+    """
+
+    def __init__(self, db: DatabaseConnection, poll_timeout: float = 0.5):
+        """
+        Args:
+            db: DatabaseConnection whose connection parameters are reused
+            poll_timeout: Seconds to wait for a notification before checking for stop()
+        """
+        super().__init__()
+        self.connection_params = db.connection_params
+        self.poll_timeout = poll_timeout
+        self.conn = None
+
+    def _open(self):
+        try:
+            self.conn = psycopg2.connect(**self.connection_params)
+        except psycopg2.Error as e:
+            raise Exception(f"Failed to connect change feed: {str(e)}")
+        self.conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with self.conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANGE_CHANNEL}")
+
+    def _close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _poll(self) -> List[ChangeEvent]:
+        readable, _, _ = select.select([self.conn], [], [], self.poll_timeout)
+        if not readable:
+            return []
+        self.conn.poll()
+        events = []
+        while self.conn.notifies:
+            event = self._event(json.loads(self.conn.notifies.pop(0).payload))
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _event(self, payload: dict) -> Optional[ChangeEvent]:
+        row = payload.get('row')
+        if row is None:
+            # Oversized rows are announced by their key only
+            if payload['table'] == 'trades':
+                row = self._fetch_trade(payload.get('id'))
+            else:
+                row = self._fetch_snapshot(payload.get('account_id'), payload.get('time'))
+            if row is None:
+                return None
+        return ChangeEvent(
+            table=payload['table'],
+            operation=payload['operation'],
+            account_id=payload.get('account_id'),
+            row=parse_row_times(row)
+        )
+
+    def _fetch_trade(self, trade_id: Optional[int]) -> Optional[dict]:
+        if trade_id is None:
+            return None
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT row_to_json(t) FROM trades t WHERE id = %s", (trade_id,))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def _fetch_snapshot(self, account_id: Optional[int], time: Optional[str]) -> Optional[dict]:
+        if account_id is None or time is None:
+            return None
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                SELECT row_to_json(s) FROM account_snapshots s
+                WHERE account_id = %s AND time = %s
+                LIMIT 1
+            """, (account_id, time))
+            row = cur.fetchone()
+        return row[0] if row else None
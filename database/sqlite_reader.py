@@ -0,0 +1,490 @@
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Any, Tuple
+from .classes import (
+    Trade, Account, Direction,
+    OverviewMetrics, ProfitLossMetrics, SessionAnalysis,
+    RiskMetrics, PortfolioMetrics, LongShortMetrics,
+    AIMetrics, SequenceMetrics, SummaryMetrics
+)
+
+WEEKDAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+TRADE_COLUMNS = """
+    coalesce(broker_trade_id, id), symbol, direction, open_time, close_time,
+    open_price, close_price, volume, profit_loss,
+    swap, commission, take_profit, stop_loss,
+    comment, status
+"""
+
+# Longest winning and losing runs over {source} in {order_by} order, skipping
+# breakeven trades; the gaps-and-islands query of DatabaseConnection without sign()
+STREAKS_CTE = """
+            outcomes AS (
+                SELECT
+                    CASE WHEN profit_loss > 0 THEN 1 ELSE -1 END as outcome,
+                    row_number() OVER (ORDER BY {order_by}, id) as seq
+                FROM {source}
+                WHERE profit_loss <> 0
+            ),
+            streaks AS (
+                SELECT outcome, count(*) as streak_length
+                FROM (
+                    SELECT
+                        outcome,
+                        seq - row_number() OVER (PARTITION BY outcome ORDER BY seq) as island
+                    FROM outcomes
+                ) islands
+                GROUP BY outcome, island
+            )"""
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    """Convert a stored DATETIME value back into a datetime"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+def _utc_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Format a datetime like the UTC CURRENT_TIMESTAMP defaults of the metric tables
+
+    Naive datetimes are taken as local time.
+    """
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+class SqliteReader:
+    """Read model over the sqlite file written by DatabaseWriter
+
+    Mirrors the get_* methods of DatabaseConnection and returns the same
+    dataclasses, so the dashboard can run against a local file. Trade
+    aggregates are computed from the trades table for the requested range;
+    risk, portfolio and AI metrics are read from the latest written snapshot.
+    """
+
+    def __init__(self, db_path: str, mmap_size: int = 0):
+        self.db_path = db_path
+        # Bytes of the file mapped into memory; 0 leaves reads on the page cache
+        self.mmap_size = mmap_size
+        self.conn = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+    def connect(self) -> None:
+        """Open the database file read-only"""
+        uri = Path(self.db_path).resolve().as_uri() + '?mode=ro'
+        try:
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            if self.mmap_size:
+                self.conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        except sqlite3.Error as e:
+            raise Exception(f"Failed to open database {self.db_path}: {str(e)}")
+
+    def disconnect(self) -> None:
+        """Close database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _trade(self, row: Tuple) -> Trade:
+        return Trade(
+            id=row[0],
+            symbol=row[1],
+            direction=Direction(row[2]),
+            open_time=_parse_time(row[3]),
+            close_time=_parse_time(row[4]),
+            open_price=row[5],
+            close_price=row[6],
+            volume=row[7],
+            profit_loss=row[8],
+            swap=row[9],
+            commission=row[10],
+            take_profit=row[11],
+            stop_loss=row[12],
+            comment=row[13],
+            status=row[14]
+        )
+
+    def _latest_snapshot(self, table: str, columns: str, account_id: int,
+                         end_date: Optional[datetime] = None) -> Tuple:
+        """Return the newest snapshot row of a metric table, optionally as of end_date"""
+        query = f"""
+            SELECT id, {columns}
+            FROM {table}
+            WHERE account_id = ?
+            AND (? IS NULL OR timestamp <= ?)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        """
+        as_of = _utc_timestamp(end_date)
+        row = self.conn.execute(query, (account_id, as_of, as_of)).fetchone()
+        if not row:
+            raise Exception(f"No {table} found for account {account_id}")
+        return row
+
+    def get_account(self, account_id: int) -> Account:
+        """Retrieve account information"""
+        row = self.conn.execute("""
+            SELECT
+                id, login, name, balance, equity, margin,
+                margin_level, floating_pl, server,
+                max_positions, max_volume
+            FROM accounts
+            WHERE id = ?
+        """, (account_id,)).fetchone()
+        if not row:
+            raise Exception(f"Account {account_id} not found")
+        return Account(*row)
+
+    def get_trades(self, account_id: int, start_date: datetime, end_date: datetime) -> List[Trade]:
+        """Retrieve trades for a specific account within date range"""
+        cur = self.conn.execute(f"""
+            SELECT {TRADE_COLUMNS}
+            FROM trades
+            WHERE account_id = ?
+            AND open_time BETWEEN ? AND ?
+            ORDER BY open_time DESC
+        """, (account_id, start_date, end_date))
+        return [self._trade(row) for row in cur.fetchall()]
+
+    def get_overview_metrics(self, account_id: int) -> OverviewMetrics:
+        """Retrieve the latest overview metrics and the daily balance history"""
+        row = self._latest_snapshot('overview_metrics', """
+            total_balance, equity, margin_used, margin_level,
+            floating_pl, daily_pl, open_positions, active_orders
+        """, account_id)
+
+        # Last snapshot of each day, served by the (account_id, timestamp) index
+        growth = self.conn.execute("""
+            SELECT day, total_balance
+            FROM (
+                SELECT
+                    date(timestamp) as day,
+                    total_balance,
+                    row_number() OVER (
+                        PARTITION BY date(timestamp) ORDER BY timestamp DESC, id DESC
+                    ) as rank
+                FROM overview_metrics
+                WHERE account_id = ?
+            )
+            WHERE rank = 1
+            ORDER BY day
+        """, (account_id,)).fetchall()
+
+        return OverviewMetrics(
+            total_balance=row[1],
+            equity=row[2],
+            margin_used=row[3],
+            margin_level=row[4],
+            floating_pl=row[5],
+            daily_pl=row[6] or 0,
+            open_positions=row[7],
+            active_orders=row[8],
+            account_growth=[balance for _, balance in growth],
+            growth_dates=[datetime.fromisoformat(day) for day, _ in growth]
+        )
+
+    def get_profit_loss_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> ProfitLossMetrics:
+        """Retrieve profit/loss metrics for an account"""
+        query = """
+            WITH closed_trades AS (
+                SELECT id, close_time, profit_loss
+                FROM trades
+                WHERE account_id = ?
+                AND open_time BETWEEN ? AND ?
+                AND close_time IS NOT NULL
+            ),""" + STREAKS_CTE.format(source='closed_trades', order_by='close_time') + """
+            SELECT
+                coalesce(sum(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END), 0) as winning_trades,
+                count(*) as total_trades,
+                coalesce(sum(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END), 0) as total_profit,
+                coalesce(sum(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END), 0) as total_loss,
+                max(profit_loss) as best_trade,
+                min(profit_loss) as worst_trade,
+                avg(CASE WHEN profit_loss > 0 THEN profit_loss END) as avg_win,
+                avg(CASE WHEN profit_loss < 0 THEN profit_loss END) as avg_loss,
+                (SELECT coalesce(max(streak_length), 0) FROM streaks WHERE outcome > 0) as max_win_streak,
+                (SELECT coalesce(max(streak_length), 0) FROM streaks WHERE outcome < 0) as max_loss_streak
+            FROM closed_trades
+        """
+        row = self.conn.execute(query, (account_id, start_date, end_date)).fetchone()
+        total_pl = row[2] + row[3]
+
+        return ProfitLossMetrics(
+            total_pl=total_pl,
+            win_rate=row[0] / row[1] if row[1] > 0 else 0,
+            avg_trade=total_pl / row[1] if row[1] > 0 else 0,
+            profit_factor=abs(row[2] / row[3]) if row[3] != 0 else 0,
+            best_trade=row[4] or 0,
+            worst_trade=row[5] or 0,
+            total_trades=row[1],
+            winning_trades=row[0],
+            losing_trades=row[1] - row[0],
+            consecutive_wins=row[8],
+            consecutive_losses=row[9],
+            average_win=row[6] or 0,
+            average_loss=row[7] or 0,
+            risk_reward_ratio=abs(row[6] / row[7]) if row[6] and row[7] else 0
+        )
+
+    def get_session_analysis(self, account_id: int, start_date: datetime, end_date: datetime) -> List[SessionAnalysis]:
+        """Retrieve session analysis metrics"""
+        query = """
+            SELECT
+                CASE
+                    WHEN cast(strftime('%H', open_time) as integer) BETWEEN 0 AND 7 THEN 'Asian'
+                    WHEN cast(strftime('%H', open_time) as integer) BETWEEN 8 AND 15 THEN 'European'
+                    ELSE 'American'
+                END as session,
+                sum(profit_loss) as total_pl,
+                count(*) as total_trades,
+                sum(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
+                avg(CASE WHEN profit_loss > 0 THEN profit_loss END) as avg_profit,
+                avg(CASE WHEN profit_loss < 0 THEN profit_loss END) as avg_loss,
+                sum(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END) as total_profit,
+                sum(CASE WHEN profit_loss < 0 THEN profit_loss ELSE 0 END) as total_loss
+            FROM trades
+            WHERE account_id = ?
+            AND open_time BETWEEN ? AND ?
+            GROUP BY session
+        """
+        cur = self.conn.execute(query, (account_id, start_date, end_date))
+        return [
+            SessionAnalysis(
+                session=row[0],
+                total_pl=row[1] or 0,
+                win_rate=row[3] / row[2],
+                avg_profit=row[4] or 0,
+                avg_loss=row[5] or 0,
+                net_trades=row[2],
+                profit_factor=abs(row[6] / row[7]) if row[7] else 0
+            )
+            for row in cur.fetchall()
+        ]
+
+    def get_risk_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> RiskMetrics:
+        """Retrieve the latest risk metrics written on or before end_date"""
+        row = self._latest_snapshot('risk_metrics', """
+            sharp_ratio, max_drawdown, max_drawdown_percentage,
+            profit_factor, deposit_load, recovery_factor, trades_per_week,
+            risk_per_trade, var_95, expected_shortfall
+        """, account_id, end_date)
+        return RiskMetrics(*row[1:])
+
+    def get_portfolio_metrics(self, account_id: int) -> PortfolioMetrics:
+        """Retrieve the latest portfolio metrics and their symbol allocation"""
+        row = self._latest_snapshot('portfolio_metrics', """
+            total_value, daily_pl, monthly_pl, yearly_pl
+        """, account_id)
+        allocation = {}
+        performance = {}
+        for symbol, symbol_allocation, symbol_performance in self.conn.execute("""
+            SELECT symbol, allocation, performance
+            FROM portfolio_allocation
+            WHERE portfolio_metric_id = ?
+        """, (row[0],)):
+            allocation[symbol] = symbol_allocation
+            performance[symbol] = symbol_performance
+
+        return PortfolioMetrics(
+            total_value=row[1],
+            daily_pl=row[2] or 0,
+            monthly_pl=row[3] or 0,
+            yearly_pl=row[4] or 0,
+            allocation=allocation,
+            performance=performance,
+            correlation_matrix={}  # Not persisted by DatabaseWriter
+        )
+
+    def get_long_short_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> LongShortMetrics:
+        """Retrieve long/short analysis metrics"""
+        query = """
+            SELECT
+                direction,
+                count(*) as trade_count,
+                sum(profit_loss) as total_pl,
+                sum(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) * 1.0 / count(*) as win_rate,
+                avg(CASE WHEN profit_loss > 0 THEN profit_loss ELSE 0 END) as avg_profit
+            FROM trades
+            WHERE account_id = ?
+            AND close_time BETWEEN ? AND ?
+            GROUP BY direction
+        """
+        rows = self.conn.execute(query, (account_id, start_date, end_date)).fetchall()
+
+        long_stats = next((r for r in rows if r[0] == Direction.BUY.value), None)
+        short_stats = next((r for r in rows if r[0] == Direction.SELL.value), None)
+
+        total_trades = sum(r[1] for r in rows)
+
+        return LongShortMetrics(
+            long_count=long_stats[1] if long_stats else 0,
+            long_percentage=long_stats[1] / total_trades * 100 if long_stats and total_trades > 0 else 0,
+            short_count=short_stats[1] if short_stats else 0,
+            short_percentage=short_stats[1] / total_trades * 100 if short_stats and total_trades > 0 else 0,
+            long_pl=long_stats[2] if long_stats else 0,
+            short_pl=short_stats[2] if short_stats else 0,
+            long_win_rate=long_stats[3] if long_stats else 0,
+            short_win_rate=short_stats[3] if short_stats else 0,
+            avg_long_profit=long_stats[4] if long_stats else 0,
+            avg_short_profit=short_stats[4] if short_stats else 0
+        )
+
+    def get_ai_metrics(self, account_id: int) -> AIMetrics:
+        """Retrieve the latest AI metrics and their support/resistance levels"""
+        row = self._latest_snapshot('ai_metrics', """
+            model_accuracy, prediction_confidence, market_regime,
+            volatility_forecast, trend_strength
+        """, account_id)
+        levels = {'support': [], 'resistance': []}
+        for level_type, value in self.conn.execute("""
+            SELECT level_type, value
+            FROM ai_levels
+            WHERE ai_metric_id = ?
+            ORDER BY id
+        """, (row[0],)):
+            levels.setdefault(level_type, []).append(value)
+
+        return AIMetrics(
+            model_accuracy=row[1],
+            prediction_confidence=row[2],
+            market_regime=row[3],
+            volatility_forecast=row[4],
+            trend_strength=row[5],
+            support_levels=levels['support'],
+            resistance_levels=levels['resistance'],
+            pattern_probability={},  # Not persisted by DatabaseWriter
+            feature_importance={}
+        )
+
+    def get_sequence_metrics(self, account_id: int, start_date: datetime, end_date: datetime,
+                             include_trades: bool = False) -> SequenceMetrics:
+        """Retrieve trade sequence metrics in one round-trip, like DatabaseConnection"""
+        query = """
+            WITH period_trades AS (
+                SELECT id, open_time, close_time, volume, profit_loss
+                FROM trades
+                WHERE account_id = ?
+                AND open_time BETWEEN ? AND ?
+            ),""" + STREAKS_CTE.format(source='period_trades', order_by='open_time') + """
+            SELECT 'hour', cast(strftime('%H', open_time) as integer), count(*)
+            FROM period_trades
+            GROUP BY strftime('%H', open_time)
+            UNION ALL
+            SELECT 'weekday', cast(strftime('%w', open_time) as integer), count(*)
+            FROM period_trades
+            GROUP BY strftime('%w', open_time)
+            UNION ALL
+            SELECT 'volume', volume, count(*)
+            FROM period_trades
+            GROUP BY volume
+            UNION ALL
+            SELECT 'win_streak', NULL, coalesce(max(streak_length), 0)
+            FROM streaks
+            WHERE outcome > 0
+            UNION ALL
+            SELECT 'loss_streak', NULL, coalesce(max(streak_length), 0)
+            FROM streaks
+            WHERE outcome < 0
+            UNION ALL
+            SELECT 'avg_duration', NULL, avg(julianday(close_time) - julianday(open_time)) * 24
+            FROM period_trades
+        """
+        rows = self.conn.execute(query, (account_id, start_date, end_date)).fetchall()
+
+        time_dist = {}
+        weekday_dist = {}
+        volume_dist = {}
+        totals = {}
+        for kind, key, value in rows:
+            if kind == 'hour':
+                time_dist[key] = value
+            elif kind == 'weekday':
+                weekday_dist[WEEKDAYS[key]] = value
+            elif kind == 'volume':
+                volume_dist[key] = value
+            else:
+                totals[kind] = value
+
+        trades = self.get_trades(account_id, start_date, end_date) if include_trades else []
+
+        return SequenceMetrics(
+            trades=trades,
+            win_streak=int(totals.get('win_streak') or 0),
+            loss_streak=int(totals.get('loss_streak') or 0),
+            avg_trade_duration=totals.get('avg_duration') or 0,
+            time_distribution=time_dist,
+            weekday_distribution=weekday_dist,
+            volume_distribution=volume_dist
+        )
+
+    def get_summary_metrics(self, account_id: int, start_date: datetime, end_date: datetime) -> SummaryMetrics:
+        """Retrieve summary metrics"""
+        # There are no balance snapshots in the sqlite store, so the balance
+        # curve is rebuilt backwards from the account's current balance and
+        # the trades closed since start_date.
+        query = """
+            WITH closed AS (
+                SELECT
+                    close_time,
+                    profit_loss,
+                    (SELECT balance FROM accounts WHERE id = ?)
+                        - sum(profit_loss) OVER ()
+                        + sum(profit_loss) OVER (ORDER BY close_time, id) as balance
+                FROM trades
+                WHERE account_id = ?
+                AND close_time >= ?
+            ),
+            curve AS (
+                SELECT
+                    balance,
+                    max(balance) OVER (ORDER BY close_time ROWS UNBOUNDED PRECEDING) as peak
+                FROM closed
+                WHERE close_time <= ?
+            ),
+            drawdown AS (
+                SELECT
+                    max(peak - balance) as drawdown_amount,
+                    max((peak - balance) / nullif(peak, 0)) as drawdown_percentage
+                FROM curve
+            )
+            SELECT
+                coalesce(sum(CASE WHEN t.profit_loss > 0 THEN t.profit_loss ELSE 0 END), 0) as gross_profit,
+                coalesce(sum(CASE WHEN t.profit_loss < 0 THEN t.profit_loss ELSE 0 END), 0) as gross_loss,
+                count(*) as total_trades,
+                sum(CASE WHEN t.profit_loss > 0 THEN 1 ELSE 0 END) * 1.0 / nullif(count(*), 0) as win_rate,
+                avg(t.profit_loss) as expected_payoff,
+                avg(julianday(t.close_time) - julianday(t.open_time)) * 24 as avg_trade_length,
+                count(DISTINCT date(t.close_time)) as trading_days,
+                (SELECT drawdown_amount FROM drawdown) as absolute_drawdown,
+                (SELECT drawdown_percentage FROM drawdown) as relative_drawdown
+            FROM trades t
+            WHERE t.account_id = ?
+            AND t.close_time BETWEEN ? AND ?
+        """
+        row = self.conn.execute(query, (
+            account_id, account_id, start_date, end_date,
+            account_id, start_date, end_date
+        )).fetchone()
+
+        return SummaryMetrics(
+            gross_profit=row[0],
+            gross_loss=row[1],
+            net_profit=row[0] + row[1],
+            total_trades=row[2],
+            win_rate=row[3] or 0,
+            profit_factor=abs(row[0] / row[1]) if row[1] else 0,
+            expected_payoff=row[4] or 0,
+            absolute_drawdown=row[7] or 0,
+            maximal_drawdown=row[7] or 0,  # Same as absolute for now
+            relative_drawdown=row[8] or 0,
+            trades_per_day=row[2] / row[6] if row[6] > 0 else 0,
+            avg_trade_length=row[5] or 0,
+            trading_days=row[6]
+        )
@@ -0,0 +1,178 @@
+"""
+Synthetic trading history for load tests and benchmarks.
+
+Accounts trade grid sequences: a position is opened and averaged down at
+fixed price steps with growing volume, then all levels of the sequence are
+closed together at a take-profit or, occasionally, a stop-out. Every
+sequence also produces the account snapshots an MT5 terminal would report
+while it is open and after it closes.
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from .classes import Trade, Account, Direction
+
+# symbol -> (start price, grid step, contract size, selection weight)
+SYMBOLS = {
+    'EURUSD': (1.0850, 0.0020, 100000, 30),
+    'GBPUSD': (1.2650, 0.0025, 100000, 20),
+    'USDJPY': (150.00, 0.25, 1000, 15),
+    'XAUUSD': (2000.0, 5.0, 100, 15),
+    'US30': (38000.0, 60.0, 1, 10),
+    'BTCUSD': (60000.0, 500.0, 1, 10),
+}
+
+COMMISSION_PER_LOT = 7.0
+LEVERAGE = 100
+SWAP_PER_LOT_NIGHT = -4.5
+
+# (time, balance, equity, margin, margin_level, floating_pl)
+Snapshot = Tuple[datetime, float, float, float, float, float]
+
+@dataclass
+class SyntheticChunk:
+    """A slice of generated history small enough to hold in memory"""
+    trades: List[Trade] = field(default_factory=list)
+    snapshots: List[Snapshot] = field(default_factory=list)
+
+class SyntheticAccount:
+    """Deterministic generator of one account's grid-trading history"""
+
+    def __init__(self, account_id: int, trade_count: int, seed: int = 42,
+                 start: Optional[datetime] = None, first_trade_id: int = 1,
+                 initial_balance: float = 10000.0):
+        self.account_id = account_id
+        self.trade_count = trade_count
+        self.seed = seed
+        self.start = start or datetime(2020, 1, 1)
+        self.first_trade_id = first_trade_id
+        self.initial_balance = initial_balance
+        self.balance = initial_balance
+
+    def account(self) -> Account:
+        """Return the Account row with the balance reached by the generated history"""
+        return Account(
+            id=self.account_id,
+            login=str(100000 + self.account_id),
+            name=f"Synthetic {self.account_id}",
+            balance=round(self.balance, 2),
+            equity=round(self.balance, 2),
+            margin=0.0,
+            margin_level=0.0,
+            floating_pl=0.0,
+            server='Synthetic-Server',
+            max_positions=50,
+            max_volume=10.0
+        )
+
+    def history(self, chunk_size: int = 100000) -> Iterator[SyntheticChunk]:
+        """Yield the history in chunks of about chunk_size trades
+
+        The last sequence is left open, so the account has open positions.
+        """
+        rng = random.Random(self.seed * 1000003 + self.account_id)
+        symbols = list(SYMBOLS)
+        weights = [SYMBOLS[s][3] for s in symbols]
+        prices = {s: SYMBOLS[s][0] for s in symbols}
+        trade_id = self.first_trade_id
+        now = self.start
+        self.balance = self.initial_balance
+        chunk = SyntheticChunk()
+        remaining = self.trade_count
+
+        while remaining > 0:
+            symbol = rng.choices(symbols, weights)[0]
+            _, step, contract, _ = SYMBOLS[symbol]
+            direction = rng.choice([Direction.BUY, Direction.SELL])
+            sign = 1 if direction == Direction.BUY else -1
+            levels = min(remaining, min(8, 1 + int(rng.expovariate(0.6))))
+            base_volume = rng.choice([0.01, 0.02, 0.05, 0.1])
+            is_last = levels == remaining
+
+            # Drift the symbol's price so sequences do not all start at the same level
+            prices[symbol] *= 1 + rng.gauss(0, 0.004)
+            entry = prices[symbol]
+            opens = []
+            for level in range(levels):
+                now += timedelta(minutes=rng.randint(5, 240))
+                price = entry - sign * step * level
+                volume = round(base_volume * 1.5 ** level, 2)
+                opens.append((now, price, volume))
+
+            total_volume = sum(v for _, _, v in opens)
+            average = sum(p * v for _, p, v in opens) / total_volume
+            floating = sum(sign * (opens[-1][1] - p) * v * contract for _, p, v in opens)
+            margin = total_volume * contract * average / LEVERAGE
+            chunk.snapshots.append(self._snapshot(opens[-1][0], floating, margin))
+
+            if is_last:
+                close_time, close_price = None, None
+            else:
+                close_time = now + timedelta(minutes=rng.randint(30, 60 * 48))
+                if rng.random() < 0.85:
+                    close_price = average + sign * step * rng.uniform(0.3, 1.0)
+                else:
+                    close_price = opens[-1][1] - sign * step * rng.uniform(1.0, 3.0)
+                prices[symbol] = close_price
+                now = close_time
+
+            for level, (open_time, open_price, volume) in enumerate(opens, start=1):
+                if close_time is None:
+                    profit_loss, swap = None, 0.0
+                else:
+                    profit_loss = round(sign * (close_price - open_price) * volume * contract, 2)
+                    nights = (close_time.date() - open_time.date()).days
+                    swap = round(SWAP_PER_LOT_NIGHT * volume * nights, 2)
+                commission = round(-COMMISSION_PER_LOT * volume, 2)
+                chunk.trades.append(Trade(
+                    id=trade_id,
+                    symbol=symbol,
+                    direction=direction,
+                    open_time=open_time,
+                    close_time=close_time,
+                    open_price=round(open_price, 5),
+                    close_price=round(close_price, 5) if close_price is not None else None,
+                    volume=volume,
+                    profit_loss=profit_loss,
+                    swap=swap,
+                    commission=commission,
+                    take_profit=round(average + sign * step, 5),
+                    stop_loss=None,
+                    comment=f"grid L{level}",
+                    status='open' if close_time is None else 'closed'
+                ))
+                trade_id += 1
+                if close_time is not None:
+                    self.balance += profit_loss + swap + commission
+
+            if close_time is not None:
+                chunk.snapshots.append(self._snapshot(close_time, 0.0, 0.0))
+
+            remaining -= levels
+            if len(chunk.trades) >= chunk_size:
+                yield chunk
+                chunk = SyntheticChunk()
+
+        if chunk.trades:
+            yield chunk
+
+    def _snapshot(self, time: datetime, floating: float, margin: float) -> Snapshot:
+        equity = self.balance + floating
+        margin_level = equity / margin * 100 if margin else 0.0
+        return (time, round(self.balance, 2), round(equity, 2), round(margin, 2),
+                round(margin_level, 2), round(floating, 2))
+
+def synthetic_accounts(account_count: int, trades_per_account: int, seed: int = 42,
+                       first_account_id: int = 900001) -> List[SyntheticAccount]:
+    """Return generators for account_count accounts with disjoint trade ids"""
+    return [
+        SyntheticAccount(
+            account_id=first_account_id + i,
+            trade_count=trades_per_account,
+            seed=seed,
+            first_trade_id=i * trades_per_account + 1
+        )
+        for i in range(account_count)
+    ]
@@ -0,0 +1,200 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .classes import Trade, Direction
+
+# Column name -> NumPy dtype of the structure-of-arrays layout
+NUMERIC_COLUMNS = {
+    'id': np.int64,
+    'open_time': 'datetime64[us]',
+    'close_time': 'datetime64[us]',
+    'open_price': np.float64,
+    'close_price': np.float64,
+    'volume': np.float64,
+    'profit_loss': np.float64,
+    'swap': np.float64,
+    'commission': np.float64,
+    'take_profit': np.float64,
+    'stop_loss': np.float64,
+}
+
+# Low-cardinality strings stored as small integer codes into a category array
+CATEGORICAL_COLUMNS = ('symbol', 'direction', 'status')
+
+# Fields that are None on a Trade and NaN/NaT in the arrays
+OPTIONAL_FIELDS = {'close_time', 'close_price', 'profit_loss', 'take_profit', 'stop_loss'}
+
+FIELDS = (
+    'id', 'symbol', 'direction', 'open_time', 'close_time',
+    'open_price', 'close_price', 'volume', 'profit_loss',
+    'swap', 'commission', 'take_profit', 'stop_loss',
+    'comment', 'status'
+)
+
+def _missing(dtype) -> Any:
+    return np.datetime64('NaT') if dtype == 'datetime64[us]' else np.nan
+
+def _encode(values: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (codes, categories) for a sequence of strings"""
+    categories, codes = np.unique(np.asarray(list(values), dtype=object).astype(str), return_inverse=True)
+    return codes.astype(np.int32), categories.astype(object)
+
+class TradeView:
+    """Read-only view of one row of a TradeBatch, with the attributes of Trade"""
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch: 'TradeBatch', index: int):
+        self._batch = batch
+        self._index = index
+
+    def to_trade(self) -> Trade:
+        """Materialize the row as a Trade"""
+        return Trade(**{name: getattr(self, name) for name in FIELDS})
+
+    def __repr__(self) -> str:
+        return f"TradeView(id={self.id}, symbol={self.symbol!r}, profit_loss={self.profit_loss})"
+
+def _view_property(name: str) -> property:
+    return property(lambda view: view._batch.value(name, view._index))
+
+for _name in FIELDS:
+    setattr(TradeView, _name, _view_property(_name))
+
+class TradeBatch:
+    """Structure-of-arrays collection of trades
+
+    Each field is one NumPy array; symbol, direction and status are stored
+    as int32 codes into a shared category array. Integer indexing and
+    iteration yield TradeView objects, slices, boolean masks and index
+    arrays return a new TradeBatch over the selected rows.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, np.ndarray]):
+        self.columns = columns
+        self.categories = categories
+
+    @classmethod
+    def from_trades(cls, trades: Iterable[Trade]) -> 'TradeBatch':
+        """Build a batch from Trade objects"""
+        trades = list(trades)
+        columns = {}
+        for name, dtype in NUMERIC_COLUMNS.items():
+            values = [getattr(t, name) for t in trades]
+            if name in OPTIONAL_FIELDS:
+                values = [_missing(dtype) if v is None else v for v in values]
+            columns[name] = np.array(values, dtype=dtype)
+        columns['comment'] = np.array([t.comment for t in trades], dtype=object)
+        categories = {}
+        for name in CATEGORICAL_COLUMNS:
+            values = [getattr(t, name) for t in trades]
+            if name == 'direction':
+                values = [v.value for v in values]
+            columns[name], categories[name] = _encode(values)
+        return cls(columns, categories)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'TradeBatch':
+        """Build a batch from a trades DataFrame without creating per-row objects
+
+        Columns the frame lacks (e.g. comment in TradingAnalyzer's frame) are
+        filled with empty values; extra columns are ignored.
+        """
+        columns = {}
+        size = len(df)
+        for name, dtype in NUMERIC_COLUMNS.items():
+            if name not in df:
+                columns[name] = np.full(size, _missing(dtype), dtype=dtype)
+            elif dtype == 'datetime64[us]':
+                columns[name] = pd.to_datetime(df[name]).to_numpy(dtype=dtype)
+            elif dtype == np.float64:
+                columns[name] = df[name].to_numpy(dtype=dtype, na_value=np.nan)
+            else:
+                columns[name] = df[name].to_numpy(dtype=dtype)
+        columns['comment'] = (
+            df['comment'].fillna('').to_numpy(dtype=object) if 'comment' in df
+            else np.full(size, '', dtype=object)
+        )
+        categories = {}
+        for name in CATEGORICAL_COLUMNS:
+            values = df[name].astype('category')
+            codes = values.cat.codes.to_numpy(dtype=np.int32)
+            names = values.cat.categories.to_numpy(dtype=object)
+            # Missing values are code -1, which would index the last category
+            if (codes < 0).any():
+                codes = np.where(codes < 0, len(names), codes).astype(np.int32)
+                names = np.append(names, None)
+            columns[name], categories[name] = codes, names
+        return cls(columns, categories)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Convert to the DataFrame layout used by TradingAnalyzer
+
+        Strings are decoded to object columns like the frame built from a
+        Trade list, so groupby and comparisons behave the same on both.
+        """
+        data = {name: self.column(name) for name in FIELDS}
+        return pd.DataFrame(data, copy=False)
+
+    def to_trades(self) -> List[Trade]:
+        """Materialize every row as a Trade"""
+        return [view.to_trade() for view in self]
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a field as an array, decoding categorical codes to strings"""
+        if name in CATEGORICAL_COLUMNS:
+            return self.categories[name][self.columns[name]]
+        return self.columns[name]
+
+    def value(self, name: str, index: int) -> Any:
+        """Return one field of one row as the Python value a Trade would hold"""
+        if name in CATEGORICAL_COLUMNS:
+            value = self.categories[name][self.columns[name][index]]
+            return Direction(value) if name == 'direction' else value
+        value = self.columns[name][index]
+        if name == 'comment':
+            return value
+        if isinstance(value, np.datetime64):
+            return None if np.isnat(value) else value.astype(datetime)
+        if name in OPTIONAL_FIELDS and np.isnan(value):
+            return None
+        return value.item()
+
+    def filter(self, mask: np.ndarray) -> 'TradeBatch':
+        """Return the rows where mask is True"""
+        return self[np.asarray(mask, dtype=bool)]
+
+    def closed(self) -> 'TradeBatch':
+        """Return the closed trades"""
+        return self.filter(self.column('status') == 'closed')
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (comment strings excluded)"""
+        return sum(array.nbytes for array in self.columns.values())
+
+    def __len__(self) -> int:
+        return len(self.columns['id'])
+
+    def __iter__(self) -> Iterator[TradeView]:
+        for index in range(len(self)):
+            yield TradeView(self, index)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray, List[int]]) -> Union[TradeView, 'TradeBatch']:
+        if isinstance(key, (int, np.integer)):
+            size = len(self)
+            if key < 0:
+                key += size
+            if not 0 <= key < size:
+                raise IndexError(f"Trade index {key} out of range for batch of {size}")
+            return TradeView(self, int(key))
+        # Slices share memory with this batch; masks and index arrays copy
+        return TradeBatch(
+            {name: array[key] for name, array in self.columns.items()},
+            self.categories
+        )
+
+    def __repr__(self) -> str:
+        return f"TradeBatch({len(self)} trades)"
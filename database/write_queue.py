@@ -0,0 +1,221 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database.classes import (
+    Trade, Account, OverviewMetrics, ProfitLossMetrics,
+    RiskMetrics, PortfolioMetrics, LongShortMetrics,
+    AIMetrics, SequenceMetrics, SummaryMetrics, WriteQueueStats
+)
+from database.db_write import DatabaseWriter
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """Persist trades and metrics on a dedicated thread so callers never wait on sqlite"""
+
+    def __init__(self, writer: DatabaseWriter, max_queue_size: int = 10000,
+                 max_batch_size: int = 500, flush_interval: float = 0.5,
+                 max_dead_letters: int = 1000):
+        """
+        Args:
+            writer: DatabaseWriter used by the worker thread
+            max_queue_size: Items that may wait before submit applies back-pressure
+            max_batch_size: Items written per transaction at most
+            flush_interval: Seconds a batch may wait for more items before it is written
+            max_dead_letters: Failed items kept for inspection; older ones are dropped
+        """
+        self.writer = writer
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue_size)
+        self._stats_lock = threading.Lock()
+        self._stats = WriteQueueStats(
+            depth=0, max_depth=0, enqueued=0, written=0, rejected=0,
+            batches=0, failed_batches=0, last_batch_ms=0.0
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # Items that failed on their own, as (item, error message)
+        self._dead_letters: "deque[Tuple[Tuple, str]]" = deque(maxlen=max_dead_letters)
+        self._metric_writers: Dict[type, Callable[[Any, int], None]] = {
+            OverviewMetrics: writer.write_overview_metrics,
+            ProfitLossMetrics: writer.write_profit_loss_metrics,
+            RiskMetrics: writer.write_risk_metrics,
+            PortfolioMetrics: writer.write_portfolio_metrics,
+            LongShortMetrics: writer.write_long_short_metrics,
+            AIMetrics: writer.write_ai_metrics,
+            SequenceMetrics: writer.write_sequence_metrics,
+            SummaryMetrics: writer.write_summary_metrics,
+        }
+
+    @property
+    def running(self) -> bool:
+        """True while the worker thread accepts submissions"""
+        thread = self._thread
+        return thread is not None and thread.is_alive() and not self._stopping
+
+    def start(self):
+        """Start the worker thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="BackgroundWriter", daemon=True)
+        self._thread.start()
+        # Queued writes are flushed even if the owner forgets to call stop()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Write everything still queued, then stop the worker thread"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+        atexit.unregister(self.stop)
+        # Items a racing submit queued behind the stop marker are written here
+        leftover = self._drain_nowait()
+        if leftover:
+            self._write_batch(leftover)
+
+    def flush(self):
+        """Block until every item submitted so far has been written"""
+        self._queue.join()
+
+    def submit_trades(self, trades: List[Trade], account_id: int,
+                      block: bool = True, timeout: Optional[float] = None) -> bool:
+        """Queue trades for writing; returns False if the queue stayed full"""
+        return self._submit(('trades', account_id, list(trades)), block, timeout)
+
+    def submit_metrics(self, metrics: Any, account_id: int,
+                       block: bool = True, timeout: Optional[float] = None) -> bool:
+        """Queue a metrics dataclass for writing; returns False if the queue stayed full"""
+        if type(metrics) not in self._metric_writers:
+            raise ValueError(f"Unsupported metrics type: {type(metrics).__name__}")
+        return self._submit(('metrics', account_id, metrics), block, timeout)
+
+    def submit_all_metrics(self, account: Account, trades: List[Trade], metrics: Dict[str, Any],
+                           block: bool = True, timeout: Optional[float] = None) -> bool:
+        """Queue a write_all_metrics call; returns False if the queue stayed full"""
+        return self._submit(('all', account, (list(trades), dict(metrics))), block, timeout)
+
+    def dead_letters(self) -> List[Tuple[Tuple, str]]:
+        """Return the items that could not be written, with the error each raised"""
+        with self._stats_lock:
+            return list(self._dead_letters)
+
+    def stats(self) -> WriteQueueStats:
+        """Return a snapshot of queue depth and throughput counters"""
+        with self._stats_lock:
+            self._stats.depth = self._queue.qsize()
+            return WriteQueueStats(**vars(self._stats))
+
+    def _submit(self, item: Tuple, block: bool, timeout: Optional[float]) -> bool:
+        # Nothing would take the item off the queue, and flush() would hang
+        if not self.running:
+            raise RuntimeError("BackgroundWriter is not running; call start() first")
+        try:
+            self._queue.put(item, block=block, timeout=timeout)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats.rejected += 1
+            return False
+        with self._stats_lock:
+            self._stats.enqueued += 1
+            self._stats.max_depth = max(self._stats.max_depth, self._queue.qsize())
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                stopping = True
+                batch = self._drain_nowait()
+            else:
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        self._queue.task_done()
+                        stopping = True
+                        batch.extend(self._drain_nowait())
+                        break
+                    batch.append(item)
+            if batch:
+                self._write_batch(batch)
+
+    def _drain_nowait(self) -> List[Tuple]:
+        items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is _STOP:
+                self._queue.task_done()
+                continue
+            items.append(item)
+
+    def _write_batch(self, batch: List[Tuple]):
+        """Write a batch in one transaction, retrying its items one by one if it fails"""
+        started = time.perf_counter()
+        dead: List[Tuple[Tuple, str]] = []
+        try:
+            self._write_items(batch)
+            failed = False
+        except Exception as e:
+            failed = True
+            if len(batch) == 1:
+                dead.append((batch[0], str(e)))
+            else:
+                logger.error(f"Background write of {len(batch)} items failed, retrying them one by one: {str(e)}")
+                # Isolate the items that cannot be written so the rest still land
+                for item in batch:
+                    try:
+                        self._write_items([item])
+                    except Exception as item_error:
+                        dead.append((item, str(item_error)))
+            if dead:
+                logger.error(f"Dead-lettered {len(dead)} of {len(batch)} items: {dead[0][1]}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+        with self._stats_lock:
+            self._stats.batches += 1
+            self._stats.failed_batches += int(failed)
+            self._stats.written += len(batch) - len(dead)
+            self._stats.dead_lettered += len(dead)
+            self._stats.last_batch_ms = (time.perf_counter() - started) * 1000
+            self._dead_letters.extend(dead)
+
+    def _write_items(self, items: List[Tuple]):
+        """Write items in one transaction, coalescing trades per account"""
+        trades_by_account: Dict[int, List[Trade]] = {}
+        with self.writer.transaction():
+            for kind, target, payload in items:
+                if kind == 'trades':
+                    trades_by_account.setdefault(target, []).extend(payload)
+                elif kind == 'metrics':
+                    self._metric_writers[type(payload)](payload, target)
+                else:
+                    trades, metrics = payload
+                    self.writer.write_all_metrics(target, trades, metrics)
+            for account_id, trades in trades_by_account.items():
+                self.writer.write_trades(trades, account_id)
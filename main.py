@@ -1,4 +1,6 @@
 import sys
+import json
+import multiprocessing
 from PySide6.QtWidgets import QApplication, QMainWindow, QTabWidget
 from PySide6.QtCore import QFile
 from PySide6.QtUiTools import QUiLoader
@@ -12,10 +14,16 @@ from tabs.sequence_tab import SequenceTab
 from tabs.ai_tab import AITab
 from tabs.database_tab import DatabaseTab
 from tabs.strategy_tab import StrategyTab
+from ai.ai_expert import AIExpert
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, ai_expert=None):
+        """
+        Args:
+            ai_expert: AIExpert whose training progress the AI tab shows
+        """
         super().__init__()
+        self.ai_expert = ai_expert
         self.setWindowTitle("Slingshot")
         self.setGeometry(100, 100, 1400, 900)
         self.setup_ui()
@@ -70,6 +78,8 @@ class MainWindow(QMainWindow):
         # AI tab
         ai_tab = AITab()
         self.central_widget.addTab(ai_tab, "AI")
+        if self.ai_expert is not None:
+            ai_tab.set_ai_expert(self.ai_expert)
         
         # Profit & Loss tab
         profit_loss_tab = ProfitLossTab()
@@ -155,8 +165,27 @@ class Threads:
             thread.stop()
 
 
+def load_ai_expert(path: str = 'database.json'):
+    """Create the AIExpert from the PostgreSQL settings in database.json, or None without them"""
+    try:
+        with open(path, 'r') as f:
+            db_config = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return None
+    return AIExpert(db_config)
+
+
 if __name__ == '__main__':
+    # Model training runs in spawned worker processes, which the frozen build must support
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
-    window = MainWindow()
+    ai_expert = load_ai_expert()
+    if ai_expert is not None:
+        ai_expert.start_training_schedule()
+        app.aboutToQuit.connect(ai_expert.stop_training_schedule)
+    window = MainWindow(ai_expert)
     window.show()
     sys.exit(app.exec())
@@ -1,14 +1,21 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                               QTableWidget, QTableWidgetItem, QHeaderView, QSplitter)
-from PySide6.QtCore import Qt
+                               QTableWidget, QTableWidgetItem, QHeaderView, QSplitter,
+                               QPushButton)
+from PySide6.QtCore import Qt, QTimer, Signal
 from widgets.line_chart import LineChartWidget
+from widgets.progress_bar import AnimatedProgressBar
 import random
 from datetime import datetime, timedelta
 
 class AITab(QWidget):
+    # Emitted from the training thread; queued to the UI thread, which starts polling
+    training_started = Signal()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.ai_expert = None
         self.setup_ui()
+        self.setup_timer()
         self.load_sample_data()
         
     def setup_ui(self):
@@ -53,6 +60,34 @@ class AITab(QWidget):
         performance_header.setStyleSheet("font-size: 16px; font-weight: bold; color: #4CAF50; margin-top: 20px;")
         left_layout.addWidget(performance_header)
         
+        # Model Training Status
+        training_layout = QHBoxLayout()
+        self.training_status = QLabel("Training: idle")
+        self.training_status.setStyleSheet("color: #FFFFFF; font-size: 14px;")
+        self.training_progress = AnimatedProgressBar()
+        self.cancel_training_btn = QPushButton("Cancel Training")
+        self.cancel_training_btn.clicked.connect(self.cancel_training)
+        self.cancel_training_btn.setEnabled(False)
+        self.cancel_training_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #F44336;
+                color: white;
+                border: none;
+                padding: 5px 15px;
+                border-radius: 3px;
+            }
+            QPushButton:hover {
+                background-color: #da190b;
+            }
+            QPushButton:disabled {
+                background-color: #666666;
+            }
+        """)
+        training_layout.addWidget(self.training_status)
+        training_layout.addWidget(self.training_progress, 1)
+        training_layout.addWidget(self.cancel_training_btn)
+        left_layout.addLayout(training_layout)
+        
         # Model Accuracy Chart
         accuracy_label = QLabel("Model Prediction Accuracy Over Time")
         accuracy_label.setStyleSheet("color: #FFFFFF; font-size: 14px;")
@@ -113,6 +148,44 @@ class AITab(QWidget):
         
         main_layout.addWidget(splitter)
         
+    def setup_timer(self):
+        """Setup timer polling the training progress while a training job runs"""
+        # Polled from the UI thread, so the worker never touches widgets
+        self.training_timer = QTimer(self)
+        self.training_timer.setInterval(1000)
+        self.training_timer.timeout.connect(self.update_training_progress)
+        self.training_started.connect(self.training_timer.start)
+        
+    def set_ai_expert(self, ai_expert):
+        """Show training progress of the given AIExpert"""
+        self.ai_expert = ai_expert
+        ai_expert.on_training_started(self.training_started.emit)
+        # Also starts polling if a job is already running
+        self.update_training_progress()
+        
+    def update_training_progress(self):
+        """Update the training status from the trainer's latest progress"""
+        if self.ai_expert is None:
+            return
+        progress = self.ai_expert.training_progress()
+        status = f"Training: {progress.stage}"
+        if progress.message:
+            status += f" ({progress.message})"
+        self.training_status.setText(status)
+        self.training_progress.set_progress(int(progress.fraction * 100))
+        running = not progress.finished and progress.stage != 'idle'
+        self.cancel_training_btn.setEnabled(running)
+        if not running:
+            self.training_timer.stop()
+        elif not self.training_timer.isActive():
+            self.training_timer.start()
+        
+    def cancel_training(self):
+        """Cancel the running training job"""
+        if self.ai_expert is not None:
+            self.ai_expert.cancel_training()
+            self.update_training_progress()
+        
     def create_table_base(self, headers):
         """Create a base styled table widget"""
         table = QTableWidget()
@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QComboBox, 
                                QLabel, QGridLayout, QTableWidget, QTableWidgetItem,
                                QHeaderView, QFrame, QSplitter, QPushButton)
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QColor
 from widgets.bar_chart import BarChartWidget
 from widgets.line_chart import LineChartWidget
@@ -10,8 +10,16 @@ import random
 from datetime import datetime, timedelta
 
 class OverviewTab(QWidget):
+    # Change feed events, re-emitted so they are handled on the GUI thread
+    trades_changed = Signal(list)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.change_feed = None
+        self.analyzer = None
+        self._feed_token = None
+        self._open_positions = {}
+        self.trades_changed.connect(self.on_trades_changed)
         self.setup_ui()
         self.load_sample_data()
         
@@ -287,6 +295,51 @@ class OverviewTab(QWidget):
     def on_account_changed(self, index):
         self.load_sample_data()
         
+    def set_change_feed(self, feed, account_id, analyzer=None):
+        """Show an account's open positions live from a ChangeFeed
+        
+        An optional TradingAnalyzer of the same account is kept current too,
+        and the growth chart is redrawn from it. Pass feed=None to detach.
+        """
+        if self.change_feed is not None and self._feed_token is not None:
+            self.change_feed.unsubscribe(self._feed_token)
+        self.change_feed = feed
+        self.analyzer = analyzer
+        self._feed_token = None
+        # Positions already open in the analyzer's trades are shown at once
+        self._open_positions = {
+            trade.id: (
+                trade.symbol, trade.direction.value, trade.volume, trade.open_price,
+                trade.close_price or trade.open_price, trade.swap or 0.0, trade.profit_loss or 0.0
+            )
+            for trade in (analyzer.trades if analyzer is not None else [])
+            if trade.status == 'open'
+        }
+        self.show_positions(list(self._open_positions.values()))
+        if feed is not None:
+            # Called on the feed's thread; the signal hands the events to the GUI thread
+            self._feed_token = feed.subscribe(self.trades_changed.emit, tables=['trades'], account_id=account_id)
+            
+    def on_trades_changed(self, events):
+        """Apply trade changes from the change feed"""
+        for event in events:
+            row = event.row
+            trade_id = row.get('broker_trade_id') or row['id']
+            if row.get('status') == 'open':
+                self._open_positions[trade_id] = (
+                    row['symbol'], row['direction'], row['volume'], row['open_price'],
+                    row.get('close_price') or row['open_price'], row.get('swap') or 0.0,
+                    row.get('profit_loss') or 0.0
+                )
+            else:
+                self._open_positions.pop(trade_id, None)
+        self.show_positions(list(self._open_positions.values()))
+        
+        if self.analyzer is not None and self.analyzer.apply_changes(events):
+            overview = self.analyzer.calculate_overview_metrics()
+            if overview.growth_dates:
+                self.growth_chart.update_data(overview.growth_dates, [overview.account_growth], ['#00ff00'])
+        
     def update_positions(self):
         """Update open positions table with sample data"""
         positions = [
@@ -296,7 +349,10 @@ class OverviewTab(QWidget):
             ("USDJPY", "Sell", 1.0, 147.85, 147.65, -0.34, 185.5),
             ("XAUUSD", "Buy", 0.2, 2023.45, 2025.67, -0.15, 44.4)
         ]
+        self.show_positions(positions)
         
+    def show_positions(self, positions):
+        """Fill the open positions table from (symbol, type, volume, open, current, swap, P/L) tuples"""
         self.positions_table.setRowCount(len(positions))
         for row, position in enumerate(positions):
             # Symbol
@@ -0,0 +1,136 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.classes import Account, Direction, Trade
+from database.db_write import DatabaseWriter
+
+# Migrations that need the TimescaleDB extension; the queries under test do not
+TIMESCALE_MIGRATIONS = {2}
+
+APPLICATION_TABLES = 'accounts, trades, account_snapshots, orders, account_daily_rollups'
+
+
+@pytest.fixture(scope='session')
+def pg_dsn(tmp_path_factory):
+    """DSN of a scratch PostgreSQL database
+
+    Set SLINGSHOT_TEST_DSN to use an existing server; otherwise a throwaway
+    server is started with pgserver. Tests are skipped when neither is available.
+    """
+    dsn = os.environ.get('SLINGSHOT_TEST_DSN')
+    if dsn:
+        yield dsn
+        return
+    pgserver = pytest.importorskip('pgserver')
+    try:
+        server = pgserver.get_server(tmp_path_factory.mktemp('pgdata'), cleanup_mode='stop')
+    except Exception as e:
+        pytest.skip(f"Could not start a PostgreSQL server: {str(e)}")
+    yield server.get_uri()
+    server.cleanup()
+
+
+@pytest.fixture(scope='session')
+def pg_schema(pg_dsn):
+    psycopg2 = pytest.importorskip('psycopg2')
+    from database.instrumentation import InstrumentedCursor
+    from database.migrations import SchemaMigrator
+
+    conn = psycopg2.connect(pg_dsn, cursor_factory=InstrumentedCursor)
+    migrator = SchemaMigrator(conn)
+    migrator.ensure_version_table()
+    for migration in migrator.pending():
+        if migration.version not in TIMESCALE_MIGRATIONS:
+            migrator._apply(migration)
+    conn.close()
+    return pg_dsn
+
+
+@pytest.fixture
+def db(pg_schema):
+    """DatabaseConnection on an empty schema"""
+    import psycopg2
+    from database.db_retrieve import DatabaseConnection
+    from database.instrumentation import InstrumentedCursor, QueryMetricsRegistry
+
+    connection = DatabaseConnection('', 0, '', '', '', metrics=QueryMetricsRegistry())
+    connection.conn = psycopg2.connect(pg_schema, cursor_factory=InstrumentedCursor)
+    with connection.conn.cursor() as cur:
+        cur.execute(f"TRUNCATE {APPLICATION_TABLES} RESTART IDENTITY CASCADE")
+    connection.conn.commit()
+    yield connection
+    connection.conn.rollback()
+    connection.disconnect()
+
+
+@pytest.fixture
+def pg_account(db):
+    with db.conn.cursor() as cur:
+        cur.execute("INSERT INTO accounts (login, name, balance) VALUES ('1001', 'Test', 10000) RETURNING id")
+        account_id = cur.fetchone()[0]
+    db.conn.commit()
+    return account_id
+
+
+def insert_pg_trades(db, account_id, profits, start=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+                     step=timedelta(hours=5)):
+    """Insert one closed trade per profit_loss value, an hour long and step apart"""
+    rows = []
+    for i, profit_loss in enumerate(profits):
+        open_time = start + i * step
+        rows.append((
+            account_id, 'EURUSD' if i % 3 else 'GBPUSD', 'Buy' if i % 2 else 'Sell',
+            open_time, open_time + timedelta(hours=1), 1.1, 1.2,
+            round(0.1 * (1 + i % 4), 2), profit_loss
+        ))
+    with db.conn.cursor() as cur:
+        cur.executemany(
+            """
+                INSERT INTO trades (account_id, symbol, direction, open_time, close_time,
+                                    open_price, close_price, volume, profit_loss)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            rows
+        )
+    db.conn.commit()
+
+
+def make_trades(count, start=datetime(2024, 1, 1, 9), step=timedelta(hours=5), first_id=1):
+    """Closed trades alternating wins and losses, with some breakeven and unprotected ones"""
+    trades = []
+    for i in range(count):
+        open_time = start + i * step
+        profit_loss = [12.5, -7.0, 0.0, 30.0, -15.5, 4.0, -2.5][i % 7]
+        trades.append(Trade(
+            id=first_id + i,
+            symbol=['EURUSD', 'GBPUSD', 'USDJPY'][i % 3],
+            direction=Direction.BUY if i % 2 else Direction.SELL,
+            open_time=open_time,
+            close_time=open_time + timedelta(hours=1 + i % 3),
+            open_price=1.1 + 0.001 * i,
+            close_price=1.1 + 0.001 * i + 0.0005,
+            volume=round(0.1 * (1 + i % 4), 2),
+            profit_loss=profit_loss,
+            swap=0.0,
+            commission=-0.5,
+            take_profit=None if i % 4 == 0 else 1.2,
+            stop_loss=None if i % 5 == 0 else 1.0,
+            comment='',
+            status='closed'
+        ))
+    return trades
+
+
+def make_account(login='1001', server='Broker-Demo', balance=10000.0):
+    return Account(
+        id=0, login=login, name='Test', balance=balance, equity=balance, margin=0.0,
+        margin_level=0.0, floating_pl=0.0, server=server, max_positions=10, max_volume=5.0
+    )
+
+
+@pytest.fixture
+def writer(tmp_path):
+    with DatabaseWriter(str(tmp_path / 'slingshot.db')) as writer:
+        yield writer
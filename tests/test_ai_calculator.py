@@ -0,0 +1,33 @@
+import dataclasses
+
+from analysis import ai_calculator
+from analysis.ai_calculator import AICalculator
+from analysis.analysis import TradingAnalyzer
+
+from conftest import make_account, make_trades
+
+ACCOUNT = dataclasses.replace(make_account(), id=7)
+
+
+def calculator(trades):
+    return AICalculator(TradingAnalyzer(trades, ACCOUNT).trades_df, ACCOUNT.id)
+
+
+def test_unchanged_trades_reuse_the_cached_fit():
+    ai_calculator._model_cache.clear()
+    trades = make_trades(60)
+    assert calculator(trades).model is calculator(list(trades)).model
+
+
+def test_profit_changed_in_place_refits():
+    ai_calculator._model_cache.clear()
+    trades = make_trades(60)
+    original = calculator(trades)
+    fitted = original.model
+
+    # Same count and latest close time, as after an upsert of one trade's profit
+    changed = list(trades)
+    changed[-1] = dataclasses.replace(changed[-1], profit_loss=changed[-1].profit_loss + 100)
+    refreshed = calculator(changed)
+    assert refreshed.model is not fitted
+    assert refreshed.watermark[:2] == original.watermark[:2]
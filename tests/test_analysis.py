@@ -0,0 +1,32 @@
+import dataclasses
+from functools import cached_property
+
+import pytest
+
+from analysis.analysis import CACHED_ATTRIBUTES, METRIC_DEPENDENCIES, TradingAnalyzer
+
+from conftest import make_account, make_trades
+
+LAZY_ATTRIBUTES = {
+    name for name, attribute in vars(TradingAnalyzer).items() if isinstance(attribute, cached_property)
+}
+
+
+def test_every_lazy_attribute_is_dropped_on_changes():
+    assert LAZY_ATTRIBUTES == set(CACHED_ATTRIBUTES)
+
+
+@pytest.mark.parametrize('group', list(METRIC_DEPENDENCIES))
+def test_group_builds_exactly_its_listed_calculators(group):
+    analyzer = TradingAnalyzer(make_trades(60), dataclasses.replace(make_account(), id=1))
+    analyzer.calculate([group])
+
+    built = LAZY_ATTRIBUTES & vars(analyzer).keys()
+    # Every group reads the trades frame, directly or through its calculators
+    assert built == {'trades_df', *METRIC_DEPENDENCIES[group]}
+
+
+def test_unknown_group_is_rejected():
+    analyzer = TradingAnalyzer(make_trades(5), make_account())
+    with pytest.raises(ValueError):
+        analyzer.calculate(['nonexistent'])
@@ -0,0 +1,115 @@
+import dataclasses
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from analysis.analysis import TradingAnalyzer
+from database.change_feed import ChangeFeed, SqliteChangeFeed
+from database.classes import ChangeEvent
+
+from conftest import make_account, make_trades
+
+
+def test_change_feed_is_abstract():
+    with pytest.raises(TypeError):
+        ChangeFeed()
+
+
+def test_sqlite_feed_updates_analyzer(writer):
+    account = make_account()
+    account_id = writer.write_account(account)
+    trades = make_trades(20)
+    writer.write_trades(trades, account_id)
+    analyzer = TradingAnalyzer(trades, dataclasses.replace(account, id=account_id))
+    before = analyzer.calculate_profit_loss_metrics()
+
+    received = []
+    delivered = threading.Event()
+    feed = SqliteChangeFeed(writer.db_path, poll_interval=0.01)
+    feed.subscribe(lambda events: (received.extend(events), delivered.set()), tables=['trades'])
+    feed.start()
+    try:
+        changed = dataclasses.replace(trades[0], profit_loss=500.0)
+        writer.write_trades([changed] + make_trades(2, first_id=1000), account_id)
+        assert delivered.wait(5)
+    finally:
+        feed.stop()
+
+    assert analyzer.apply_changes(received)
+    after = analyzer.calculate_profit_loss_metrics()
+    assert after.total_trades == before.total_trades + 2
+    assert after.best_trade == 500.0
+
+
+def test_sqlite_feed_delivers_bulk_writes_logged_per_batch(writer):
+    account_id = writer.write_account(make_account())
+    writer.write_trades(make_trades(3), account_id)
+    feed = SqliteChangeFeed(writer.db_path, batch_size=4)
+    feed._open()
+    try:
+        writer.write_trades(make_trades(10, first_id=100), account_id, batch_size=4, defer_indexes=True)
+        writer.write_trades([dataclasses.replace(make_trades(1)[0], profit_loss=500.0)], account_id)
+        with writer.transaction() as cursor:
+            entries = cursor.execute("SELECT count(*) FROM change_log").fetchone()[0]
+        # Three range entries for the bulk write, one trigger row per trade otherwise
+        assert entries == 3 + 3 + 1
+
+        received = []
+        while len(received) < 11:
+            events = feed._poll()
+            assert events
+            assert len(events) <= 4
+            received.extend(events)
+    finally:
+        feed._close()
+    assert [event.row['broker_trade_id'] for event in received] == list(range(100, 110)) + [1]
+    assert received[-1].operation == 'UPDATE'
+
+
+def test_apply_changes_ignores_other_accounts():
+    trades = make_trades(5)
+    analyzer = TradingAnalyzer(trades, dataclasses.replace(make_account(), id=1))
+    analyzer.trades_df
+    row = dataclasses.asdict(make_trades(1, first_id=99)[0])
+    row['direction'] = row['direction'].value
+    assert not analyzer.apply_changes([ChangeEvent('trades', 'INSERT', 2, row)])
+    assert 'trades_df' in analyzer.__dict__
+
+
+def test_apply_changes_merges_into_a_prebuilt_frame():
+    trades = make_trades(5)
+    account = dataclasses.replace(make_account(), id=1)
+    # As built from ParquetStore.load_trades_frame, with no trade list
+    analyzer = TradingAnalyzer([], account, trades_df=TradingAnalyzer(trades, account).trades_df)
+    row = dataclasses.asdict(dataclasses.replace(trades[0], profit_loss=500.0))
+    row['direction'] = row['direction'].value
+    assert analyzer.apply_changes([ChangeEvent('trades', 'UPDATE', 1, row)])
+
+    frame = analyzer.trades_df
+    assert list(frame['id']) == [trade.id for trade in trades]
+    assert frame['profit_loss'].iloc[0] == 500.0
+
+
+def test_postgres_feed_fetches_oversized_snapshot(db, pg_account):
+    pytest.importorskip('psycopg2')
+    from database.pg_change_feed import PostgresChangeFeed
+
+    time = datetime(2024, 1, 2, 12, tzinfo=timezone.utc)
+    with db.conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO account_snapshots (account_id, time, balance, equity) VALUES (%s, %s, 10100, 10150)",
+            (pg_account, time)
+        )
+        cur.execute("SELECT to_jsonb(%s::timestamptz)", (time,))
+        time_json = cur.fetchone()[0]
+    db.conn.commit()
+
+    feed = PostgresChangeFeed(db)
+    feed.conn = db.conn
+    event = feed._event({
+        'table': 'account_snapshots', 'operation': 'INSERT',
+        'account_id': pg_account, 'id': None, 'time': time_json
+    })
+    assert event.row['balance'] == 10100
+    assert event.row['time'] == time
@@ -0,0 +1,91 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import insert_pg_trades
+
+# Trades close around midnight UTC, so any local-time bucketing shows up
+START = datetime(2024, 1, 1, 20, tzinfo=timezone.utc)
+PROFITS = [4.0, -2.0, 0.0, 3.5, -1.5, 6.0, -3.0, 2.0, None, 1.0, -0.5, 2.5]
+STEP = timedelta(hours=3)
+
+
+def rollup_rows(db, account_id):
+    with db.conn.cursor() as cur:
+        cur.execute("""
+            SELECT date, balance, equity, realized_pl, gross_profit, gross_loss, trade_count, winning_trades
+            FROM account_daily_rollups
+            WHERE account_id = %s
+            ORDER BY date
+        """, (account_id,))
+        return cur.fetchall()
+
+
+def insert_snapshots(db, account_id):
+    with db.conn.cursor() as cur:
+        for i in range(16):
+            time = START + i * timedelta(hours=2, minutes=30)
+            cur.execute(
+                "INSERT INTO account_snapshots (account_id, time, balance, equity) VALUES (%s, %s, %s, %s)",
+                (account_id, time, 10000 + i, 10000 + 2 * i)
+            )
+    db.conn.commit()
+
+
+@pytest.fixture
+def local_session(db):
+    """Session TimeZone far from UTC"""
+    with db.conn.cursor() as cur:
+        cur.execute("SET TIME ZONE 'Pacific/Auckland'")
+    db.conn.commit()
+    return db
+
+
+def test_trigger_rollups_bucket_by_utc_date(local_session, pg_account):
+    db = local_session
+    insert_pg_trades(db, pg_account, PROFITS, start=START, step=STEP)
+
+    expected = defaultdict(lambda: [0.0, 0.0, 0.0, 0, 0])
+    for i, profit_loss in enumerate(PROFITS):
+        day = (START + i * STEP + timedelta(hours=1)).astimezone(timezone.utc).date()
+        profit_loss = profit_loss or 0.0
+        row = expected[day]
+        row[0] += profit_loss
+        row[1] += max(profit_loss, 0)
+        row[2] += min(profit_loss, 0)
+        row[3] += 1
+        row[4] += profit_loss > 0
+
+    rows = rollup_rows(db, pg_account)
+    assert {row[0]: list(row[3:]) for row in rows} == {day: row for day, row in expected.items()}
+
+
+def test_rebuild_matches_triggers(local_session, pg_account):
+    db = local_session
+    insert_snapshots(db, pg_account)
+    insert_pg_trades(db, pg_account, PROFITS, start=START, step=STEP)
+    with db.conn.cursor() as cur:
+        cur.execute("UPDATE trades SET profit_loss = profit_loss * 2 WHERE account_id = %s AND profit_loss < 0",
+                    (pg_account,))
+        cur.execute("DELETE FROM trades WHERE account_id = %s AND profit_loss = 6.0", (pg_account,))
+    db.conn.commit()
+    maintained = rollup_rows(db, pg_account)
+
+    db.refresh_daily_rollups(pg_account)
+    rebuilt = rollup_rows(db, pg_account)
+
+    assert rebuilt == maintained
+
+
+def test_snapshot_rollups_keep_last_snapshot_of_utc_day(local_session, pg_account):
+    db = local_session
+    insert_snapshots(db, pg_account)
+
+    last = {}
+    for i in range(16):
+        time = START + i * timedelta(hours=2, minutes=30)
+        last[time.date()] = (10000 + i, 10000 + 2 * i)
+
+    rows = rollup_rows(db, pg_account)
+    assert {row[0]: (row[1], row[2]) for row in rows} == last
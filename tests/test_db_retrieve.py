@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from conftest import insert_pg_trades
+
+START = datetime(2023, 12, 1, tzinfo=timezone.utc)
+END = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+# Wins, losses, breakeven (0) and unpriced (None) trades in close_time order
+PROFITS = [5.0, 3.0, 0.0, 2.0, -1.0, None, -4.0, -2.0, 0.0, -3.0, 7.0, 1.0, -1.0, 2.0, 2.0, 2.0, 0.0, 2.0]
+
+
+def reference_streaks(profits):
+    """Longest win and loss runs, skipping breakeven and unpriced trades"""
+    best = {1: 0, -1: 0}
+    outcome, length = 0, 0
+    for profit_loss in profits:
+        if not profit_loss:
+            continue
+        current = 1 if profit_loss > 0 else -1
+        length = length + 1 if current == outcome else 1
+        outcome = current
+        best[outcome] = max(best[outcome], length)
+    return best[1], best[-1]
+
+
+def test_reference_streaks_skip_breakeven():
+    assert reference_streaks(PROFITS) == (4, 4)
+
+
+def test_profit_loss_metrics_match_python(db, pg_account):
+    insert_pg_trades(db, pg_account, PROFITS)
+    metrics = db.get_profit_loss_metrics(pg_account, START, END)
+
+    closed = [p for p in PROFITS if p is not None]
+    wins = [p for p in closed if p > 0]
+    losses = [p for p in closed if p < 0]
+    assert metrics.total_trades == len(PROFITS)
+    assert metrics.winning_trades == len(wins)
+    assert metrics.total_pl == pytest.approx(sum(closed))
+    assert metrics.best_trade == max(closed)
+    assert metrics.worst_trade == min(closed)
+    assert metrics.average_win == pytest.approx(sum(wins) / len(wins))
+    assert metrics.average_loss == pytest.approx(sum(losses) / len(losses))
+    assert metrics.profit_factor == pytest.approx(sum(wins) / abs(sum(losses)))
+    assert (metrics.consecutive_wins, metrics.consecutive_losses) == reference_streaks(PROFITS)
+
+
+def test_sequence_metrics_match_python(db, pg_account):
+    insert_pg_trades(db, pg_account, PROFITS)
+    metrics = db.get_sequence_metrics(pg_account, START, END, include_trades=True)
+
+    assert (metrics.win_streak, metrics.loss_streak) == reference_streaks(PROFITS)
+    assert metrics.avg_trade_duration == pytest.approx(1.0)
+    assert sum(metrics.time_distribution.values()) == len(PROFITS)
+    assert sum(metrics.weekday_distribution.values()) == len(PROFITS)
+    assert metrics.volume_distribution == {
+        volume: sum(1 for t in metrics.trades if t.volume == volume)
+        for volume in {t.volume for t in metrics.trades}
+    }
+
+
+def test_profit_loss_and_sequence_streaks_agree(db, pg_account):
+    insert_pg_trades(db, pg_account, PROFITS)
+    profit_loss = db.get_profit_loss_metrics(pg_account, START, END)
+    sequence = db.get_sequence_metrics(pg_account, START, END)
+
+    assert profit_loss.consecutive_wins == sequence.win_streak
+    assert profit_loss.consecutive_losses == sequence.loss_streak
+
+
+def test_empty_period(db, pg_account):
+    metrics = db.get_profit_loss_metrics(pg_account, START, END)
+    assert metrics.total_trades == 0
+    assert (metrics.consecutive_wins, metrics.consecutive_losses) == (0, 0)
+
+
+def test_summary_metrics(db, pg_account):
+    insert_pg_trades(db, pg_account, PROFITS)
+    with db.conn.cursor() as cur:
+        for day, balance in ((2, 10000.0), (3, 9000.0), (4, 9500.0)):
+            cur.execute(
+                "INSERT INTO account_snapshots (account_id, time, balance, equity) VALUES (%s, %s, %s, %s)",
+                (pg_account, datetime(2024, 1, day, tzinfo=timezone.utc), balance, balance)
+            )
+    db.conn.commit()
+    metrics = db.get_summary_metrics(pg_account, START, END)
+
+    closed = [p for p in PROFITS if p is not None]
+    assert metrics.total_trades == len(PROFITS)
+    assert metrics.net_profit == pytest.approx(sum(closed))
+    assert metrics.absolute_drawdown == pytest.approx(1000.0)
+    assert metrics.relative_drawdown == pytest.approx(0.1)
+
+
+def test_summary_metrics_without_snapshots(db, pg_account):
+    insert_pg_trades(db, pg_account, PROFITS)
+    metrics = db.get_summary_metrics(pg_account, START, END)
+    assert metrics.total_trades == len(PROFITS)
+    assert metrics.absolute_drawdown == 0
+
+
+def test_index_usage(db, pg_account):
+    usage = db.get_index_usage()
+    assert 'trades' in {index.table_name for index in usage}
+
+
+def test_profit_loss_metrics_count_trades_opened_in_range(db, pg_account):
+    # Opened before the range and closed inside it, then opened inside and closed after it
+    insert_pg_trades(db, pg_account, [50.0], start=START - timedelta(minutes=30))
+    insert_pg_trades(db, pg_account, [-20.0], start=END - timedelta(minutes=30))
+    metrics = db.get_profit_loss_metrics(pg_account, START, END)
+
+    assert metrics.total_trades == 1
+    assert metrics.total_pl == pytest.approx(-20.0)
@@ -0,0 +1,153 @@
+import dataclasses
+import sqlite3
+
+from database.db_write import DatabaseWriter
+
+from conftest import make_account, make_trades
+
+
+def trade_count(writer, account_id=None):
+    conn = writer._connection()
+    if account_id is None:
+        return conn.execute("SELECT count(*) FROM trades").fetchone()[0]
+    return conn.execute("SELECT count(*) FROM trades WHERE account_id = ?", (account_id,)).fetchone()[0]
+
+
+def test_write_trades_is_idempotent(writer):
+    account_id = writer.write_account(make_account())
+    trades = make_trades(50)
+
+    first = writer.write_trades(trades, account_id)
+    second = writer.write_trades(trades, account_id)
+
+    assert first.changed_rows == 50
+    assert second.changed_rows == 0
+    assert trade_count(writer) == 50
+
+
+def test_write_trades_updates_changed_rows_only(writer):
+    account_id = writer.write_account(make_account())
+    trades = make_trades(20)
+    writer.write_trades(trades, account_id)
+
+    changed = list(trades)
+    changed[3] = dataclasses.replace(changed[3], profit_loss=99.0)
+    throughput = writer.write_trades(changed, account_id)
+
+    assert throughput.changed_rows == 1
+    profit_loss = writer._connection().execute(
+        "SELECT profit_loss FROM trades WHERE broker_trade_id = ?", (trades[3].id,)
+    ).fetchone()[0]
+    assert profit_loss == 99.0
+
+
+def test_write_account_upserts_on_login_and_server(writer):
+    first = writer.write_account(make_account(balance=100.0))
+    second = writer.write_account(make_account(balance=200.0))
+    other = writer.write_account(make_account(server='Broker-Live'))
+
+    assert first == second
+    assert other != first
+    balance = writer._connection().execute("SELECT balance FROM accounts WHERE id = ?", (first,)).fetchone()[0]
+    assert balance == 200.0
+
+
+def test_write_account_without_server(writer):
+    first = writer.write_account(make_account(server=None, balance=100.0))
+    second = writer.write_account(make_account(server=None, balance=200.0))
+
+    assert first == second
+    assert writer._connection().execute("SELECT count(*) FROM accounts").fetchone()[0] == 1
+
+
+def legacy_database(path, copies):
+    """A file written before upserts: no broker ids, every sync appended the trades again"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE accounts (
+            id INTEGER PRIMARY KEY, login TEXT NOT NULL, name TEXT, balance REAL, equity REAL,
+            margin REAL, margin_level REAL, floating_pl REAL, server TEXT,
+            max_positions INTEGER, max_volume REAL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY, account_id INTEGER, symbol TEXT, direction TEXT,
+            open_time DATETIME, close_time DATETIME, open_price REAL, close_price REAL,
+            volume REAL, profit_loss REAL, swap REAL, commission REAL, take_profit REAL,
+            stop_loss REAL, comment TEXT, status TEXT
+        )
+    """)
+    for _ in range(2):
+        conn.execute("INSERT INTO accounts (login, name, server) VALUES ('1001', 'Test', NULL)")
+    for _ in range(copies):
+        conn.executemany("""
+            INSERT INTO trades (account_id, symbol, direction, open_time, close_time, open_price,
+                                close_price, volume, profit_loss, swap, commission, take_profit,
+                                stop_loss, comment, status)
+            VALUES (2, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (t.symbol, t.direction.value, t.open_time, t.close_time, t.open_price, t.close_price,
+             t.volume, t.profit_loss, t.swap, t.commission, t.take_profit, t.stop_loss, t.comment, t.status)
+            for t in make_trades(10)
+        ])
+    conn.commit()
+    conn.close()
+
+
+def test_setup_dedupes_legacy_trades_and_accounts(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    legacy_database(path, copies=3)
+
+    with DatabaseWriter(path) as writer:
+        assert writer._connection().execute("SELECT count(*) FROM accounts").fetchone()[0] == 1
+        assert trade_count(writer) == 10
+
+
+def test_rewritten_legacy_trades_replace_the_old_rows(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    legacy_database(path, copies=2)
+
+    with DatabaseWriter(path) as writer:
+        account_id = writer.write_account(make_account(server=None))
+        writer.write_trades(make_trades(10), account_id)
+
+        assert trade_count(writer, account_id) == 10
+        missing = writer._connection().execute(
+            "SELECT count(*) FROM trades WHERE broker_trade_id IS NULL"
+        ).fetchone()[0]
+        assert missing == 0
+
+
+def auto_vacuum(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_new_file_uses_incremental_auto_vacuum(writer):
+    assert writer._connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert writer._connection().execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_existing_file_is_converted_to_incremental_auto_vacuum(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    legacy_database(path, copies=1)
+    assert auto_vacuum(path) == 0
+
+    with DatabaseWriter(path):
+        pass
+    assert auto_vacuum(path) == 2
+
+
+def test_compact_frees_pages_incrementally(writer):
+    account_id = writer.write_account(make_account())
+    writer.write_trades(make_trades(2000), account_id)
+    conn = writer._connection()
+    conn.execute("DELETE FROM trades")
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+
+    writer.vacuum()
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
@@ -0,0 +1,71 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from sklearn.ensemble import RandomForestClassifier
+
+from ai.forest import FLAT_PREDICT_MAX_ROWS, FlatForest
+
+
+def fitted(outputs=3, rows=2000, features=6, seed=42):
+    rng = np.random.default_rng(seed)
+    X = rng.random((rows, features))
+    y = rng.integers(0, 4, size=(rows, outputs)).astype(np.float64)
+    estimator = RandomForestClassifier(n_estimators=20, random_state=seed).fit(X, y[:, 0] if outputs == 1 else y)
+    return estimator, FlatForest.from_estimator(estimator)
+
+
+# Both sides of the switch between the numpy traversal and sklearn's trees
+@pytest.mark.parametrize('rows', [1, FLAT_PREDICT_MAX_ROWS, FLAT_PREDICT_MAX_ROWS + 1, 500])
+@pytest.mark.parametrize('outputs', [1, 3])
+def test_predictions_match_sklearn(rows, outputs):
+    estimator, forest = fitted(outputs)
+    X = np.random.default_rng(7).random((rows, forest.n_features))
+
+    np.testing.assert_array_equal(forest.predict(X), estimator.predict(X))
+    np.testing.assert_array_equal(forest.predict(X, n_jobs=2), estimator.predict(X))
+    expected = estimator.predict_proba(X)
+    proba = forest.predict_proba(X)
+    for output, output_proba in enumerate([expected] if outputs == 1 else expected):
+        np.testing.assert_allclose(proba[:, output, :output_proba.shape[1]], output_proba)
+
+
+def test_training_rows_are_scored_like_sklearn():
+    # Rows on the training thresholds exercise the <= comparison at every split
+    rng = np.random.default_rng(42)
+    X = rng.random((2000, 6))
+    estimator, forest = fitted()
+    for rows in (X[:FLAT_PREDICT_MAX_ROWS], X):
+        np.testing.assert_array_equal(forest.predict(rows), estimator.predict(rows))
+
+
+def test_rebuilt_trees_are_not_pickled():
+    _, forest = fitted()
+    forest.predict(np.zeros((FLAT_PREDICT_MAX_ROWS + 1, forest.n_features)))
+    restored = pickle.loads(pickle.dumps(forest))
+    assert '_trees' not in vars(restored)
+    X = np.random.default_rng(3).random((100, forest.n_features))
+    np.testing.assert_array_equal(restored.predict(X), forest.predict(X))
+
+
+def test_concat_merges_classes_and_matches_both_forests():
+    older, older_forest = fitted(seed=1)
+    newer, newer_forest = fitted(seed=2)
+    forest = FlatForest.concat([older_forest, newer_forest])
+    assert forest.n_trees == older_forest.n_trees + newer_forest.n_trees
+
+    X = np.random.default_rng(5).random((200, forest.n_features))
+    # Equal tree counts, so the joined forest averages both estimators' proportions
+    expected = [(a + b) / 2 for a, b in zip(older.predict_proba(X), newer.predict_proba(X))]
+    for rows in (X[:FLAT_PREDICT_MAX_ROWS], X):
+        proba = forest.predict_proba(rows)
+        for output, output_proba in enumerate(expected):
+            np.testing.assert_allclose(proba[:, output, :], output_proba[:len(rows)])
+    np.testing.assert_array_equal(forest.latest_trees(newer_forest.n_trees).predict(X), newer.predict(X))
+
+
+def test_wrong_feature_count_is_rejected():
+    _, forest = fitted()
+    with pytest.raises(ValueError):
+        forest.predict(np.zeros((2, forest.n_features + 1)))
@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+from database.instrumentation import QueryMetricsRegistry, instrumented
+
+
+def test_claim_explain_once_per_interval():
+    registry = QueryMetricsRegistry()
+    assert registry.claim_explain("SELECT 1", 60)
+    assert not registry.claim_explain("SELECT 1", 60)
+    assert registry.claim_explain("SELECT 2", 60)
+    assert registry.claim_explain("SELECT 1", 0)
+
+
+def test_slow_calls_are_explained_once_per_interval(db, pg_account, caplog):
+    db.slow_call_ms = 0
+    db.explain_interval_s = 60
+    with caplog.at_level(logging.WARNING, logger='database.instrumentation'):
+        db.get_account(pg_account)
+        db.get_account(pg_account)
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 2
+    assert '"Plan"' in messages[0]
+    assert 'plan logged within the last 60 s' in messages[1]
+    assert db.metrics.summary()['get_account']['slow_calls'] == 2
+
+
+def test_failed_explain_leaves_connection_usable(db, pg_account):
+    class DroppingConnection(type(db)):
+        @instrumented
+        def get_dropped(self):
+            with self.conn.cursor() as cur:
+                cur.execute("CREATE TEMP TABLE dropped (x int)")
+                cur.execute("SELECT count(*) FROM dropped")
+                count = cur.fetchone()[0]
+                cur.execute("DROP TABLE dropped")
+            return count
+
+    db.__class__ = DroppingConnection
+    db.slow_call_ms = 0
+    assert db.get_dropped() == 0
+    # EXPLAIN of the dropped table failed; the next call still works
+    assert db.get_account(pg_account).id == pg_account
+
+
+def test_slow_writes_are_not_run_again(db, pg_account):
+    class WritingConnection(type(db)):
+        @instrumented
+        def bump(self, account_id):
+            with self.conn.cursor() as cur:
+                cur.execute("UPDATE accounts SET balance = balance + 1 WHERE id = %s", (account_id,))
+                # A SELECT with a side effect, refused by the read-only explain
+                cur.execute("SELECT nextval('trades_id_seq')")
+                value = cur.fetchone()[0]
+            self.conn.commit()
+            return value
+
+    db.__class__ = WritingConnection
+    db.slow_call_ms = 0
+    db.explain_interval_s = 0
+    balance = db.get_account(pg_account).balance
+    db.conn.commit()
+
+    first = db.bump(pg_account)
+    assert db.conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    assert db.bump(pg_account) == first + 1
+    assert db.get_account(pg_account).balance == balance + 2
+
+
+def test_explain_keeps_the_callers_transaction(db, pg_account):
+    db.slow_call_ms = 0
+    db.explain_interval_s = 0
+    with db.conn.cursor() as cur:
+        cur.execute("UPDATE accounts SET name = 'pending' WHERE id = %s", (pg_account,))
+    db.get_account(pg_account)
+
+    assert db.conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    assert db.get_account(pg_account).name == 'pending'
+    db.conn.rollback()
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip('psycopg2')
+
+from database.migrations import MIGRATIONS, SchemaMigrator, _collect_query_calls, verify_query_plans
+
+from conftest import insert_pg_trades
+
+
+def test_schema_is_current(db):
+    assert SchemaMigrator(db.conn).current_version() == MIGRATIONS[-1].version
+
+
+def test_collect_query_calls_records_statements_per_method(db, pg_account):
+    insert_pg_trades(db, pg_account, [1.0, -2.0, 3.0])
+    recorded = _collect_query_calls(db, pg_account)
+
+    assert all(recorded[name] for name in ('get_trades', 'get_profit_loss_metrics', 'get_sequence_metrics'))
+    # Each method only sees its own statements
+    assert recorded['get_trades'][0][0] != recorded['get_profit_loss_metrics'][0][0]
+    assert not any('trade_stats' in query for query, _ in recorded['get_trades'])
+
+
+def test_verify_query_plans(db, pg_account):
+    insert_pg_trades(db, pg_account, [1.0, -2.0, 3.0])
+    findings = verify_query_plans(db, pg_account)
+    assert set(findings) >= {'get_trades', 'get_profit_loss_metrics'}
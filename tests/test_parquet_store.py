@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from database.parquet_store import ParquetStore
+from database.sqlite_reader import SqliteReader
+
+from conftest import make_account, make_trades
+
+
+@pytest.fixture
+def exported(writer, tmp_path):
+    account_id = writer.write_account(make_account())
+    # Five hours apart, 200 trades span January to February 2024
+    writer.write_trades(make_trades(200), account_id)
+    store = ParquetStore(str(tmp_path / 'parquet'))
+    with SqliteReader(writer.db_path) as reader:
+        store.export_account(reader, account_id)
+    return store, account_id
+
+
+def exported_count(store, account_id):
+    return store.load_table('trades', [account_id]).num_rows
+
+
+def test_export_round_trip(exported):
+    store, account_id = exported
+    frame = store.load_trades_frame([account_id])
+    assert len(frame) == 200
+    assert frame['open_time'].is_monotonic_increasing
+
+
+def test_partial_month_export_keeps_the_rest_of_the_month(writer, exported):
+    store, account_id = exported
+    with SqliteReader(writer.db_path) as reader:
+        written = store.export_account(reader, account_id, datetime(2024, 1, 10), datetime(2024, 1, 15))
+
+    january = sum(1 for t in make_trades(200) if t.open_time.month == 1)
+    assert written['trades'] == january
+    assert exported_count(store, account_id) == 200
+
+
+def test_months_without_rows_are_cleared(writer, exported):
+    store, account_id = exported
+    writer._connection().execute("DELETE FROM trades WHERE open_time >= '2024-02-01'")
+    with SqliteReader(writer.db_path) as reader:
+        store.export_account(reader, account_id, datetime(2024, 1, 1), datetime(2024, 3, 1))
+
+    months = {path.name for path in (store.root / 'trades' / f'account_id={account_id}').iterdir()}
+    assert months == {'month=2024-01'}
+    assert exported_count(store, account_id) == sum(1 for t in make_trades(200) if t.open_time.month == 1)
@@ -0,0 +1,47 @@
+import threading
+
+from utils.scheduler import Scheduler
+
+
+def test_job_runs_and_is_counted():
+    scheduler = Scheduler(max_workers=1)
+    ran = threading.Event()
+    scheduler.add_job('job', ran.set, 3600, run_immediately=True)
+    scheduler.start()
+    try:
+        assert ran.wait(5)
+    finally:
+        scheduler.stop()
+
+    [stats] = scheduler.stats()
+    assert stats.name == 'job'
+    assert stats.runs == 1 and stats.failures == 0
+
+
+def test_stop_from_inside_a_job_does_not_deadlock():
+    scheduler = Scheduler(max_workers=1)
+    stopped = threading.Event()
+
+    def stop_scheduler():
+        scheduler.stop()
+        stopped.set()
+
+    scheduler.add_job('stop', stop_scheduler, 3600, run_immediately=True)
+    scheduler.start()
+    assert stopped.wait(5)
+    assert not scheduler.running
+
+
+def test_failing_job_is_counted():
+    scheduler = Scheduler(max_workers=1)
+    done = threading.Event()
+
+    def fail():
+        done.set()
+        raise RuntimeError("boom")
+
+    scheduler.add_job('fail', fail, 3600, run_immediately=True)
+    scheduler.start()
+    assert done.wait(5)
+    scheduler.stop()
+    assert scheduler.stats()[0].failures == 1
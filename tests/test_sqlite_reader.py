@@ -0,0 +1,75 @@
+import dataclasses
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.classes import OverviewMetrics
+from database.sqlite_reader import SqliteReader
+
+from conftest import make_account, make_trades
+
+
+@pytest.fixture(params=['America/New_York', 'Asia/Tokyo'])
+def local_timezone(request, monkeypatch):
+    """Run with the process in a zone behind or ahead of UTC"""
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def overview(balance):
+    return OverviewMetrics(
+        total_balance=balance, equity=balance, margin_used=0.0, margin_level=0.0,
+        floating_pl=0.0, daily_pl=0.0, open_positions=0, active_orders=0,
+        account_growth=[], growth_dates=[]
+    )
+
+
+def test_latest_snapshot_as_of_local_time(writer, local_timezone):
+    account_id = writer.write_account(make_account())
+    writer.write_overview_metrics(overview(10500.0), account_id)
+
+    with SqliteReader(writer.db_path) as reader:
+        row = reader._latest_snapshot('overview_metrics', 'total_balance', account_id, datetime.now())
+        assert row[1] == 10500.0
+        with pytest.raises(Exception):
+            reader._latest_snapshot(
+                'overview_metrics', 'total_balance', account_id, datetime.now() - timedelta(minutes=5)
+            )
+
+
+def test_reader_matches_written_trades(writer):
+    account_id = writer.write_account(make_account())
+    trades = make_trades(40)
+    writer.write_trades(trades, account_id)
+
+    with SqliteReader(writer.db_path) as reader:
+        start, end = datetime(2023, 12, 1), datetime(2024, 3, 1)
+        read = reader.get_trades(account_id, start, end)
+        metrics = reader.get_profit_loss_metrics(account_id, start, end)
+
+    assert sorted(read, key=lambda t: t.id) == trades
+    assert metrics.total_trades == len(trades)
+    assert metrics.total_pl == pytest.approx(sum(t.profit_loss for t in trades))
+
+
+def test_profit_loss_streaks_skip_breakeven_like_sequence(writer):
+    account_id = writer.write_account(make_account())
+    profits = [5.0, 3.0, 0.0, 2.0, -1.0, -4.0, 0.0, -3.0, 7.0]
+    trades = [
+        dataclasses.replace(trade, profit_loss=profit_loss)
+        for trade, profit_loss in zip(make_trades(len(profits)), profits)
+    ]
+    writer.write_trades(trades, account_id)
+
+    with SqliteReader(writer.db_path) as reader:
+        start, end = datetime(2023, 12, 1), datetime(2024, 3, 1)
+        profit_loss = reader.get_profit_loss_metrics(account_id, start, end)
+        sequence = reader.get_sequence_metrics(account_id, start, end)
+
+    # Trades close in open order, so both orderings give the same streaks
+    assert (profit_loss.consecutive_wins, profit_loss.consecutive_losses) == (3, 3)
+    assert (sequence.win_streak, sequence.loss_streak) == (3, 3)
@@ -0,0 +1,106 @@
+import dataclasses
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.analysis import METRIC_DEPENDENCIES, TradingAnalyzer
+from database.trade_batch import TradeBatch
+
+from conftest import make_account, make_trades
+
+
+def assert_same(left, right, path='metrics'):
+    """Compare metric values, treating NaN as equal and floats approximately"""
+    if dataclasses.is_dataclass(left):
+        assert type(left) is type(right), path
+        for field in dataclasses.fields(left):
+            assert_same(getattr(left, field.name), getattr(right, field.name), f"{path}.{field.name}")
+    elif isinstance(left, TradeBatch):
+        assert_same(left.to_trades(), right.to_trades(), path)
+    elif isinstance(left, dict):
+        assert set(left) == set(right), path
+        for key in left:
+            assert_same(left[key], right[key], f"{path}[{key!r}]")
+    elif isinstance(left, (list, tuple)):
+        assert len(left) == len(right), path
+        for i, (a, b) in enumerate(zip(left, right)):
+            assert_same(a, b, f"{path}[{i}]")
+    elif isinstance(left, (float, np.floating)) and math.isnan(left):
+        assert isinstance(right, (float, np.floating)) and math.isnan(right), path
+    elif isinstance(left, (float, np.floating, int, np.integer)) and not isinstance(left, bool):
+        assert right == pytest.approx(left), path
+    else:
+        assert pd.Timestamp(left) == pd.Timestamp(right) if hasattr(left, 'year') else left == right, path
+
+
+def account(account_id):
+    base = make_account()
+    return dataclasses.replace(base, id=account_id)
+
+
+@pytest.fixture(scope='module')
+def trades():
+    return make_trades(300)
+
+
+@pytest.fixture(scope='module')
+def list_metrics(trades):
+    return TradingAnalyzer(trades, account(101)).calculate()
+
+
+def test_round_trip(trades):
+    batch = TradeBatch.from_trades(trades)
+    assert batch.to_trades() == trades
+    assert TradeBatch.from_dataframe(batch.to_dataframe()).to_trades() == [
+        dataclasses.replace(t, comment='') for t in trades
+    ]
+
+
+def test_frames_match(trades):
+    list_df = TradingAnalyzer(trades, account(1)).trades_df
+    batch_df = TradingAnalyzer(TradeBatch.from_trades(trades), account(1)).trades_df
+    for column in list_df:
+        assert batch_df[column].dtype == list_df[column].dtype, column
+
+
+@pytest.mark.parametrize('group', list(METRIC_DEPENDENCIES))
+def test_batch_metrics_match_list(trades, list_metrics, group):
+    batch_metrics = TradingAnalyzer(TradeBatch.from_trades(trades), account(102)).calculate([group])
+    assert_same(list_metrics[group], batch_metrics[group], group)
+
+
+@pytest.mark.parametrize('group', list(METRIC_DEPENDENCIES))
+def test_parquet_frame_metrics_match_list(trades, list_metrics, group, writer, tmp_path):
+    pytest.importorskip('pyarrow')
+    from database.parquet_store import ParquetStore
+    from database.sqlite_reader import SqliteReader
+
+    account_id = writer.write_account(make_account())
+    writer.write_trades(trades, account_id)
+    store = ParquetStore(str(tmp_path / 'parquet'))
+    with SqliteReader(writer.db_path) as reader:
+        store.export_account(reader, account_id)
+
+    analyzer = TradingAnalyzer(trades, account(103), trades_df=store.load_trades_frame([account_id]))
+    assert_same(list_metrics[group], analyzer.calculate([group])[group], group)
+
+
+def test_missing_categories_decode_to_none():
+    df = TradingAnalyzer(make_trades(3), account(1)).trades_df
+    df.loc[1, 'status'] = None
+    batch = TradeBatch.from_dataframe(df)
+    assert list(batch.column('status')) == ['closed', None, 'closed']
+    assert batch[1].status is None
+
+
+def test_risk_per_trade_ignores_missing_stop_loss():
+    # Every fifth trade of make_trades has no stop loss
+    trades = make_trades(20)
+    expected = np.mean([
+        abs(t.open_price - t.stop_loss) * t.volume if t.stop_loss is not None else 0 for t in trades
+    ])
+    for source in (trades, TradeBatch.from_trades(trades)):
+        risk = TradingAnalyzer(source, account(1)).calculate_risk_metrics()
+        assert risk.risk_per_trade == pytest.approx(expected)
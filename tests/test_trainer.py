@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from ai.data_organizer import DataOrganizer
+from ai.model import AIModel
+from ai.trainer import ModelTrainer
+
+
+def training_rows(noise_scale):
+    """Labels follow a and b; c is noise spread over [0, noise_scale)"""
+    rng = np.random.default_rng(1)
+    features = pd.DataFrame(rng.random((1000, 3)), columns=['a', 'b', 'c'])
+    features['c'] *= noise_scale
+    labels = np.column_stack([features['a'] > 0.5, features['b'] > 0.5]).astype(float)
+    return features, labels, None
+
+
+def test_rejected_candidate_leaves_live_scaler_alone(tmp_path):
+    organizer = DataOrganizer({})
+    model = AIModel(str(tmp_path / 'model.joblib'))
+    trainer = ModelTrainer(model, organizer, 'SELECT 1')
+    organizer.fetch_training_rows = lambda query, params=None: training_rows(1.0)
+    assert trainer.train_now(full=True)
+    live = model.current
+    assert organizer.scaler is live.scaler
+    fitted = live.scaler.to_dict()
+
+    # A wider range of c widens the candidate's scaler, but the candidate only ties and is not published
+    organizer.fetch_training_rows = lambda query, params=None: training_rows(10.0)
+    trainer.train_now(full=True)
+    assert model.current is live
+    assert organizer.scaler is live.scaler
+    assert organizer.scaler.to_dict() == fitted
@@ -0,0 +1,55 @@
+import dataclasses
+
+import pytest
+
+from database.write_queue import BackgroundWriter
+
+from conftest import make_account, make_trades
+
+
+@pytest.fixture
+def background(writer):
+    background = BackgroundWriter(writer, flush_interval=0.05)
+    yield background
+    background.stop()
+
+
+def test_submitted_trades_are_written(writer, background):
+    account_id = writer.write_account(make_account())
+    background.start()
+    for chunk in range(4):
+        assert background.submit_trades(make_trades(10, first_id=chunk * 10 + 1), account_id)
+    background.flush()
+
+    stats = background.stats()
+    assert stats.written == 4
+    assert stats.dead_lettered == 0
+    assert writer._connection().execute("SELECT count(*) FROM trades").fetchone()[0] == 40
+
+
+def test_bad_item_is_dead_lettered_alone(writer, background):
+    good_account = writer.write_account(make_account())
+    bad_account = writer.write_account(make_account(login='2002'))
+    bad_trade = dataclasses.replace(make_trades(1, first_id=500)[0], direction='Buy')
+    background.start()
+    background.submit_trades(make_trades(10), good_account)
+    background.submit_trades([bad_trade], bad_account)
+    background.submit_trades(make_trades(5, first_id=100), good_account)
+    background.flush()
+
+    stats = background.stats()
+    assert stats.written == 2
+    assert stats.dead_lettered == 1
+    assert [item for item, _ in background.dead_letters()] == [('trades', bad_account, [bad_trade])]
+    assert writer._connection().execute("SELECT count(*) FROM trades").fetchone()[0] == 15
+
+
+def test_submit_requires_running_worker(writer, background):
+    with pytest.raises(RuntimeError):
+        background.submit_trades(make_trades(1), 1)
+    background.start()
+    background.stop()
+    with pytest.raises(RuntimeError):
+        background.submit_trades(make_trades(1), 1)
+    # Nothing is pending, so flush returns at once
+    background.flush()
@@ -0,0 +1,225 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# What happens when a job's due time passed by more than a whole interval
+# (e.g. the machine slept, or the previous run overran):
+#   'skip'      drop the late run and wait for the next slot
+#   'run_once'  run once now, however many slots were missed
+#   'catch_up'  run every missed slot, back to back
+MISSED_RUN_POLICIES = ('skip', 'run_once', 'catch_up')
+
+@dataclass
+class ScheduledJobStats:
+    """Counters of one periodic job registered with a Scheduler"""
+    name: str
+    interval_seconds: float
+    next_run: Optional[datetime]
+    running: int
+    runs: int
+    failures: int
+    skipped: int  # due runs dropped by the missed-run policy or concurrency limit
+    last_duration_ms: float
+
+@dataclass
+class _Job:
+    name: str
+    func: Callable[[], Any]
+    interval: float
+    jitter: float
+    missed: str
+    max_instances: int
+    due: float  # slot time, without jitter
+    next_run: float  # slot time plus this slot's jitter
+    running: int = 0
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_duration_ms: float = 0.0
+
+    def schedule(self, due: float):
+        self.due = due
+        # Jitter is drawn per slot and never accumulates into the slot times
+        self.next_run = due + random.uniform(0, self.jitter)
+
+class Scheduler:
+    """Runs registered jobs periodically on a small thread pool
+
+    Every instance has its own job registry. The scheduler thread sleeps on
+    a condition variable until the earliest job is due, and adding, removing
+    or triggering a job or stopping wakes it at once, so it never polls.
+    Jobs run on worker threads; max_workers bounds how many run at the same
+    time overall and max_instances how many runs of one job may overlap.
+    """
+
+    def __init__(self, max_workers: int = 2, name: str = 'Scheduler'):
+        """
+        Args:
+            max_workers: Jobs that may run at the same time
+            name: Thread name prefix
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self._jobs: Dict[str, _Job] = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Set on worker threads while they run a job
+        self._local = threading.local()
+
+    def add_job(self, name: str, func: Callable[[], Any], interval_seconds: float,
+                jitter_seconds: float = 0.0, missed: str = 'run_once', max_instances: int = 1,
+                run_immediately: bool = False):
+        """Register func to run every interval_seconds, replacing a job of the same name
+
+        Args:
+            name: Unique job name, e.g. 'retrain:account-7'
+            func: Callable without arguments; exceptions are logged
+            interval_seconds: Time between due runs
+            jitter_seconds: Random delay of up to this much added to each run,
+                            so jobs sharing an interval do not all fire together
+            missed: One of MISSED_RUN_POLICIES
+            max_instances: Runs of this job that may overlap; further due runs are
+                           skipped, or wait for a free instance with catch_up
+            run_immediately: Make the first run due now instead of after one interval
+        """
+        if missed not in MISSED_RUN_POLICIES:
+            raise ValueError(f"Unknown missed-run policy: {missed}")
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds must be positive")
+        now = time.time()
+        job = _Job(
+            name=name, func=func, interval=interval_seconds, jitter=jitter_seconds,
+            missed=missed, max_instances=max_instances, due=now, next_run=now
+        )
+        if not run_immediately:
+            job.schedule(now + interval_seconds)
+        with self._condition:
+            self._jobs[name] = job
+            self._condition.notify_all()
+
+    def remove_job(self, name: str) -> bool:
+        """Unregister a job; a run in progress finishes. Returns False if it was not registered"""
+        with self._condition:
+            removed = self._jobs.pop(name, None) is not None
+            self._condition.notify_all()
+        return removed
+
+    def run_now(self, name: str):
+        """Make a job due immediately; its later runs keep their slots"""
+        with self._condition:
+            job = self._jobs[name]
+            job.next_run = time.time()
+            self._condition.notify_all()
+
+    def start(self):
+        """Start the scheduler thread"""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name)
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, wait: bool = True, timeout: Optional[float] = None):
+        """Stop scheduling at once; with wait, also wait for runs in progress to finish
+
+        Called from inside a job, it never waits: the worker would wait for itself.
+        """
+        with self._condition:
+            if self._thread is None:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+            thread, executor = self._thread, self._executor
+            self._thread, self._executor = None, None
+        thread.join(timeout)
+        in_job = getattr(self._local, 'job', None) is not None
+        executor.shutdown(wait=wait and not in_job, cancel_futures=True)
+
+    @property
+    def running(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    def stats(self) -> List[ScheduledJobStats]:
+        """Return a snapshot of every job's counters"""
+        with self._condition:
+            return [
+                ScheduledJobStats(
+                    name=job.name,
+                    interval_seconds=job.interval,
+                    next_run=datetime.fromtimestamp(job.next_run),
+                    running=job.running,
+                    runs=job.runs,
+                    failures=job.failures,
+                    skipped=job.skipped,
+                    last_duration_ms=job.last_duration_ms
+                )
+                for job in self._jobs.values()
+            ]
+
+    def _run(self):
+        with self._condition:
+            while not self._stopping:
+                # Wall-clock time, so slots missed while the machine slept are noticed
+                now = time.time()
+                for job in list(self._jobs.values()):
+                    if job.next_run <= now:
+                        self._dispatch(job, now)
+                # Jobs held back by their instance limit wake the thread when a run finishes
+                next_run = min(
+                    (job.next_run for job in self._jobs.values() if not self._held_back(job, now)),
+                    default=None
+                )
+                # No timeout without due jobs: add_job(), stop() or a finished run wakes the thread
+                self._condition.wait(None if next_run is None else max(next_run - time.time(), 0))
+
+    def _held_back(self, job: _Job, now: float) -> bool:
+        """A due catch_up job waits for a free instance instead of dropping the run"""
+        return job.missed == 'catch_up' and job.next_run <= now and job.running >= job.max_instances
+
+    def _dispatch(self, job: _Job, now: float):
+        """Start or skip a due run and schedule the next one; called with the condition held"""
+        if self._held_back(job, now):
+            return
+        missed_slots = int((now - job.due) // job.interval)
+        late = missed_slots >= 1
+        if job.running >= job.max_instances or (late and job.missed == 'skip'):
+            job.skipped += 1
+        else:
+            job.running += 1
+            self._executor.submit(self._execute, job)
+
+        if late and job.missed == 'catch_up':
+            job.schedule(job.due + job.interval)
+        else:
+            # The first slot after now, keeping the original phase
+            job.schedule(job.due + (missed_slots + 1) * job.interval)
+
+    def _execute(self, job: _Job):
+        started = time.perf_counter()
+        failed = False
+        self._local.job = job
+        try:
+            job.func()
+        except Exception as e:
+            failed = True
+            logger.error(f"Scheduled job {job.name} failed: {str(e)}")
+        finally:
+            self._local.job = None
+            with self._condition:
+                job.running -= 1
+                job.runs += 1
+                job.failures += failed
+                job.last_duration_ms = (time.perf_counter() - started) * 1000
+                self._condition.notify_all()